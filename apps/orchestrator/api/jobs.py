@@ -0,0 +1,25 @@
+from fastapi import APIRouter, HTTPException
+
+from ..core.app_state import job_queue, prompt_registry
+from ..models.job import Job
+from ..models.run import RunRequest
+
+router = APIRouter()
+
+
+@router.post("/jobs", response_model=Job, status_code=202)
+def submit_job(request: RunRequest):
+    # Reject unknown task types now rather than as a failed job later.
+    if not prompt_registry.get(request.task_type, "v1"):
+        raise HTTPException(
+            status_code=400, detail=f"Prompt not found for type={request.task_type}"
+        )
+    return job_queue.submit(request)
+
+
+@router.get("/jobs/{job_id}", response_model=Job)
+def get_job(job_id: str):
+    job = job_queue.store.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
@@ -1,30 +1,227 @@
+import asyncio
+import json
+import logging
 from datetime import datetime, timezone
 from time import perf_counter
+from typing import Any, AsyncIterator, Dict, List, Set, Tuple
 from uuid import uuid4
 
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 
-from ..core.app_state import agent_loop, run_store
-from ..models.run import RunRequest, RunResponse
+from ..config import settings
+from ..core.admission import Overloaded
+from ..core.app_state import admission, agent_loop, run_store
+from ..core.tracing import Trace, start_trace
+from ..models.run import BatchRunRequest, RunRequest, RunResponse
 from ..models.run_record import RunRecord
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# The event loop only keeps weak references to tasks; hold detached ones here.
+_detached: Set[asyncio.Task] = set()
 
 
 @router.post("/run", response_model=RunResponse)
-def run(request: RunRequest):
+async def run(request: RunRequest):
+    queue_wait_s = await _admit()
+    try:
+        started = perf_counter()
+        trace = start_trace()
+        try:
+            response = await agent_loop.arun(request, trace)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+    finally:
+        admission.release()
+
+    record = _finalize(request, response, started, trace, queue_wait_s)
+    # Persistence is blocking disk I/O; keep it off the event loop. Its timing
+    # is only known after the record is written, so it is reported in the
+    # response but not in the stored record.
+    with trace.span("run_store.add"):
+        await run_in_threadpool(run_store.add, record)
+    response.stage_timings = trace.timings
+    return response
+
+
+@router.post("/run/stream")
+async def run_stream(request: RunRequest):
+    queue_wait_s = await _admit()
     started = perf_counter()
+    trace = start_trace()
+    events = agent_loop.astream(request, trace)
+    # Pull the first event before committing to a 200 so unknown task types
+    # still get a plain 400 instead of an error inside the stream.
     try:
-        response = agent_loop.run(request)
+        first = await events.__anext__()
     except ValueError as exc:
+        admission.release()
         raise HTTPException(status_code=400, detail=str(exc)) from exc
+    except BaseException:
+        admission.release()
+        raise
+    return _AdmittedStreamingResponse(
+        _run_stream(request, events, first, started, trace, queue_wait_s),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _run_stream(
+    request: RunRequest,
+    events: AsyncIterator[Tuple[str, Any]],
+    first: Tuple[str, Any],
+    started: float,
+    trace: Trace,
+    queue_wait_s: float,
+) -> AsyncIterator[str]:
+    try:
+        yield _sse(*first)
+        async for event, data in events:
+            if event == "done":
+                record = _finalize(request, data, started, trace, queue_wait_s)
+                with trace.span("run_store.add"):
+                    await run_in_threadpool(run_store.add, record)
+                data.stage_timings = trace.timings
+                data = json.loads(data.json())
+            yield _sse(event, data)
+    finally:
+        await events.aclose()
+
+
+class _AdmittedStreamingResponse(StreamingResponse):
+    """Holds the admission slot until the stream ends, however it ends.
+
+    Released here rather than in the body generator, which never runs its
+    ``finally`` if the client disconnects before streaming starts.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            admission.release()
+
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
 
+
+@router.post("/run/batch")
+async def run_batch(batch: BatchRunRequest):
+    concurrency = batch.concurrency or settings.batch_concurrency
+    return StreamingResponse(
+        _run_batch(batch.requests, concurrency), media_type="application/x-ndjson"
+    )
+
+
+async def _run_batch(
+    requests: List[RunRequest], concurrency: int
+) -> AsyncIterator[str]:
+    """Run requests with bounded concurrency, one NDJSON line per finished item."""
+    semaphore = asyncio.Semaphore(concurrency)
+    retrieval_cache: Dict[str, List[str]] = {}
+    records: List[RunRecord] = []
+    underway: Set[int] = set()
+
+    async def run_item(index: int, request: RunRequest) -> Dict[str, Any]:
+        async with semaphore:
+            # Each item counts against the same admission limit as a /run call.
+            try:
+                queue_wait_s = await admission.acquire()
+            except Overloaded as exc:
+                return {
+                    "index": index,
+                    "status": "error",
+                    "detail": str(exc),
+                    "retry_after_s": exc.retry_after_s,
+                }
+            underway.add(index)
+            started = perf_counter()
+            trace = start_trace()
+            try:
+                response = await agent_loop.arun(request, trace, retrieval_cache)
+                records.append(
+                    _finalize(request, response, started, trace, queue_wait_s)
+                )
+                return {
+                    "index": index,
+                    "status": "ok",
+                    "response": json.loads(response.json()),
+                }
+            except ValueError as exc:
+                return {"index": index, "status": "error", "detail": str(exc)}
+            except Exception:  # noqa: BLE001 - one failed item must not abort the batch
+                logger.exception("batch item %d failed", index)
+                return {"index": index, "status": "error", "detail": "internal error"}
+            finally:
+                admission.release()
+
+    tasks = [asyncio.create_task(run_item(i, r)) for i, r in enumerate(requests)]
+    failed = 0
+    streamed = False
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            item = await next_done
+            failed += item["status"] != "ok"
+            yield json.dumps(item, ensure_ascii=False) + "\n"
+        streamed = True
+    finally:
+        # If the client went away mid-stream, items still waiting for a slot
+        # are dropped but runs already underway finish. They are persisted by a
+        # detached task, since a disconnect cancels the response's own task.
+        for index, task in enumerate(tasks):
+            if index not in underway:
+                task.cancel()
+        persisted = asyncio.ensure_future(_persist_batch(tasks, records))
+        _detached.add(persisted)
+        persisted.add_done_callback(_detached.discard)
+        if streamed:
+            await asyncio.shield(persisted)
+    summary = {
+        "status": "done",
+        "total": len(requests),
+        "succeeded": len(requests) - failed,
+        "failed": failed,
+    }
+    yield json.dumps(summary) + "\n"
+
+
+async def _persist_batch(tasks: List[asyncio.Task], records: List[RunRecord]) -> None:
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await run_in_threadpool(run_store.add_many, records)
+
+
+async def _admit() -> float:
+    try:
+        return await admission.acquire()
+    except Overloaded as exc:
+        raise HTTPException(
+            status_code=503,
+            detail=str(exc),
+            headers={"Retry-After": str(exc.retry_after_s)},
+        ) from exc
+
+
+def _finalize(
+    request: RunRequest,
+    response: RunResponse,
+    started: float,
+    trace: Trace,
+    queue_wait_s: float | None = None,
+) -> RunRecord:
+    # duration_ms is service time only; time spent waiting for admission is
+    # reported separately as queue_wait_ms.
     duration_ms = int((perf_counter() - started) * 1000)
+    queue_wait_ms = int(queue_wait_s * 1000) if queue_wait_s is not None else None
     run_id = uuid4().hex
     response.run_id = run_id
     response.duration_ms = duration_ms
-
-    record = RunRecord(
+    response.queue_wait_ms = queue_wait_ms
+    return RunRecord(
         id=run_id,
         task_type=request.task_type,
         project_id=request.project_id,
@@ -35,6 +232,8 @@ def run(request: RunRequest):
         quality_report=response.quality_report,
         created_at=datetime.now(timezone.utc),
         duration_ms=duration_ms,
+        queue_wait_ms=queue_wait_ms,
+        prompt_tokens_dropped=response.prompt_tokens_dropped,
+        cache_hit=response.cache_hit,
+        stage_timings=trace.timings,
     )
-    run_store.add(record)
-    return response
@@ -1,19 +1,43 @@
-﻿from fastapi import APIRouter, HTTPException
+﻿from datetime import datetime
+from typing import Iterator, Union
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 
 from ..core.app_state import run_store
-from ..models.run_record import RunRecord, RunStats
+from ..models.run_record import RunFields, RunRecord, RunStats, RunSummary
 
 router = APIRouter()
 
 
-@router.get("/runs", response_model=list[RunRecord])
-def list_runs(project_id: str | None = None, limit: int = 20):
-    return run_store.list(project_id=project_id, limit=limit)
+@router.get("/runs", response_model=Union[list[RunRecord], list[RunSummary]])
+def list_runs(
+    project_id: str | None = None, limit: int = 20, fields: RunFields = "full"
+):
+    return run_store.list(project_id=project_id, limit=limit, fields=fields)
+
+
+@router.get("/runs/stats", response_model=RunStats)
+def run_stats():
+    return run_store.stats()
 
 
-@router.get("/runs/{run_id}", response_model=RunRecord)
-def get_run(run_id: str):
-    record = run_store.get(run_id)
+@router.get("/runs/export")
+def export_runs(
+    since: datetime | None = None,
+    until: datetime | None = None,
+    project_id: str | None = None,
+    fields: RunFields = "full",
+):
+    records = run_store.iter_records(
+        since=since, until=until, project_id=project_id, fields=fields
+    )
+    return StreamingResponse(_ndjson(records), media_type="application/x-ndjson")
+
+
+@router.get("/runs/{run_id}", response_model=Union[RunRecord, RunSummary])
+def get_run(run_id: str, fields: RunFields = "full"):
+    record = run_store.get(run_id, fields=fields)
     if not record:
         raise HTTPException(status_code=404, detail="Run not found")
     return record
@@ -27,6 +51,6 @@ def delete_run(run_id: str):
     return {"status": "deleted", "run_id": run_id}
 
 
-@router.get("/runs/stats", response_model=RunStats)
-def run_stats():
-    return run_store.stats()
+def _ndjson(records: Iterator[Union[RunRecord, RunSummary]]) -> Iterator[str]:
+    for record in records:
+        yield record.json(ensure_ascii=False) + "\n"
@@ -1,8 +1,8 @@
 import os
-from typing import Literal
+from typing import Dict, List, Literal
 
 from dotenv import load_dotenv
-from pydantic import AnyHttpUrl, BaseSettings, Field, validator
+from pydantic import BaseSettings, Field, validator
 
 
 def _load_env() -> str:
@@ -24,8 +24,52 @@ class Settings(BaseSettings):
     api_port: int = Field(default=8080, ge=1, le=65535)
 
     # MCP
-    mcp_server_url: AnyHttpUrl = Field(default="http://localhost:8090")
+    # http(s)://host:port of the tool server, or inproc:// to run the tools
+    # inside the orchestrator process on mcp_inproc_workers threads
+    mcp_server_url: str = Field(default="http://localhost:8090")
+    mcp_inproc_workers: int = Field(default=8, ge=1, le=256)
     mcp_timeout_s: float = Field(default=5.0, gt=0)
+    # Per-tool overrides of mcp_timeout_s, e.g. MCP_TOOL_TIMEOUTS_S='{"coverage": 35}'
+    mcp_tool_timeouts_s: Dict[str, float] = Field(default_factory=dict)
+    # Keep-alive connections kept to the MCP server
+    mcp_pool_size: int = Field(default=16, ge=1, le=256)
+    mcp_pool_idle_timeout_s: float = Field(default=60.0, gt=0)
+    # Send a run's quality tools as one POST /tools/batch instead of one POST per tool
+    mcp_batch_tools: bool = Field(default=True)
+
+    # Quality tools
+    quality_deadline_s: float = Field(default=30.0, gt=0)
+    quality_tool_workers: int = Field(default=16, ge=1, le=256)
+    # Tools per task type; unlisted task types run lint, test and coverage.
+    quality_tools_by_task_type: Dict[str, List[str]] = Field(
+        default_factory=lambda: {"code_review": ["lint", "test"]}
+    )
+
+    # Admission control for /run and /run/stream
+    admission_max_in_flight: int = Field(default=32, ge=1, le=1024)
+    admission_max_queue: int = Field(default=64, ge=0, le=10000)
+    admission_retry_after_s: int = Field(default=1, ge=1, le=3600)
+
+    # Batch runs
+    batch_concurrency: int = Field(default=4, ge=1, le=64)
+
+    # Job queue
+    job_store_path: str = Field(default="./data/jobs.sqlite3")
+    job_workers: int = Field(default=2, ge=1, le=64)
+    # Higher runs first; unlisted task types get 0,
+    # e.g. JOB_PRIORITIES='{"code_review": 10}'
+    job_priorities: Dict[str, int] = Field(default_factory=dict)
+    # A job found still running at startup this many times is failed, not retried
+    job_max_attempts: int = Field(default=3, ge=1, le=100)
+
+    # Tracing: fraction of runs that record per-stage timings
+    trace_sample_rate: float = Field(default=1.0, ge=0.0, le=1.0)
+
+    # Prompt assembly: estimated-token budget for the formatted prompt
+    prompt_token_budget: int = Field(default=8000, ge=256)
+    # Per-task-type overrides, e.g. PROMPT_TOKEN_BUDGETS='{"code_review": 12000}'
+    prompt_token_budgets: Dict[str, int] = Field(default_factory=dict)
+    prompt_memory_share: float = Field(default=0.3, ge=0.0, le=1.0)
 
     # RAG
     top_k: int = Field(default=3, ge=1, le=20)
@@ -37,12 +81,60 @@ class Settings(BaseSettings):
     # Run Store
     run_store_path: str = Field(default="./data/run_store.json")
     run_store_limit: int = Field(default=200, ge=10, le=5000)
+    run_store_compression: Literal["zlib", "lzma"] = Field(default="zlib")
+
+    # Run result cache (LLM output + quality report),
+    # bypassed per request with options={"cache": false}
+    run_cache_enabled: bool = Field(default=False)
+    run_cache_path: str = Field(default="./data/run_cache")
+    run_cache_ttl_s: float = Field(default=86400.0, gt=0)
+    run_cache_max_bytes: int = Field(default=64 * 1024 * 1024, ge=1024)
 
     # LLM
-    llm_provider: Literal["gemini", "stub"] = Field(default="gemini")
+    llm_provider: Literal["gemini", "stub", "simulated"] = Field(default="gemini")
     llm_model: str = Field(default="gemini-2.5-flash")
     llm_temperature: float = Field(default=0.7, ge=0.0, le=1.0)
     llm_api_key: str | None = Field(default=None, env="LLM_API_KEY")
+    # Stub provider streaming: chunk size and delay before each chunk
+    llm_stub_chunk_chars: int = Field(default=64, ge=1)
+    llm_stub_chunk_delay_s: float = Field(default=0.0, ge=0.0)
+    llm_base_url: str = Field(default="https://generativelanguage.googleapis.com")
+    # Persistent keep-alive connections kept per LLM origin
+    llm_pool_size: int = Field(default=8, ge=1, le=256)
+    llm_pool_idle_timeout_s: float = Field(default=60.0, gt=0)
+    # Per-attempt timeout; retryable errors (timeouts, 429, 5xx) are retried with
+    # full-jitter exponential backoff
+    llm_timeout_s: float = Field(default=30.0, gt=0)
+    llm_max_retries: int = Field(default=2, ge=0, le=10)
+    llm_retry_base_delay_s: float = Field(default=0.2, gt=0)
+    llm_retry_max_delay_s: float = Field(default=5.0, gt=0)
+    # Send a duplicate request once a call outlasts this quantile of recent latencies
+    llm_hedge_enabled: bool = Field(default=True)
+    llm_hedge_quantile: float = Field(default=0.95, gt=0.0, lt=1.0)
+    llm_hedge_min_samples: int = Field(default=20, ge=1)
+    # Fail fast after this many consecutive provider failures, for reset_timeout_s
+    llm_breaker_failure_threshold: int = Field(default=5, ge=1)
+    llm_breaker_reset_timeout_s: float = Field(default=30.0, gt=0)
+    # Share one provider call between concurrent identical prompts
+    # (same model and temperature)
+    llm_coalesce_enabled: bool = Field(default=True)
+    # Client-side rate limits matched to the provider quota (0 disables a limit).
+    # Calls reserve prompt tokens + llm_expected_output_tokens and queue by
+    # llm_task_priorities (higher first) for at most llm_max_queue_wait_s.
+    llm_requests_per_minute: int = Field(default=1000, ge=0)
+    llm_tokens_per_minute: int = Field(default=1_000_000, ge=0)
+    llm_expected_output_tokens: int = Field(default=1024, ge=0)
+    llm_rate_burst_s: float = Field(default=10.0, gt=0)
+    llm_max_queue_wait_s: float = Field(default=30.0, gt=0)
+    llm_task_priorities: Dict[str, int] = Field(default_factory=dict)
+    # Simulated provider (offline load tests): log-normal time to first token
+    # fitted to p50/p95, output at tokens_per_s, injected 503/429 rates
+    llm_sim_latency_p50_s: float = Field(default=0.8, gt=0)
+    llm_sim_latency_p95_s: float = Field(default=2.5, gt=0)
+    llm_sim_tokens_per_s: float = Field(default=80.0, gt=0)
+    llm_sim_error_rate: float = Field(default=0.0, ge=0.0, le=1.0)
+    llm_sim_rate_limit_rate: float = Field(default=0.0, ge=0.0, le=1.0)
+    llm_sim_seed: int | None = Field(default=None)
 
     @validator("app_env")
     def _validate_env(cls, v: str) -> str:
@@ -50,6 +142,12 @@ class Settings(BaseSettings):
             raise ValueError("APP_ENV must be 'dev' or 'prod'")
         return v
 
+    @validator("mcp_server_url")
+    def _validate_mcp_url(cls, v: str) -> str:
+        if not v.startswith(("http://", "https://", "inproc://")):
+            raise ValueError("MCP_SERVER_URL must be an http(s):// or inproc:// URL")
+        return v
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -0,0 +1,76 @@
+import asyncio
+from collections import deque
+from time import perf_counter
+from typing import Deque
+
+from .metrics import ADMISSION_QUEUE_WAIT, ADMISSION_REJECTIONS
+
+
+class Overloaded(Exception):
+    def __init__(self, retry_after_s: int) -> None:
+        super().__init__("Server overloaded, retry later")
+        self.retry_after_s = retry_after_s
+
+
+class AdmissionController:
+    """Caps concurrent runs and the number of requests waiting for a slot.
+
+    Requests beyond ``max_in_flight`` wait in FIFO order; once ``max_queue`` are
+    already waiting, new requests are rejected immediately with ``Overloaded``
+    instead of queueing until the client times out.
+    """
+
+    def __init__(
+        self, max_in_flight: int, max_queue: int, retry_after_s: int = 1
+    ) -> None:
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.retry_after_s = retry_after_s
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> float:
+        """Wait for a slot and return the time spent queueing, in seconds."""
+        started = perf_counter()
+        if self._in_flight < self.max_in_flight and not self._waiters:
+            self._in_flight += 1
+            ADMISSION_QUEUE_WAIT.observe(0.0)
+            return 0.0
+        if len(self._waiters) >= self.max_queue:
+            ADMISSION_REJECTIONS.inc()
+            raise Overloaded(self.retry_after_s)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as the caller gave up; pass it on.
+                self.release()
+            elif waiter in self._waiters:
+                # Not there if a release() ran before this task resumed: it
+                # already dropped the cancelled waiter from the queue.
+                self._waiters.remove(waiter)
+            raise
+        waited = perf_counter() - started
+        ADMISSION_QUEUE_WAIT.observe(waited)
+        return waited
+
+    def release(self) -> None:
+        # Hand the slot straight to the next waiter so the in-flight count stays
+        # constant and late arrivals cannot jump the queue.
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._in_flight -= 1
@@ -1,11 +1,26 @@
+import asyncio
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, AsyncIterator, Dict, Tuple
+
 from ..config import settings
+from ..models.memory import MemorySnapshot
+from ..models.prompt import PromptTemplate
 from ..models.report import QualityReport
 from ..models.run import RunRequest, RunResponse
+from .fenced_blocks import FencedBlockParser, extract_fenced_blocks
 from .llm_gateway import LLMGateway
+from .llm_resilience import LLMError
+from .llm_scheduler import DEADLINE_OPTION, llm_call_context
 from .memory_manager import MemoryManager
 from .prompt_registry import PromptRegistry
 from .rag_retriever import RAGRetriever
 from .mcp_client import MCPClient
+from .prompt_budget import BudgetedPrompt, PromptBudgeter
+from .run_cache import RunCache, cache_enabled_for, cache_key
+from .metrics import MCP_TOOL_LATENCY, MCP_TOOL_TIMEOUTS
+from .quality_graph import QUALITY_TOOLS, QualityGraph, QualityPlan, skip_all
+from .tracing import Trace, start_trace
 
 
 class AgentLoop:
@@ -16,51 +31,490 @@ class AgentLoop:
         memory_manager: MemoryManager,
         llm_gateway: LLMGateway,
         mcp_client: MCPClient,
+        quality_deadline_s: float | None = None,
+        prompt_budgeter: PromptBudgeter | None = None,
+        run_cache: RunCache | None = None,
+        quality_graph: QualityGraph | None = None,
     ) -> None:
         self.prompt_registry = prompt_registry
         self.rag_retriever = rag_retriever
         self.memory_manager = memory_manager
         self.llm_gateway = llm_gateway
         self.mcp_client = mcp_client
+        self.quality_deadline_s = quality_deadline_s or settings.quality_deadline_s
+        self.prompt_budgeter = prompt_budgeter or PromptBudgeter(
+            settings.prompt_token_budget,
+            settings.prompt_token_budgets,
+            memory_share=settings.prompt_memory_share,
+        )
+        self.run_cache = run_cache
+        self.quality_graph = quality_graph or QualityGraph(
+            settings.quality_tools_by_task_type
+        )
+        self._tool_executor = ThreadPoolExecutor(
+            max_workers=settings.quality_tool_workers, thread_name_prefix="quality-tool"
+        )
 
-    def run(self, request: RunRequest) -> RunResponse:
-        prompt = self.prompt_registry.get(request.task_type, "v1")
-        if not prompt:
-            raise ValueError(f"Prompt not found for type={request.task_type}")
+    def run(self, request: RunRequest, trace: Trace | None = None) -> RunResponse:
+        trace = trace or start_trace()
+        deadline = _deadline(request)
+        prompt, retrieved, snapshot, assembled = self._prepare(request, trace)
+        key = self._cache_key(request, prompt, assembled)
+        cached = self._cache_get(key, trace)
+        if cached is not None:
+            return self._response(
+                retrieved, snapshot, assembled, *cached, trace, cache_hit=True
+            )
+
+        try:
+            with trace.span("llm_gateway.generate"), llm_call_context(
+                request.task_type, deadline
+            ):
+                llm_output = self.llm_gateway.generate(assembled.text, request.options)
+        except LLMError as exc:
+            return self._llm_failed(retrieved, snapshot, assembled, exc, trace)
 
-        retrieved = self.rag_retriever.retrieve(request.user_input, k=settings.top_k)
-        snapshot = self.memory_manager.update(request.project_id, retrieved)
+        with trace.span("quality_tools"):
+            quality_report = self._run_quality_tools(
+                llm_output, trace, request.task_type
+            )
 
-        formatted_prompt = prompt.template.format(
-            memory=snapshot.summary,
-            context="\n".join(retrieved),
-            input=request.user_input,
+        self._cache_put(key, llm_output, quality_report, trace)
+        return self._response(
+            retrieved, snapshot, assembled, llm_output, quality_report, trace
         )
-        llm_output = self.llm_gateway.generate(formatted_prompt, request.options)
 
-        quality_report = self._run_quality_tools(llm_output)
+    async def arun(
+        self,
+        request: RunRequest,
+        trace: Trace | None = None,
+        retrieval_cache: Dict[str, list[str]] | None = None,
+    ) -> RunResponse:
+        """Async variant of ``run``: LLM and MCP calls await I/O instead of blocking.
+
+        ``retrieval_cache`` lets a caller running many requests (e.g. a batch) share
+        retrieval results across identical inputs.
+        """
+        trace = trace or start_trace()
+        deadline = _deadline(request)
+        # Retrieval, memory JSON I/O and the disk cache block; keep them off the loop.
+        prompt, retrieved, snapshot, assembled = await asyncio.to_thread(
+            self._prepare, request, trace, retrieval_cache
+        )
+        key = self._cache_key(request, prompt, assembled)
+        cached = await asyncio.to_thread(self._cache_get, key, trace)
+        if cached is not None:
+            return self._response(
+                retrieved, snapshot, assembled, *cached, trace, cache_hit=True
+            )
+
+        try:
+            with trace.span("llm_gateway.generate"), llm_call_context(
+                request.task_type, deadline
+            ):
+                llm_output = await self.llm_gateway.agenerate(
+                    assembled.text, request.options
+                )
+        except LLMError as exc:
+            return self._llm_failed(retrieved, snapshot, assembled, exc, trace)
+
+        with trace.span("quality_tools"):
+            quality_report = await self._arun_quality_tools(
+                llm_output, trace, request.task_type
+            )
+
+        await asyncio.to_thread(self._cache_put, key, llm_output, quality_report, trace)
+        return self._response(
+            retrieved, snapshot, assembled, llm_output, quality_report, trace
+        )
+
+    async def astream(
+        self, request: RunRequest, trace: Trace | None = None
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """Run the pipeline, yielding ``(event, data)`` pairs as each stage finishes.
+
+        Events in order: ``context``, ``memory``, one ``token`` per LLM delta, one
+        ``tool`` per quality check (the syntax gate and skipped tools first, then
+        the others in completion order), then ``done`` with the full
+        ``RunResponse``. If the LLM call fails, every tool is reported as skipped
+        and ``done`` carries the ``[LLM ERROR]`` output. Raises ``ValueError``
+        before the first event for unknown task types.
+        """
+        trace = trace or start_trace()
+        deadline = _deadline(request)
+        prompt, retrieved, snapshot, assembled = await asyncio.to_thread(
+            self._prepare, request, trace
+        )
+        yield "context", {"retrieved_context": retrieved}
+        yield "memory", {"memory_snapshot": snapshot.summary}
 
+        key = self._cache_key(request, prompt, assembled)
+        cached = await asyncio.to_thread(self._cache_get, key, trace)
+        if cached is not None:
+            llm_output, quality_report = cached
+            yield "token", {"delta": llm_output}
+            if quality_report.syntax is not None:
+                yield "tool", {"name": "syntax", "result": quality_report.syntax}
+            for name in QUALITY_TOOLS:
+                yield "tool", {"name": name, "result": getattr(quality_report, name)}
+            response = self._response(
+                retrieved, snapshot, assembled, *cached, trace, cache_hit=True
+            )
+            yield "done", response
+            return
+
+        async def run_named(
+            name: str, payload: Dict[str, str]
+        ) -> Tuple[str, Dict[str, Any]]:
+            return name, await self._arun_tool(name, payload, trace)
+
+        def start_early(early_payload: Dict[str, str]) -> Dict[str, asyncio.Task]:
+            names = self.quality_graph.early_tools(
+                request.task_type, early_payload["code"]
+            )
+            return {
+                name: asyncio.create_task(run_named(name, early_payload))
+                for name in names
+            }
+
+        # Tools gated only on syntax (lint) start as soon as the first fenced
+        # block closes, overlapping the rest of the generation. Their results
+        # are kept only if the final payload turns out to be that block alone.
+        parser = FencedBlockParser()
+        early: Dict[str, asyncio.Task] = {}
+        early_payload: Dict[str, str] = {}
+        tasks: list[asyncio.Task] = []
+        parts: list[str] = []
+        try:
+            try:
+                with trace.span("llm_gateway.generate"), llm_call_context(
+                    request.task_type, deadline
+                ):
+                    stream = self.llm_gateway.astream(assembled.text, request.options)
+                    async for delta in stream:
+                        parts.append(delta)
+                        yield "token", {"delta": delta}
+                        if not parser.blocks and parser.feed(delta):
+                            early_payload = {"code": parser.blocks[0], "tests": ""}
+                            early = start_early(early_payload)
+            except LLMError as exc:
+                # Partial tokens may already be out; the run itself failed.
+                llm_output = f"[LLM ERROR] {exc}"
+                payload, plan = {}, skip_all("LLM call failed")
+            else:
+                llm_output = "".join(parts)
+                payload, plan = self._plan(llm_output, request.task_type)
+
+            yield "tool", {"name": "syntax", "result": plan.syntax}
+            results: Dict[str, Dict[str, Any]] = dict(plan.skipped)
+            for name, result in plan.skipped.items():
+                yield "tool", {"name": name, "result": result}
+
+            if payload != early_payload:
+                for task in early.values():
+                    task.cancel()
+                early = {}
+
+            with trace.span("quality_tools"):
+                tasks = [
+                    early.pop(name, None)
+                    or asyncio.create_task(run_named(name, payload))
+                    for name in plan.run
+                ]
+                for next_done in asyncio.as_completed(tasks):
+                    name, result = await next_done
+                    results[name] = result
+                    yield "tool", {"name": name, "result": result}
+        finally:
+            for task in [*tasks, *early.values()]:
+                task.cancel()
+
+        quality_report = QualityReport(syntax=plan.syntax, **results)
+        await asyncio.to_thread(self._cache_put, key, llm_output, quality_report, trace)
+        yield "done", self._response(
+            retrieved, snapshot, assembled, llm_output, quality_report, trace
+        )
+
+    def _response(
+        self,
+        retrieved: list[str],
+        snapshot: MemorySnapshot,
+        assembled: BudgetedPrompt,
+        llm_output: str,
+        quality_report: QualityReport,
+        trace: Trace,
+        cache_hit: bool = False,
+    ) -> RunResponse:
         return RunResponse(
             llm_output=llm_output,
             memory_snapshot=snapshot.summary,
             retrieved_context=retrieved,
             quality_report=quality_report,
+            prompt_tokens_dropped=assembled.dropped_tokens,
+            cache_hit=cache_hit,
+            stage_timings=trace.timings,
+        )
+
+    def _llm_failed(
+        self,
+        retrieved: list[str],
+        snapshot: MemorySnapshot,
+        assembled: BudgetedPrompt,
+        exc: LLMError,
+        trace: Trace,
+    ) -> RunResponse:
+        # There is no code to check, so every quality tool is reported as skipped.
+        plan = skip_all("LLM call failed")
+        quality_report = QualityReport(syntax=plan.syntax, **plan.skipped)
+        llm_output = f"[LLM ERROR] {exc}"
+        return self._response(
+            retrieved, snapshot, assembled, llm_output, quality_report, trace
+        )
+
+    def _cache_key(
+        self, request: RunRequest, prompt: PromptTemplate, assembled: BudgetedPrompt
+    ) -> str | None:
+        if self.run_cache is None or not cache_enabled_for(request.options):
+            return None
+        return cache_key(
+            prompt.type,
+            prompt.version,
+            assembled.text,
+            request.options,
+            f"{settings.llm_provider}:{settings.llm_model}",
+            settings.llm_temperature,
+        )
+
+    def _cache_get(
+        self, key: str | None, trace: Trace
+    ) -> tuple[str, QualityReport] | None:
+        if key is None:
+            return None
+        with trace.span("run_cache.get"):
+            return self.run_cache.get(key)
+
+    def _cache_put(
+        self,
+        key: str | None,
+        llm_output: str,
+        quality_report: QualityReport,
+        trace: Trace,
+    ) -> None:
+        # LLM failures and tool errors/timeouts are transient; only cache clean runs.
+        if key is None or llm_output.startswith("[LLM ERROR]"):
+            return
+        if any(
+            getattr(quality_report, name).get("status") == "error"
+            for name in QUALITY_TOOLS
+        ):
+            return
+        with trace.span("run_cache.put"):
+            self.run_cache.put(key, llm_output, quality_report)
+
+    def _prepare(
+        self,
+        request: RunRequest,
+        trace: Trace,
+        retrieval_cache: Dict[str, list[str]] | None = None,
+    ) -> tuple[PromptTemplate, list[str], MemorySnapshot, BudgetedPrompt]:
+        with trace.span("prompt_registry.get"):
+            prompt = self.prompt_registry.get(request.task_type, "v1")
+        if not prompt:
+            raise ValueError(f"Prompt not found for type={request.task_type}")
+
+        retrieved = None
+        if retrieval_cache is not None:
+            retrieved = retrieval_cache.get(request.user_input)
+        if retrieved is None:
+            with trace.span("rag_retriever.retrieve"):
+                retrieved = self.rag_retriever.retrieve(
+                    request.user_input, k=settings.top_k
+                )
+            if retrieval_cache is not None:
+                retrieval_cache[request.user_input] = retrieved
+        with trace.span("memory_manager.update"):
+            snapshot = self.memory_manager.update(request.project_id, retrieved)
+
+        with trace.span("prompt.format"):
+            assembled = self.prompt_budgeter.assemble(
+                prompt, snapshot.summary, retrieved, request.user_input
+            )
+        return prompt, retrieved, snapshot, assembled
+
+    def _call_tool(
+        self, name: str, payload: Dict[str, Any], trace: Trace
+    ) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            with trace.span(f"mcp.{name}"):
+                return self.mcp_client.run_tool(name, payload)
+        finally:
+            MCP_TOOL_LATENCY.observe(time.perf_counter() - started, tool=name)
+
+    def _run_quality_tools(
+        self, code: str, trace: Trace | None = None, task_type: str | None = None
+    ) -> QualityReport:
+        trace = trace or Trace(sampled=False)
+        payload, plan = self._plan(code, task_type)
+        if self.mcp_client.batch and plan.run:
+            results = self._call_tools(plan.run, payload, trace)
+            return QualityReport(syntax=plan.syntax, **plan.skipped, **results)
+
+        # Tools run concurrently; each stops at its own timeout or the shared
+        # deadline, whichever comes first, so latency tracks the slowest tool.
+        started = time.monotonic()
+        deadline = started + self.quality_deadline_s
+        futures: Dict[Future, str] = {
+            self._tool_executor.submit(self._call_tool, name, payload, trace): name
+            for name in plan.run
+        }
+        tool_deadlines = {
+            name: min(deadline, started + self.mcp_client.timeout_for(name))
+            for name in plan.run
+        }
+        results: Dict[str, Dict[str, Any]] = dict(plan.skipped)
+        pending = set(futures)
+        while pending:
+            next_deadline = min(tool_deadlines[futures[f]] for f in pending)
+            done, pending = wait(
+                pending,
+                timeout=max(0.0, next_deadline - time.monotonic()),
+                return_when=FIRST_COMPLETED,
+            )
+            for future in done:
+                results[futures[future]] = _tool_result(future)
+            now = time.monotonic()
+            for future in list(pending):
+                name = futures[future]
+                if now >= tool_deadlines[name]:
+                    future.cancel()
+                    pending.discard(future)
+                    results[name] = _timed_out(tool_deadlines[name] - started)
+                    MCP_TOOL_TIMEOUTS.inc(tool=name)
+        return QualityReport(syntax=plan.syntax, **results)
+
+    async def _arun_quality_tools(
+        self, code: str, trace: Trace | None = None, task_type: str | None = None
+    ) -> QualityReport:
+        trace = trace or Trace(sampled=False)
+        payload, plan = self._plan(code, task_type)
+        if self.mcp_client.batch and plan.run:
+            batched = await self._acall_tools(plan.run, payload, trace)
+            return QualityReport(syntax=plan.syntax, **plan.skipped, **batched)
+        results = await asyncio.gather(
+            *(self._arun_tool(name, payload, trace) for name in plan.run)
+        )
+        return QualityReport(
+            syntax=plan.syntax, **plan.skipped, **dict(zip(plan.run, results))
         )
 
-    def _run_quality_tools(self, code: str) -> QualityReport:
+    async def _arun_tool(
+        self, name: str, payload: Dict[str, Any], trace: Trace
+    ) -> Dict[str, Any]:
+        # All tools start together, so the shared deadline caps each timeout.
+        timeout_s = min(self.mcp_client.timeout_for(name), self.quality_deadline_s)
+        started = time.perf_counter()
+        try:
+            with trace.span(f"mcp.{name}"):
+                return await asyncio.wait_for(
+                    self.mcp_client.arun_tool(name, payload), timeout=timeout_s
+                )
+        except asyncio.TimeoutError:
+            MCP_TOOL_TIMEOUTS.inc(tool=name)
+            return _timed_out(timeout_s)
+        except Exception as exc:  # noqa: BLE001 - surface as a structured tool error
+            return _failed(exc)
+        finally:
+            MCP_TOOL_LATENCY.observe(time.perf_counter() - started, tool=name)
+
+    def _call_tools(
+        self, names: Tuple[str, ...], payload: Dict[str, Any], trace: Trace
+    ) -> Dict[str, Dict[str, Any]]:
+        # One request uploads the payload once; the server runs the tools
+        # concurrently and enforces the same per-tool limits as the
+        # unbatched path.
+        started = time.perf_counter()
+        try:
+            with trace.span("mcp.batch"):
+                results = self.mcp_client.run_tools(
+                    list(names), payload, self._tool_limits(names)
+                )
+        finally:
+            _observe_batch(names, time.perf_counter() - started)
+        return _count_timeouts(results)
+
+    async def _acall_tools(
+        self, names: Tuple[str, ...], payload: Dict[str, Any], trace: Trace
+    ) -> Dict[str, Dict[str, Any]]:
+        started = time.perf_counter()
+        try:
+            with trace.span("mcp.batch"):
+                results = await self.mcp_client.arun_tools(
+                    list(names), payload, self._tool_limits(names)
+                )
+        finally:
+            _observe_batch(names, time.perf_counter() - started)
+        return _count_timeouts(results)
+
+    def _tool_limits(self, names: Tuple[str, ...]) -> Dict[str, float]:
+        return {
+            name: min(self.mcp_client.timeout_for(name), self.quality_deadline_s)
+            for name in names
+        }
+
+    def _plan(
+        self, code: str, task_type: str | None
+    ) -> tuple[Dict[str, str], QualityPlan]:
         extracted_code, extracted_tests = self._extract_code_blocks(code)
         payload = {"code": extracted_code, "tests": extracted_tests}
-        lint = self.mcp_client.run_tool("lint", payload)
-        test = self.mcp_client.run_tool("test", payload)
-        coverage = self.mcp_client.run_tool("coverage", payload)
-        return QualityReport(lint=lint, test=test, coverage=coverage)
+        return payload, self.quality_graph.plan(
+            task_type, extracted_code, extracted_tests
+        )
 
     def _extract_code_blocks(self, text: str) -> tuple[str, str]:
-        import re
-
-        blocks = re.findall(r"```(?:[a-zA-Z]+)?\s*(.*?)```", text, re.DOTALL)
+        blocks = extract_fenced_blocks(text)
         if not blocks:
             return text, ""
-        code = blocks[0].strip()
-        tests = blocks[1].strip() if len(blocks) > 1 else ""
+        code = blocks[0]
+        tests = blocks[1] if len(blocks) > 1 else ""
         return code, tests
+
+
+def _deadline(request: RunRequest) -> float | None:
+    # options={"deadline_s": N} bounds how long the run may queue for the LLM.
+    budget_s = (request.options or {}).get(DEADLINE_OPTION)
+    return time.monotonic() + float(budget_s) if budget_s else None
+
+
+def _tool_result(future: Future) -> Dict[str, Any]:
+    try:
+        return future.result()
+    except Exception as exc:  # noqa: BLE001 - surface as a structured tool error
+        return _failed(exc)
+
+
+def _failed(exc: Exception) -> Dict[str, Any]:
+    return {
+        "status": "error",
+        "detail": {"message": "tool call failed", "error": str(exc)},
+    }
+
+
+def _observe_batch(names: Tuple[str, ...], elapsed_s: float) -> None:
+    # Every tool in a batch is answered together, so each sees the batch latency.
+    for name in names:
+        MCP_TOOL_LATENCY.observe(elapsed_s, tool=name)
+
+
+def _count_timeouts(results: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    for name, result in results.items():
+        if result.get("detail", {}).get("message") == "tool timed out":
+            MCP_TOOL_TIMEOUTS.inc(tool=name)
+    return results
+
+
+def _timed_out(timeout_s: float) -> Dict[str, Any]:
+    return {
+        "status": "error",
+        "detail": {"message": "tool timed out", "timeout_s": round(timeout_s, 3)},
+    }
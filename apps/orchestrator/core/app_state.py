@@ -4,9 +4,14 @@ from .rag_retriever import RAGRetriever
 from .memory_manager import MemoryManager
 from .llm_gateway import LLMGateway
 from .mcp_client import MCPClient
+from .admission import AdmissionController
 from .agent_loop import AgentLoop
+from .job_queue import JobQueue
+from .run_cache import RunCache
+from .metrics import cache_hit_ratio, registry
 from ..storage.vector_db import VectorDB
 from ..storage.run_store import RunStore
+from ..storage.job_store import JobStore
 from ..config import settings
 
 vector_db = VectorDB(settings.vector_db_path)
@@ -14,10 +19,129 @@ prompt_registry = PromptRegistry()
 rag_retriever = RAGRetriever(vector_db)
 memory_manager = MemoryManager(top_k=settings.top_k)
 llm_gateway = LLMGateway()
-mcp_client = MCPClient(settings.mcp_server_url, timeout_s=settings.mcp_timeout_s)
-run_store = RunStore(path=settings.run_store_path, limit=settings.run_store_limit)
+mcp_client = MCPClient(
+    settings.mcp_server_url,
+    timeout_s=settings.mcp_timeout_s,
+    tool_timeouts=settings.mcp_tool_timeouts_s,
+    pool_size=settings.mcp_pool_size,
+    pool_idle_timeout_s=settings.mcp_pool_idle_timeout_s,
+    batch=settings.mcp_batch_tools,
+    inproc_workers=settings.mcp_inproc_workers,
+)
+run_store = RunStore(
+    path=settings.run_store_path,
+    limit=settings.run_store_limit,
+    compression=settings.run_store_compression,
+)
+run_cache = (
+    RunCache(
+        settings.run_cache_path,
+        ttl_s=settings.run_cache_ttl_s,
+        max_bytes=settings.run_cache_max_bytes,
+    )
+    if settings.run_cache_enabled
+    else None
+)
 agent_loop = AgentLoop(
-    prompt_registry, rag_retriever, memory_manager, llm_gateway, mcp_client
+    prompt_registry,
+    rag_retriever,
+    memory_manager,
+    llm_gateway,
+    mcp_client,
+    run_cache=run_cache,
+)
+admission = AdmissionController(
+    max_in_flight=settings.admission_max_in_flight,
+    max_queue=settings.admission_max_queue,
+    retry_after_s=settings.admission_retry_after_s,
+)
+job_queue = JobQueue(
+    JobStore(settings.job_store_path),
+    agent_loop,
+    run_store,
+    workers=settings.job_workers,
+    priorities=settings.job_priorities,
+    max_attempts=settings.job_max_attempts,
+)
+
+
+def _llm_pool_stats() -> list[dict[str, int]]:
+    # Sync calls and async calls keep separate pools per origin.
+    return [*llm_gateway.pool_stats().values(), *llm_gateway.apool_stats().values()]
+
+
+registry.callback_gauge(
+    "orchestrator_run_store_records",
+    "Runs retained in the run store.",
+    lambda: len(run_store),
+)
+registry.callback_gauge(
+    "orchestrator_vector_db_rows",
+    "Chunks indexed in the vector DB.",
+    lambda: len(vector_db),
+)
+registry.callback_gauge(
+    "orchestrator_memory_projects_loaded",
+    "Project memory states held in memory.",
+    lambda: len(memory_manager),
+)
+registry.callback_gauge(
+    "orchestrator_jobs_queued",
+    "Jobs waiting for a worker.",
+    lambda: job_queue.store.count("queued"),
+)
+registry.callback_gauge(
+    "orchestrator_admission_in_flight",
+    "Runs holding an admission slot.",
+    lambda: admission.in_flight,
+)
+registry.callback_gauge(
+    "orchestrator_admission_queued",
+    "Runs waiting for an admission slot.",
+    lambda: admission.queued,
+)
+registry.callback_gauge(
+    "orchestrator_run_cache_hit_ratio",
+    "Share of run cache lookups that returned a stored result.",
+    lambda: cache_hit_ratio("run_result"),
+)
+registry.callback_gauge(
+    "orchestrator_run_cache_bytes",
+    "Bytes held by the run result cache.",
+    lambda: run_cache.size_bytes if run_cache else 0,
+)
+registry.callback_gauge(
+    "orchestrator_llm_pool_idle_connections",
+    "Idle keep-alive connections held for LLM calls.",
+    lambda: sum(stats["idle"] for stats in _llm_pool_stats()),
+)
+registry.callback_gauge(
+    "orchestrator_llm_pool_connections_opened",
+    "Connections opened for LLM calls since start.",
+    lambda: sum(stats["created"] for stats in _llm_pool_stats()),
+)
+registry.callback_gauge(
+    "orchestrator_mcp_pool_connections_opened",
+    "Connections opened to the MCP server since start.",
+    lambda: sum(
+        stats.get("created", 0)
+        for stats in (mcp_client.pool_stats(), mcp_client.apool_stats())
+    ),
+)
+registry.callback_gauge(
+    "orchestrator_llm_circuit_open",
+    "1 while the LLM circuit breaker is failing calls fast.",
+    lambda: llm_gateway.breaker.state == "open",
+)
+registry.callback_gauge(
+    "orchestrator_llm_rate_limit_queued",
+    "LLM calls waiting for client-side rate limit capacity.",
+    lambda: llm_gateway.scheduler.queued if llm_gateway.scheduler else 0,
+)
+registry.callback_gauge(
+    "orchestrator_memory_cache_hit_ratio",
+    "Share of memory state loads served from the in-process cache.",
+    lambda: cache_hit_ratio("memory_state"),
 )
 
 
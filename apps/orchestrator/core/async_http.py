@@ -0,0 +1,375 @@
+import asyncio
+import ssl
+import threading
+import time
+from typing import AsyncIterator, Callable, Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import SplitResult, urlsplit
+
+_MAX_LINE = 64 * 1024
+
+# Errors that mean a pooled connection went stale (server closed it while idle)
+# before our request was answered; the request is retried once on a fresh one.
+_STALE_ERRORS = (ConnectionError, asyncio.IncompleteReadError)
+
+_Streams = Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+
+class AsyncHTTPResponse:
+    """Response whose headers have been read; the body is consumed on demand."""
+
+    def __init__(
+        self,
+        status: int,
+        reason: str,
+        headers: Dict[str, str],
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        on_close: Optional[Callable[[Optional[_Streams]], None]] = None,
+    ) -> None:
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self._reader = reader
+        self._writer = writer
+        # Pool hook: called with the streams when they can be reused, else None.
+        self._on_close = on_close
+        # Set once the body was read to its framed end, leaving the connection
+        # positioned at the next response.
+        self._complete = False
+
+    async def iter_chunks(self) -> AsyncIterator[bytes]:
+        if self.headers.get("transfer-encoding", "").lower() == "chunked":
+            while True:
+                size_line = await self._reader.readline()
+                if not size_line:
+                    raise ConnectionError("connection closed inside chunked body")
+                size = int(size_line.split(b";", 1)[0].strip() or b"0", 16)
+                if size == 0:
+                    # Drain optional trailers up to the terminating blank line.
+                    while (await self._reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass
+                    self._complete = True
+                    return
+                data = await self._reader.readexactly(size)
+                await self._reader.readexactly(2)
+                yield data
+        elif "content-length" in self.headers:
+            remaining = int(self.headers["content-length"])
+            while remaining > 0:
+                data = await self._reader.read(min(remaining, 65536))
+                if not data:
+                    raise ConnectionError("connection closed before body was complete")
+                remaining -= len(data)
+                yield data
+            self._complete = True
+        else:
+            while True:
+                data = await self._reader.read(65536)
+                if not data:
+                    return
+                yield data
+
+    async def iter_lines(self) -> AsyncIterator[bytes]:
+        buffer = b""
+        async for chunk in self.iter_chunks():
+            buffer += chunk
+            while True:
+                idx = buffer.find(b"\n")
+                if idx < 0:
+                    break
+                line, buffer = buffer[: idx + 1], buffer[idx + 1 :]
+                yield line
+        if buffer:
+            yield buffer
+
+    async def read(self) -> bytes:
+        return b"".join([chunk async for chunk in self.iter_chunks()])
+
+    async def close(self) -> None:
+        """Return a fully read keep-alive connection to its pool, else close it."""
+        on_close, self._on_close = self._on_close, None
+        reusable = (
+            self._complete and self.headers.get("connection", "").lower() != "close"
+        )
+        if on_close is not None and reusable:
+            on_close((self._reader, self._writer))
+            return
+        self._writer.close()
+        try:
+            await self._writer.wait_closed()
+        except (ConnectionError, ssl.SSLError):
+            pass
+        if on_close is not None:
+            on_close(None)
+
+
+class _IdleConnection(NamedTuple):
+    reader: asyncio.StreamReader
+    writer: asyncio.StreamWriter
+    loop: asyncio.AbstractEventLoop
+    last_used: float
+
+
+class AsyncConnectionPool:
+    """Pool of keep-alive HTTP/1.1 connections over asyncio streams to one origin.
+
+    The asyncio counterpart of ``HTTPConnectionPool``: up to ``max_size`` idle
+    connections are kept, a response read to the end hands its connection
+    back, connections idle longer than ``idle_timeout_s`` are discarded, and a
+    request on a stale reused connection is retried once on a fresh one.
+    Streams belong to the event loop that opened them, so idle connections are
+    only reused on that loop; those left over from a closed loop are dropped.
+    """
+
+    def __init__(
+        self, base_url: str, max_size: int = 8, idle_timeout_s: float = 60.0
+    ) -> None:
+        self._parts = _split_url(base_url)
+        self._ssl = (
+            ssl.create_default_context() if self._parts.scheme == "https" else None
+        )
+        self.max_size = max_size
+        self.idle_timeout_s = idle_timeout_s
+        # Guards synchronous bookkeeping only, so loops in different threads
+        # may share a pool.
+        self._lock = threading.Lock()
+        # Most recently used last.
+        self._idle: List[_IdleConnection] = []
+        self._in_use = 0
+        self._created = 0
+        self._reused = 0
+        self._reconnects = 0
+        self._expired = 0
+
+    async def open_request(
+        self,
+        method: str,
+        target: str,
+        body: Optional[bytes] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> AsyncHTTPResponse:
+        """Send a request for ``target`` (path and query) and read the response head.
+
+        The caller must ``close()`` the response; its connection goes back to
+        the pool only if the body was read to the end.
+        """
+        streams, reused = self._acquire()
+        try:
+            if streams is None:
+                streams = await self._connect()
+            try:
+                head = await _exchange(
+                    streams, method, target, self._parts, body, headers
+                )
+            except _STALE_ERRORS:
+                _close_quietly(streams[1])
+                if not reused:
+                    raise
+                with self._lock:
+                    self._reconnects += 1
+                streams = await self._connect()
+                head = await _exchange(
+                    streams, method, target, self._parts, body, headers
+                )
+        except BaseException:
+            if streams is not None:
+                _close_quietly(streams[1])
+            self._release(None)
+            raise
+        return AsyncHTTPResponse(*head, *streams, on_close=self._release)
+
+    async def request(
+        self,
+        method: str,
+        target: str,
+        body: Optional[bytes] = None,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: float = 30.0,
+    ) -> Tuple[int, bytes]:
+        """Perform a request and return (status, body) within ``timeout`` seconds."""
+
+        async def _do() -> Tuple[int, bytes]:
+            resp = await self.open_request(method, target, body=body, headers=headers)
+            try:
+                return resp.status, await resp.read()
+            finally:
+                await resp.close()
+
+        return await asyncio.wait_for(_do(), timeout=timeout)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "max_size": self.max_size,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "created": self._created,
+                "reused": self._reused,
+                "reconnects": self._reconnects,
+                "expired": self._expired,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for entry in idle:
+            _close_quietly(entry.writer)
+
+    def _acquire(self) -> Tuple[Optional[_Streams], bool]:
+        loop = asyncio.get_running_loop()
+        now = time.monotonic()
+        expired: List[_IdleConnection] = []
+        found = None
+        with self._lock:
+            self._in_use += 1
+            for index in range(len(self._idle) - 1, -1, -1):
+                entry = self._idle[index]
+                if entry.loop is not loop and not entry.loop.is_closed():
+                    continue
+                del self._idle[index]
+                if (
+                    entry.loop is not loop
+                    or now - entry.last_used > self.idle_timeout_s
+                    or entry.reader.at_eof()
+                ):
+                    expired.append(entry)
+                    self._expired += 1
+                    continue
+                found = entry
+                self._reused += 1
+                break
+        for entry in expired:
+            _close_quietly(entry.writer)
+        if found is None:
+            return None, False
+        return (found.reader, found.writer), True
+
+    async def _connect(self) -> _Streams:
+        with self._lock:
+            self._created += 1
+        return await _open(self._parts, self._ssl)
+
+    def _release(self, streams: Optional[_Streams]) -> None:
+        with self._lock:
+            self._in_use -= 1
+            if streams is not None and len(self._idle) < self.max_size:
+                loop = asyncio.get_running_loop()
+                self._idle.append(_IdleConnection(*streams, loop, time.monotonic()))
+                return
+        if streams is not None:
+            _close_quietly(streams[1])
+
+
+async def open_request(
+    method: str,
+    url: str,
+    body: Optional[bytes] = None,
+    headers: Optional[Dict[str, str]] = None,
+) -> AsyncHTTPResponse:
+    """Send a one-off request on a new connection and read the response head.
+
+    The request carries ``Connection: close``; callers making repeated requests
+    to one origin should use an ``AsyncConnectionPool``.
+    """
+    parts = _split_url(url)
+    ssl_ctx = ssl.create_default_context() if parts.scheme == "https" else None
+    streams = await _open(parts, ssl_ctx)
+    target = parts.path or "/"
+    if parts.query:
+        target = f"{target}?{parts.query}"
+    try:
+        head = await _exchange(
+            streams,
+            method,
+            target,
+            parts,
+            body,
+            {**(headers or {}), "Connection": "close"},
+        )
+    except BaseException:
+        streams[1].close()
+        raise
+    return AsyncHTTPResponse(*head, *streams)
+
+
+async def request(
+    method: str,
+    url: str,
+    body: Optional[bytes] = None,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: float = 30.0,
+) -> Tuple[int, bytes]:
+    """Perform a one-off request; return (status, body) within ``timeout`` seconds."""
+
+    async def _do() -> Tuple[int, bytes]:
+        resp = await open_request(method, url, body=body, headers=headers)
+        try:
+            return resp.status, await resp.read()
+        finally:
+            await resp.close()
+
+    return await asyncio.wait_for(_do(), timeout=timeout)
+
+
+def _split_url(url: str) -> SplitResult:
+    parts = urlsplit(url)
+    if parts.scheme not in {"http", "https"}:
+        raise ValueError(f"Unsupported URL scheme: {parts.scheme}")
+    return parts
+
+
+async def _open(parts: SplitResult, ssl_ctx: Optional[ssl.SSLContext]) -> _Streams:
+    host = parts.hostname or "localhost"
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    return await asyncio.open_connection(
+        host,
+        port,
+        ssl=ssl_ctx,
+        server_hostname=host if ssl_ctx else None,
+        limit=_MAX_LINE,
+    )
+
+
+async def _exchange(
+    streams: _Streams,
+    method: str,
+    target: str,
+    parts: SplitResult,
+    body: Optional[bytes],
+    headers: Optional[Dict[str, str]],
+) -> Tuple[int, str, Dict[str, str]]:
+    reader, writer = streams
+    lines = [f"{method} {target} HTTP/1.1", f"Host: {parts.netloc}"]
+    for key, value in (headers or {}).items():
+        lines.append(f"{key}: {value}")
+    lines.append(f"Content-Length: {len(body or b'')}")
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + (body or b""))
+    await writer.drain()
+    return await _read_head(reader)
+
+
+def _close_quietly(writer: asyncio.StreamWriter) -> None:
+    # The transport of a loop that has since closed can no longer schedule its close.
+    try:
+        writer.close()
+    except RuntimeError:
+        pass
+
+
+async def _read_head(reader: asyncio.StreamReader) -> Tuple[int, str, Dict[str, str]]:
+    status_line = (await reader.readline()).decode("latin-1").strip()
+    if not status_line:
+        raise ConnectionError("empty response from server")
+    parts = status_line.split(" ", 2)
+    if len(parts) < 2 or not parts[0].startswith("HTTP/"):
+        raise ConnectionError(f"malformed status line: {status_line!r}")
+    status = int(parts[1])
+    reason = parts[2] if len(parts) > 2 else ""
+    headers: Dict[str, str] = {}
+    while True:
+        line = (await reader.readline()).decode("latin-1")
+        if line in ("\r\n", "\n", ""):
+            break
+        key, _, value = line.partition(":")
+        headers[key.strip().lower()] = value.strip()
+    return status, reason, headers
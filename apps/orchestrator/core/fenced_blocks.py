@@ -0,0 +1,54 @@
+import re
+from typing import List
+
+FENCE = "```"
+_LANGUAGE = re.compile(r"[a-zA-Z]+")
+
+
+class FencedBlockParser:
+    """Extracts ``` fenced blocks from text that arrives in pieces.
+
+    ``feed`` returns the blocks completed by that piece, so callers can act on
+    the first block as soon as its closing fence streams in. A leading language
+    tag is dropped and the content stripped; an unclosed trailing block is
+    ignored.
+    """
+
+    def __init__(self) -> None:
+        self.blocks: List[str] = []
+        self._buffer = ""
+        self._in_block = False
+        self._scan_from = 0
+
+    def feed(self, text: str) -> List[str]:
+        self._buffer += text
+        completed: List[str] = []
+        while True:
+            idx = self._buffer.find(FENCE, self._scan_from)
+            if idx < 0:
+                break
+            if self._in_block:
+                block = _clean(self._buffer[:idx])
+                self.blocks.append(block)
+                completed.append(block)
+            self._buffer = self._buffer[idx + len(FENCE) :]
+            self._in_block = not self._in_block
+            self._scan_from = 0
+        if not self._in_block:
+            # Outside a block only a possible partial fence needs keeping.
+            self._buffer = self._buffer[-(len(FENCE) - 1) :]
+        self._scan_from = max(0, len(self._buffer) - (len(FENCE) - 1))
+        return completed
+
+
+def extract_fenced_blocks(text: str) -> List[str]:
+    parser = FencedBlockParser()
+    parser.feed(text)
+    return parser.blocks
+
+
+def _clean(raw: str) -> str:
+    match = _LANGUAGE.match(raw)
+    if match:
+        raw = raw[match.end() :]
+    return raw.strip()
@@ -0,0 +1,190 @@
+import http.client
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+# Errors that mean a pooled connection went stale (server closed it while idle)
+# before our request was read; the request is retried once on a fresh one.
+_STALE_ERRORS = (
+    BrokenPipeError,
+    ConnectionResetError,
+    ConnectionAbortedError,
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+)
+
+
+class HTTPConnectionPool:
+    """Thread-safe pool of persistent ``http.client`` connections to one origin.
+
+    Up to ``max_size`` idle connections are kept; concurrent requests beyond
+    that open extra connections that are closed after use. Connections idle
+    longer than ``idle_timeout_s`` are discarded instead of reused.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        max_size: int = 8,
+        idle_timeout_s: float = 60.0,
+        timeout_s: float = 30.0,
+    ) -> None:
+        parts = urlsplit(base_url)
+        if parts.scheme not in {"http", "https"}:
+            raise ValueError(f"Unsupported URL scheme: {parts.scheme}")
+        self._scheme = parts.scheme
+        self._host = parts.hostname or "localhost"
+        self._port = parts.port
+        self.max_size = max_size
+        self.idle_timeout_s = idle_timeout_s
+        self.timeout_s = timeout_s
+        self._lock = threading.Lock()
+        # (connection, last_used) pairs; most recently used last.
+        self._idle: List[Tuple[http.client.HTTPConnection, float]] = []
+        self._in_use = 0
+        self._created = 0
+        self._reused = 0
+        self._reconnects = 0
+        self._expired = 0
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        body: Optional[bytes] = None,
+        headers: Optional[Dict[str, str]] = None,
+        timeout_s: Optional[float] = None,
+    ) -> Tuple[int, bytes]:
+        """Send a request and return ``(status, body)``; the body is read in full."""
+        with self.stream(method, path, body, headers, timeout_s) as resp:
+            return resp.status, resp.read()
+
+    @contextmanager
+    def stream(
+        self,
+        method: str,
+        path: str,
+        body: Optional[bytes] = None,
+        headers: Optional[Dict[str, str]] = None,
+        timeout_s: Optional[float] = None,
+    ) -> Iterator[http.client.HTTPResponse]:
+        """Send a request and yield the response with its body still unread.
+
+        ``timeout_s`` overrides the pool's socket timeout for this request. The
+        connection goes back to the pool only if the caller read the body to the
+        end; otherwise it is closed.
+        """
+        conn, resp = self._begin(method, path, body, headers, timeout_s)
+        try:
+            yield resp
+        except BaseException:
+            conn.close()
+            self._release(None)
+            raise
+        reusable = resp.isclosed() and not resp.will_close
+        if not reusable:
+            conn.close()
+        self._release(conn if reusable else None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "max_size": self.max_size,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "created": self._created,
+                "reused": self._reused,
+                "reconnects": self._reconnects,
+                "expired": self._expired,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _last_used in idle:
+            conn.close()
+
+    def _begin(
+        self,
+        method: str,
+        path: str,
+        body: Optional[bytes],
+        headers: Optional[Dict[str, str]],
+        timeout_s: Optional[float],
+    ) -> Tuple[http.client.HTTPConnection, http.client.HTTPResponse]:
+        timeout_s = self.timeout_s if timeout_s is None else timeout_s
+        conn, reused = self._acquire()
+        try:
+            try:
+                return conn, self._send(conn, method, path, body, headers, timeout_s)
+            except _STALE_ERRORS:
+                conn.close()
+                if not reused:
+                    raise
+                with self._lock:
+                    self._reconnects += 1
+                conn = self._connect()
+                return conn, self._send(conn, method, path, body, headers, timeout_s)
+        except BaseException:
+            conn.close()
+            self._release(None)
+            raise
+
+    @staticmethod
+    def _send(
+        conn: http.client.HTTPConnection,
+        method: str,
+        path: str,
+        body: Optional[bytes],
+        headers: Optional[Dict[str, str]],
+        timeout_s: float,
+    ) -> http.client.HTTPResponse:
+        # Applies to the connect of a new connection and to every socket read.
+        conn.timeout = timeout_s
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout_s)
+        conn.request(method, path, body=body, headers=headers or {})
+        return conn.getresponse()
+
+    def _acquire(self) -> Tuple[http.client.HTTPConnection, bool]:
+        now = time.monotonic()
+        expired: List[http.client.HTTPConnection] = []
+        conn = None
+        with self._lock:
+            self._in_use += 1
+            while self._idle:
+                candidate, last_used = self._idle.pop()
+                if now - last_used > self.idle_timeout_s:
+                    expired.append(candidate)
+                    self._expired += 1
+                    continue
+                conn = candidate
+                self._reused += 1
+                break
+        for stale in expired:
+            stale.close()
+        if conn is not None:
+            return conn, True
+        return self._connect(), False
+
+    def _connect(self) -> http.client.HTTPConnection:
+        with self._lock:
+            self._created += 1
+        if self._scheme == "https":
+            return http.client.HTTPSConnection(
+                self._host, self._port, timeout=self.timeout_s
+            )
+        return http.client.HTTPConnection(
+            self._host, self._port, timeout=self.timeout_s
+        )
+
+    def _release(self, conn: Optional[http.client.HTTPConnection]) -> None:
+        with self._lock:
+            self._in_use -= 1
+            if conn is not None and len(self._idle) < self.max_size:
+                self._idle.append((conn, time.monotonic()))
+                return
+        if conn is not None:
+            conn.close()
@@ -0,0 +1,114 @@
+import threading
+from datetime import datetime, timezone
+from time import perf_counter
+from typing import Dict, List
+from uuid import uuid4
+
+from ..models.job import Job
+from ..models.run import RunRequest
+from ..models.run_record import RunRecord
+from ..storage.job_store import JobStore
+from ..storage.run_store import RunStore
+from .agent_loop import AgentLoop
+from .tracing import Trace
+
+
+class JobQueue:
+    """Bounded worker pool draining a persistent ``JobStore`` through ``AgentLoop.run``.
+
+    A finished job's run record is stored under the job id, so ``/runs/{id}``
+    serves the result once the job has succeeded.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        agent_loop: AgentLoop,
+        run_store: RunStore,
+        workers: int = 2,
+        priorities: Dict[str, int] | None = None,
+        poll_interval_s: float = 1.0,
+        max_attempts: int = 3,
+    ) -> None:
+        self.store = store
+        self.agent_loop = agent_loop
+        self.run_store = run_store
+        self.workers = workers
+        self.priorities = priorities or {}
+        self.poll_interval_s = poll_interval_s
+        self.max_attempts = max_attempts
+        self._wakeup = threading.Condition()
+        self._stopping = False
+        self._threads: List[threading.Thread] = []
+
+    def submit(self, request: RunRequest) -> Job:
+        job = self.store.enqueue(
+            uuid4().hex, request, self.priorities.get(request.task_type, 0)
+        )
+        with self._wakeup:
+            self._wakeup.notify()
+        return job
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        # Jobs still marked running were interrupted by a previous shutdown.
+        self.store.requeue_running(self.max_attempts)
+        self._stopping = False
+        for index in range(self.workers):
+            thread = threading.Thread(
+                target=self._worker, name=f"job-worker-{index}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout_s: float | None = None) -> None:
+        """Stop claiming new jobs and wait for in-progress jobs to finish."""
+        with self._wakeup:
+            self._stopping = True
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout_s)
+        self._threads = []
+
+    def _worker(self) -> None:
+        while True:
+            with self._wakeup:
+                if self._stopping:
+                    return
+            claimed = self.store.claim()
+            if claimed is None:
+                with self._wakeup:
+                    if not self._stopping:
+                        self._wakeup.wait(self.poll_interval_s)
+                continue
+            self._execute(*claimed)
+
+    def _execute(self, job_id: str, request: RunRequest) -> None:
+        started = perf_counter()
+        trace = Trace(
+            listener=lambda stage, ms: self.store.record_progress(job_id, stage, ms)
+        )
+        try:
+            response = self.agent_loop.run(request, trace)
+            self.run_store.add(
+                RunRecord(
+                    id=job_id,
+                    task_type=request.task_type,
+                    project_id=request.project_id,
+                    user_input=request.user_input,
+                    llm_output=response.llm_output,
+                    memory_snapshot=response.memory_snapshot,
+                    retrieved_context=response.retrieved_context,
+                    quality_report=response.quality_report,
+                    created_at=datetime.now(timezone.utc),
+                    duration_ms=int((perf_counter() - started) * 1000),
+                    prompt_tokens_dropped=response.prompt_tokens_dropped,
+                    cache_hit=response.cache_hit,
+                    stage_timings=trace.timings,
+                )
+            )
+        except Exception as exc:  # noqa: BLE001 - a failed job must not kill the worker
+            self.store.fail(job_id, str(exc))
+            return
+        self.store.complete(job_id)
@@ -1,25 +1,512 @@
+import asyncio
+import hashlib
+import http.client
 import json
-from typing import Dict
-from urllib import request, error
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from time import perf_counter
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Tuple,
+)
+from urllib.parse import urlsplit
 
 from ..config import settings
+from . import async_http
+from .http_pool import HTTPConnectionPool
+from .llm_resilience import (
+    CircuitBreaker,
+    LatencyWindow,
+    LLMBadResponse,
+    LLMError,
+    LLMHTTPError,
+    LLMTimeout,
+    LLMUnavailable,
+    RetryPolicy,
+)
+from .llm_scheduler import LLMScheduler, current_call_context
+from .llm_simulator import LLMSimulator
+from .metrics import LLM_ERRORS, LLM_HEDGES, LLM_LATENCY, LLM_RETRIES
+from .prompt_budget import estimate_tokens
+from .single_flight import SingleFlight
+
+
+class _ProviderCalls(NamedTuple):
+    """Single-attempt calls for one provider; they raise ``LLMError`` on failure."""
+
+    generate: Callable[[str], str]
+    agenerate: Callable[[str], Awaitable[str]]
+    stream: Callable[[str], Iterator[str]]
+    astream: Callable[[str], AsyncIterator[str]]
 
 
 class LLMGateway:
+    """Calls the configured LLM provider; the stub provider echoes the prompt.
+
+    ``simulated`` answers offline through ``LLMSimulator`` with realistic
+    latency and injected errors, but otherwise takes the same path as Gemini.
+
+    Provider calls run behind a circuit breaker, are retried on retryable errors
+    with jittered backoff, and are hedged with a duplicate request once they
+    outlast the recent ``LLM_HEDGE_QUANTILE`` latency (first response wins, the
+    other is cancelled). Failures raise ``LLMError`` subclasses. Concurrent
+    non-streaming calls with the same model, temperature and prompt share one
+    provider call. Every attempt first waits for ``scheduler`` capacity, if
+    rate limits are configured.
+    """
+
+    def __init__(self) -> None:
+        self._pools: Dict[str, HTTPConnectionPool] = {}
+        self._apools: Dict[str, async_http.AsyncConnectionPool] = {}
+        self._pools_lock = threading.Lock()
+        self.retry = RetryPolicy(
+            settings.llm_max_retries,
+            base_delay_s=settings.llm_retry_base_delay_s,
+            max_delay_s=settings.llm_retry_max_delay_s,
+        )
+        self.breaker = CircuitBreaker(
+            settings.llm_breaker_failure_threshold, settings.llm_breaker_reset_timeout_s
+        )
+        self.latency = LatencyWindow(min_samples=settings.llm_hedge_min_samples)
+        self._hedge_executor = ThreadPoolExecutor(
+            max_workers=2 * settings.llm_pool_size, thread_name_prefix="llm-hedge"
+        )
+        self._single_flight = SingleFlight("llm")
+        self.scheduler: LLMScheduler | None = None
+        if settings.llm_requests_per_minute or settings.llm_tokens_per_minute:
+            self.scheduler = LLMScheduler(
+                settings.llm_requests_per_minute,
+                settings.llm_tokens_per_minute,
+                priorities=settings.llm_task_priorities,
+                burst_s=settings.llm_rate_burst_s,
+                max_wait_s=settings.llm_max_queue_wait_s,
+            )
+        self.simulator = LLMSimulator(
+            latency_p50_s=settings.llm_sim_latency_p50_s,
+            latency_p95_s=settings.llm_sim_latency_p95_s,
+            tokens_per_s=settings.llm_sim_tokens_per_s,
+            error_rate=settings.llm_sim_error_rate,
+            rate_limit_rate=settings.llm_sim_rate_limit_rate,
+            seed=settings.llm_sim_seed,
+        )
+
     def generate(self, prompt: str, options: Dict | None = None) -> str:
-        if settings.llm_provider == "stub" or not settings.llm_api_key:
+        if self._use_stub():
             return f"[LLM OUTPUT]\n{prompt}"[:4000]
 
-        if settings.llm_provider == "gemini":
-            return self._generate_gemini(prompt)
+        if settings.llm_provider in ("gemini", "simulated"):
+            generate_once = self._provider_calls().generate
+
+            def call() -> str:
+                with self._observed():
+                    return self._call(lambda: generate_once(prompt), prompt)
+
+            if not settings.llm_coalesce_enabled:
+                return call()
+            return self._single_flight.do(_flight_key(prompt), call)
 
         return f"[LLM OUTPUT]\n{prompt}"[:4000]
 
-    def _generate_gemini(self, prompt: str) -> str:
-        url = (
-            "https://generativelanguage.googleapis.com/v1beta/models/"
-            f"{settings.llm_model}:generateContent"
+    async def agenerate(self, prompt: str, options: Dict | None = None) -> str:
+        if self._use_stub():
+            return f"[LLM OUTPUT]\n{prompt}"[:4000]
+
+        if settings.llm_provider in ("gemini", "simulated"):
+            agenerate_once = self._provider_calls().agenerate
+
+            async def call() -> str:
+                with self._observed():
+                    return await self._acall(lambda: agenerate_once(prompt), prompt)
+
+            if not settings.llm_coalesce_enabled:
+                return await call()
+            return await self._single_flight.ado(_flight_key(prompt), call)
+
+        return f"[LLM OUTPUT]\n{prompt}"[:4000]
+
+    def generate_stream(
+        self, prompt: str, options: Dict | None = None
+    ) -> Iterator[str]:
+        """Yield the output as text deltas as the provider produces them."""
+        if self._use_stub():
+            for chunk in self._stub_chunks(prompt):
+                if settings.llm_stub_chunk_delay_s:
+                    time.sleep(settings.llm_stub_chunk_delay_s)
+                yield chunk
+            return
+
+        if settings.llm_provider in ("gemini", "simulated"):
+            stream_once = self._provider_calls().stream
+            with self._observed():
+                yield from self._stream_call(lambda: stream_once(prompt), prompt)
+            return
+
+        yield self.generate(prompt, options)
+
+    async def astream(
+        self, prompt: str, options: Dict | None = None
+    ) -> AsyncIterator[str]:
+        """Async variant of ``generate_stream``."""
+        if self._use_stub():
+            for chunk in self._stub_chunks(prompt):
+                if settings.llm_stub_chunk_delay_s:
+                    await asyncio.sleep(settings.llm_stub_chunk_delay_s)
+                yield chunk
+            return
+
+        if settings.llm_provider in ("gemini", "simulated"):
+            astream_once = self._provider_calls().astream
+            with self._observed():
+                stream = self._astream_call(lambda: astream_once(prompt), prompt)
+                async for delta in stream:
+                    yield delta
+            return
+
+        yield await self.agenerate(prompt, options)
+
+    @staticmethod
+    def _use_stub() -> bool:
+        # Gemini without an API key falls back to the stub; simulated needs none.
+        return settings.llm_provider == "stub" or (
+            settings.llm_provider == "gemini" and not settings.llm_api_key
         )
+
+    def _provider_calls(self) -> _ProviderCalls:
+        if settings.llm_provider == "simulated":
+            sim = self.simulator
+            return _ProviderCalls(sim.generate, sim.agenerate, sim.stream, sim.astream)
+        return _ProviderCalls(
+            self._generate_gemini,
+            self._agenerate_gemini,
+            self._stream_gemini,
+            self._astream_gemini,
+        )
+
+    @staticmethod
+    def _stub_chunks(prompt: str) -> List[str]:
+        output = f"[LLM OUTPUT]\n{prompt}"[:4000]
+        size = settings.llm_stub_chunk_chars
+        return [output[i : i + size] for i in range(0, len(output), size)]
+
+    @staticmethod
+    @contextmanager
+    def _observed() -> Iterator[None]:
+        started = perf_counter()
+        try:
+            yield
+        except LLMError:
+            LLM_ERRORS.inc(provider=settings.llm_provider)
+            raise
+        finally:
+            LLM_LATENCY.observe(
+                perf_counter() - started, provider=settings.llm_provider
+            )
+
+    def _call(self, attempt: Callable[[], str], prompt: str) -> str:
+        tokens = _reserved_tokens(prompt)
+        retries = 0
+        while True:
+            self.breaker.check()
+            self._acquire(tokens)
+            try:
+                text = self._hedged(attempt, tokens)
+            except LLMError as exc:
+                if not self._should_retry(exc, retries):
+                    raise
+                time.sleep(self.retry.delay(retries))
+                retries += 1
+                continue
+            self.breaker.record_success()
+            self._settle(tokens, prompt, text)
+            return text
+
+    async def _acall(self, attempt: Callable[[], Awaitable[str]], prompt: str) -> str:
+        tokens = _reserved_tokens(prompt)
+        retries = 0
+        while True:
+            self.breaker.check()
+            await self._aacquire(tokens)
+            try:
+                text = await self._ahedged(attempt, tokens)
+            except LLMError as exc:
+                if not self._should_retry(exc, retries):
+                    raise
+                await asyncio.sleep(self.retry.delay(retries))
+                retries += 1
+                continue
+            self.breaker.record_success()
+            self._settle(tokens, prompt, text)
+            return text
+
+    def _stream_call(
+        self, attempt: Callable[[], Iterator[str]], prompt: str
+    ) -> Iterator[str]:
+        # Streams are not hedged, and only retried while nothing has been yielded.
+        tokens = _reserved_tokens(prompt)
+        retries = 0
+        while True:
+            self.breaker.check()
+            self._acquire(tokens)
+            parts: List[str] = []
+            try:
+                for delta in attempt():
+                    parts.append(delta)
+                    yield delta
+            except LLMError as exc:
+                if parts or not self._should_retry(exc, retries):
+                    raise
+                time.sleep(self.retry.delay(retries))
+                retries += 1
+                continue
+            self.breaker.record_success()
+            self._settle(tokens, prompt, "".join(parts))
+            return
+
+    async def _astream_call(
+        self, attempt: Callable[[], AsyncIterator[str]], prompt: str
+    ) -> AsyncIterator[str]:
+        tokens = _reserved_tokens(prompt)
+        retries = 0
+        while True:
+            self.breaker.check()
+            await self._aacquire(tokens)
+            parts: List[str] = []
+            try:
+                async for delta in attempt():
+                    parts.append(delta)
+                    yield delta
+            except LLMError as exc:
+                if parts or not self._should_retry(exc, retries):
+                    raise
+                await asyncio.sleep(self.retry.delay(retries))
+                retries += 1
+                continue
+            self.breaker.record_success()
+            self._settle(tokens, prompt, "".join(parts))
+            return
+
+    def _acquire(self, tokens: int) -> None:
+        if self.scheduler is not None:
+            task_type, deadline = current_call_context()
+            self.scheduler.acquire(tokens, task_type, deadline)
+
+    async def _aacquire(self, tokens: int) -> None:
+        if self.scheduler is not None:
+            task_type, deadline = current_call_context()
+            await self.scheduler.aacquire(tokens, task_type, deadline)
+
+    def _settle(self, reserved: int, prompt: str, output: str) -> None:
+        if self.scheduler is not None:
+            self.scheduler.settle(
+                estimate_tokens(prompt) + estimate_tokens(output) - reserved
+            )
+
+    def _should_retry(self, exc: LLMError, retries: int) -> bool:
+        # Only provider-side failures count towards opening the breaker.
+        if exc.retryable:
+            self.breaker.record_failure()
+        if (
+            isinstance(exc, LLMHTTPError)
+            and exc.status == 429
+            and self.scheduler is not None
+        ):
+            self.scheduler.throttle()
+        if not self.retry.should_retry(exc, retries):
+            return False
+        LLM_RETRIES.inc(provider=settings.llm_provider)
+        return True
+
+    def _hedge_delay(self) -> float | None:
+        if not settings.llm_hedge_enabled:
+            return None
+        return self.latency.quantile(settings.llm_hedge_quantile)
+
+    def _may_hedge(self, tokens: int) -> bool:
+        # A duplicate request only goes out if it fits in spare quota right now.
+        return self.scheduler is None or self.scheduler.try_acquire(tokens)
+
+    def _hedged(self, attempt: Callable[[], str], tokens: int) -> str:
+        delay = self._hedge_delay()
+        if delay is None:
+            return self._timed(attempt)
+        pending = {self._hedge_executor.submit(self._timed, attempt)}
+        try:
+            done, pending = wait(pending, timeout=delay)
+            if not done and self._may_hedge(tokens):
+                LLM_HEDGES.inc(provider=settings.llm_provider)
+                pending.add(self._hedge_executor.submit(self._timed, attempt))
+            error: LLMError | None = None
+            while True:
+                for future in done:
+                    try:
+                        return future.result()
+                    except LLMError as exc:
+                        error = exc
+                if not pending:
+                    raise error  # type: ignore[misc]
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        finally:
+            # A blocking request already on the wire cannot be interrupted; its
+            # result is discarded and the connection goes back to the pool.
+            for future in pending:
+                future.cancel()
+
+    async def _ahedged(self, attempt: Callable[[], Awaitable[str]], tokens: int) -> str:
+        delay = self._hedge_delay()
+        if delay is None:
+            return await self._atimed(attempt)
+        pending = {asyncio.ensure_future(self._atimed(attempt))}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if not done and self._may_hedge(tokens):
+                LLM_HEDGES.inc(provider=settings.llm_provider)
+                pending.add(asyncio.ensure_future(self._atimed(attempt)))
+            error: LLMError | None = None
+            while True:
+                for task in done:
+                    try:
+                        return task.result()
+                    except LLMError as exc:
+                        error = exc
+                if not pending:
+                    raise error  # type: ignore[misc]
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _timed(self, attempt: Callable[[], str]) -> str:
+        started = perf_counter()
+        text = attempt()
+        self.latency.observe(perf_counter() - started)
+        return text
+
+    async def _atimed(self, attempt: Callable[[], Awaitable[str]]) -> str:
+        started = perf_counter()
+        text = await attempt()
+        self.latency.observe(perf_counter() - started)
+        return text
+
+    def pool_stats(self) -> Dict[str, Dict[str, int]]:
+        with self._pools_lock:
+            pools = dict(self._pools)
+        return {origin: pool.stats() for origin, pool in pools.items()}
+
+    def apool_stats(self) -> Dict[str, Dict[str, int]]:
+        """Stats of the asyncio connection pools used by ``agenerate``/``astream``."""
+        with self._pools_lock:
+            pools = dict(self._apools)
+        return {origin: pool.stats() for origin, pool in pools.items()}
+
+    def _pool(self, url: str) -> Tuple[HTTPConnectionPool, str]:
+        origin, target = _split_target(url)
+        with self._pools_lock:
+            pool = self._pools.get(origin)
+            if pool is None:
+                pool = self._pools[origin] = HTTPConnectionPool(
+                    origin,
+                    max_size=settings.llm_pool_size,
+                    idle_timeout_s=settings.llm_pool_idle_timeout_s,
+                    timeout_s=settings.llm_timeout_s,
+                )
+        return pool, target
+
+    def _apool(self, url: str) -> Tuple[async_http.AsyncConnectionPool, str]:
+        origin, target = _split_target(url)
+        with self._pools_lock:
+            pool = self._apools.get(origin)
+            if pool is None:
+                pool = self._apools[origin] = async_http.AsyncConnectionPool(
+                    origin,
+                    max_size=settings.llm_pool_size,
+                    idle_timeout_s=settings.llm_pool_idle_timeout_s,
+                )
+        return pool, target
+
+    def _generate_gemini(self, prompt: str) -> str:
+        url, body, headers = self._gemini_request(prompt)
+        pool, target = self._pool(url)
+        try:
+            status, raw = pool.request("POST", target, body, headers)
+        except (OSError, http.client.HTTPException) as exc:
+            raise _transport_error(exc) from exc
+        return self._parse_gemini_body(status, raw)
+
+    async def _agenerate_gemini(self, prompt: str) -> str:
+        url, body, headers = self._gemini_request(prompt)
+        pool, target = self._apool(url)
+        try:
+            status, raw = await pool.request(
+                "POST", target, body, headers, timeout=settings.llm_timeout_s
+            )
+        except Exception as exc:  # noqa: BLE001 - every transport failure becomes an LLMError
+            raise _transport_error(exc) from exc
+        return self._parse_gemini_body(status, raw)
+
+    async def _astream_gemini(self, prompt: str) -> AsyncIterator[str]:
+        url, body, headers = self._gemini_request(prompt, stream=True)
+        pool, target = self._apool(url)
+        timeout_s = settings.llm_timeout_s
+        try:
+            resp = await asyncio.wait_for(
+                pool.open_request("POST", target, body, headers), timeout=timeout_s
+            )
+        except Exception as exc:  # noqa: BLE001 - every transport failure becomes an LLMError
+            raise _transport_error(exc) from exc
+
+        try:
+            if resp.status >= 400:
+                raw = await asyncio.wait_for(resp.read(), timeout=timeout_s)
+                raise LLMHTTPError(resp.status, raw.decode("utf-8", errors="ignore"))
+            lines = resp.iter_lines()
+            while True:
+                try:
+                    line = await asyncio.wait_for(lines.__anext__(), timeout=timeout_s)
+                except StopAsyncIteration:
+                    return
+                text = self._parse_sse_line(line)
+                if text:
+                    yield text
+        except LLMError:
+            raise
+        except Exception as exc:  # noqa: BLE001 - every transport failure becomes an LLMError
+            raise _transport_error(exc) from exc
+        finally:
+            await resp.close()
+
+    def _stream_gemini(self, prompt: str) -> Iterator[str]:
+        url, body, headers = self._gemini_request(prompt, stream=True)
+        pool, target = self._pool(url)
+        try:
+            with pool.stream("POST", target, body, headers) as resp:
+                if resp.status >= 400:
+                    detail = resp.read().decode("utf-8", errors="ignore")
+                    raise LLMHTTPError(resp.status, detail)
+                # Lines are read as they arrive; the body is never buffered whole.
+                for line in resp:
+                    text = self._parse_sse_line(line)
+                    if text:
+                        yield text
+        except (OSError, http.client.HTTPException) as exc:
+            raise _transport_error(exc) from exc
+
+    def _gemini_request(
+        self, prompt: str, stream: bool = False
+    ) -> Tuple[str, bytes, Dict[str, str]]:
+        method = "streamGenerateContent?alt=sse" if stream else "generateContent"
+        base_url = settings.llm_base_url.rstrip("/")
+        url = f"{base_url}/v1beta/models/{settings.llm_model}:{method}"
         payload = {
             "contents": [
                 {
@@ -32,24 +519,67 @@ class LLMGateway:
             },
         }
         body = json.dumps(payload).encode("utf-8")
-        req = request.Request(
-            url,
-            data=body,
-            headers={
-                "Content-Type": "application/json",
-                "x-goog-api-key": settings.llm_api_key,
-            },
-        )
+        headers = {
+            "Content-Type": "application/json",
+            "x-goog-api-key": settings.llm_api_key or "",
+        }
+        return url, body, headers
+
+    @classmethod
+    def _parse_gemini_body(cls, status: int, raw: bytes) -> str:
+        if status >= 400:
+            raise LLMHTTPError(status, raw.decode("utf-8", errors="ignore"))
         try:
-            with request.urlopen(req, timeout=30) as resp:
-                data = json.loads(resp.read().decode("utf-8"))
-        except error.HTTPError as exc:
-            detail = exc.read().decode("utf-8", errors="ignore")
-            return f"[LLM ERROR] HTTP {exc.code}: {detail}"
-        except Exception as exc:  # noqa: BLE001 - keep minimal for MVP
-            return f"[LLM ERROR] {exc}"
+            data = json.loads(raw.decode("utf-8"))
+        except ValueError:
+            raise LLMBadResponse(f"Unexpected response: {raw[:500]!r}") from None
+        return cls._parse_gemini(data)
 
+    @staticmethod
+    def _parse_gemini(data: Any) -> str:
         try:
             return data["candidates"][0]["content"]["parts"][0]["text"]
         except Exception:
-            return f"[LLM ERROR] Unexpected response: {data}"
+            raise LLMBadResponse(f"Unexpected response: {data}") from None
+
+    @classmethod
+    def _parse_sse_line(cls, line: bytes) -> str:
+        # SSE frames: only "data:" lines carry a GenerateContentResponse.
+        line = line.strip()
+        if not line.startswith(b"data:"):
+            return ""
+        try:
+            data = json.loads(line[5:].decode("utf-8"))
+        except ValueError:
+            return ""
+        return cls._parse_gemini_delta(data)
+
+    @staticmethod
+    def _parse_gemini_delta(data: Any) -> str:
+        try:
+            parts = data["candidates"][0]["content"]["parts"]
+        except (KeyError, IndexError, TypeError):
+            return ""
+        return "".join(part.get("text", "") for part in parts)
+
+
+def _reserved_tokens(prompt: str) -> int:
+    return estimate_tokens(prompt) + settings.llm_expected_output_tokens
+
+
+def _flight_key(prompt: str) -> str:
+    digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    model = f"{settings.llm_provider}:{settings.llm_model}"
+    return f"{model}:{settings.llm_temperature}:{digest}"
+
+
+def _split_target(url: str) -> Tuple[str, str]:
+    parts = urlsplit(url)
+    target = parts.path + (f"?{parts.query}" if parts.query else "")
+    return f"{parts.scheme}://{parts.netloc}", target
+
+
+def _transport_error(exc: Exception) -> LLMError:
+    if isinstance(exc, (TimeoutError, asyncio.TimeoutError)):
+        return LLMTimeout("timed out")
+    return LLMUnavailable(str(exc) or type(exc).__name__)
@@ -0,0 +1,128 @@
+import random
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Optional
+
+
+class LLMError(Exception):
+    """An LLM call that produced no usable output."""
+
+    retryable = False
+
+
+class LLMTimeout(LLMError):
+    retryable = True
+
+
+class LLMUnavailable(LLMError):
+    """The provider could not be reached (connection refused, reset, DNS...)."""
+
+    retryable = True
+
+
+class LLMHTTPError(LLMError):
+    def __init__(self, status: int, detail: str) -> None:
+        super().__init__(f"HTTP {status}: {detail}")
+        self.status = status
+        self.retryable = status == 429 or status >= 500
+
+
+class LLMBadResponse(LLMError):
+    """The provider answered, but not with a response we can parse."""
+
+
+class CircuitOpen(LLMError):
+    def __init__(self, retry_after_s: float) -> None:
+        super().__init__(f"circuit open, retry in {retry_after_s:.1f}s")
+        self.retry_after_s = retry_after_s
+
+
+class RetryPolicy:
+    """Retries retryable errors with full-jitter exponential backoff."""
+
+    def __init__(
+        self, max_retries: int, base_delay_s: float, max_delay_s: float
+    ) -> None:
+        self.max_retries = max_retries
+        self.base_delay_s = base_delay_s
+        self.max_delay_s = max_delay_s
+
+    def should_retry(self, exc: LLMError, attempt: int) -> bool:
+        return exc.retryable and attempt < self.max_retries
+
+    def delay(self, attempt: int) -> float:
+        return random.uniform(
+            0.0, min(self.max_delay_s, self.base_delay_s * 2**attempt)
+        )
+
+
+class CircuitBreaker:
+    """Fails calls fast after ``failure_threshold`` consecutive provider failures.
+
+    Once open, calls raise ``CircuitOpen`` until ``reset_timeout_s`` has passed;
+    the breaker then half-opens and lets calls through. The next success closes
+    it, the next failure opens it again for another ``reset_timeout_s``.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int,
+        reset_timeout_s: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_s = reset_timeout_s
+        self._clock = clock
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self._clock() - self._opened_at < self.reset_timeout_s:
+                return "open"
+            return "half_open"
+
+    def check(self) -> None:
+        with self._lock:
+            if self._opened_at is None:
+                return
+            remaining = self._opened_at + self.reset_timeout_s - self._clock()
+        if remaining > 0:
+            raise CircuitOpen(remaining)
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+
+
+class LatencyWindow:
+    """Recent successful call latencies, used to pick the hedging delay."""
+
+    def __init__(self, size: int = 200, min_samples: int = 20) -> None:
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """The ``q`` quantile, or ``None`` until ``min_samples`` calls were seen."""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
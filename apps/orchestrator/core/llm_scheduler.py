@@ -0,0 +1,276 @@
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from .llm_resilience import LLMError
+from .metrics import LLM_RATE_LIMITED, LLM_RATE_LIMIT_WAIT
+
+# Request option holding the caller's time budget in seconds, e.g. {"deadline_s": 20}.
+DEADLINE_OPTION = "deadline_s"
+
+_call_context: ContextVar[Tuple[Optional[str], Optional[float]]] = ContextVar(
+    "llm_call_context", default=(None, None)
+)
+
+
+@contextmanager
+def llm_call_context(task_type: str | None, deadline: float | None) -> Iterator[None]:
+    """Tag LLM calls made inside the block with a task type and a deadline.
+
+    ``deadline`` is a ``time.monotonic()`` timestamp. The gateway reads both
+    when it queues for rate limit capacity.
+    """
+    token = _call_context.set((task_type, deadline))
+    try:
+        yield
+    finally:
+        _call_context.reset(token)
+
+
+def current_call_context() -> Tuple[Optional[str], Optional[float]]:
+    return _call_context.get()
+
+
+class RateLimited(LLMError):
+    def __init__(self, wait_s: float) -> None:
+        super().__init__(f"rate limited, capacity expected in {wait_s:.1f}s")
+        self.wait_s = wait_s
+
+
+class TokenBucket:
+    """Holds up to ``capacity`` units, refilled continuously at ``rate_per_s``."""
+
+    def __init__(
+        self,
+        rate_per_s: float,
+        capacity: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.rate_per_s = rate_per_s
+        self.capacity = capacity
+        self.level = capacity
+        self._clock = clock
+        self._updated = clock()
+
+    def wait_for(self, amount: float) -> float:
+        """Seconds until ``amount`` units are available (0 if they are now)."""
+        self._refill()
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate_per_s
+
+    def take(self, amount: float) -> None:
+        # May go negative when callers correct an estimate after the fact.
+        self._refill()
+        self.level = min(self.capacity, self.level - amount)
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self.level = min(
+            self.capacity, self.level + (now - self._updated) * self.rate_per_s
+        )
+        self._updated = now
+
+
+class _Waiter:
+    __slots__ = ("tokens", "granted", "cancelled", "wake")
+
+    def __init__(self, tokens: int, wake: Callable[[], None]) -> None:
+        self.tokens = tokens
+        self.granted = False
+        self.cancelled = False
+        self.wake = wake
+
+
+class LLMScheduler:
+    """Client-side rate limiting matched to the provider's per-minute quotas.
+
+    Each call takes one unit from a request bucket and its estimated tokens from
+    a token bucket; both refill at their per-minute limit and hold at most
+    ``burst_s`` seconds of quota. Callers that cannot go at once queue by
+    ``task_type`` priority (higher first, FIFO within a priority) and only the
+    head of the queue is granted, so small calls cannot starve large ones. A
+    caller that cannot be granted before its deadline, or within
+    ``max_wait_s``, fails fast with ``RateLimited``. A limit of 0 disables that
+    bucket.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        priorities: Dict[str, int] | None = None,
+        burst_s: float = 10.0,
+        max_wait_s: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.priorities = priorities or {}
+        self.max_wait_s = max_wait_s
+        self._clock = clock
+        self._buckets: List[Tuple[TokenBucket, bool]] = []
+        if requests_per_minute:
+            rate = requests_per_minute / 60
+            self._buckets.append(
+                (TokenBucket(rate, max(1.0, rate * burst_s), clock), False)
+            )
+        if tokens_per_minute:
+            rate = tokens_per_minute / 60
+            self._buckets.append(
+                (TokenBucket(rate, max(1.0, rate * burst_s), clock), True)
+            )
+        self._heap: List[Tuple[int, int, _Waiter]] = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    @property
+    def queued(self) -> int:
+        with self._lock:
+            return sum(1 for _p, _s, waiter in self._heap if not waiter.cancelled)
+
+    def acquire(
+        self, tokens: int, task_type: str | None = None, deadline: float | None = None
+    ) -> float:
+        """Block until the call may go; return the time spent waiting, in seconds."""
+        started = self._clock()
+        event = threading.Event()
+        waiter = self._enqueue(tokens, task_type, event.set)
+        try:
+            while True:
+                timeout = self._poll(waiter, started, deadline, task_type)
+                if timeout is None:
+                    return self._clock() - started
+                event.wait(timeout)
+        except BaseException:
+            self._abandon(waiter)
+            raise
+
+    async def aacquire(
+        self, tokens: int, task_type: str | None = None, deadline: float | None = None
+    ) -> float:
+        """Async variant of ``acquire``; waiting does not block the event loop."""
+        started = self._clock()
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+
+        def wake() -> None:
+            loop.call_soon_threadsafe(_resolve, granted)
+
+        waiter = self._enqueue(tokens, task_type, wake)
+        try:
+            while True:
+                timeout = self._poll(waiter, started, deadline, task_type)
+                if timeout is None:
+                    return self._clock() - started
+                try:
+                    await asyncio.wait_for(asyncio.shield(granted), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            self._abandon(waiter)
+            raise
+
+    def try_acquire(self, tokens: int) -> bool:
+        """Take capacity only if it is free right now and nobody is queued."""
+        with self._lock:
+            self._dispatch()
+            if self._heap or self._wait_for(tokens) > 0:
+                return False
+            self._take(tokens)
+            return True
+
+    def settle(self, tokens: int) -> None:
+        """Correct the token bucket once a call's real usage is known."""
+        with self._lock:
+            for bucket, counts_tokens in self._buckets:
+                if counts_tokens:
+                    bucket.take(tokens)
+            self._dispatch()
+
+    def throttle(self) -> None:
+        """Empty the request bucket, e.g. after the provider answered 429."""
+        with self._lock:
+            for bucket, counts_tokens in self._buckets:
+                if not counts_tokens:
+                    bucket.take(bucket.level)
+
+    def _enqueue(
+        self, tokens: int, task_type: str | None, wake: Callable[[], None]
+    ) -> _Waiter:
+        waiter = _Waiter(self._clamp(tokens), wake)
+        priority = self.priorities.get(task_type or "", 0)
+        with self._lock:
+            heapq.heappush(self._heap, (-priority, next(self._seq), waiter))
+        return waiter
+
+    def _poll(
+        self,
+        waiter: _Waiter,
+        started: float,
+        deadline: float | None,
+        task_type: str | None,
+    ) -> float | None:
+        """``None`` once ``waiter`` is granted, else how long until polling again."""
+        with self._lock:
+            wait_s = self._dispatch()
+            if waiter.granted:
+                LLM_RATE_LIMIT_WAIT.observe(
+                    self._clock() - started, task_type=task_type or ""
+                )
+                return None
+            limit = started + self.max_wait_s
+            if deadline is not None:
+                limit = min(limit, deadline)
+            remaining = limit - self._clock()
+            # The head knows its exact wait; anyone else gives up at the deadline.
+            if remaining <= 0 or (self._heap[0][2] is waiter and wait_s > remaining):
+                waiter.cancelled = True
+                LLM_RATE_LIMITED.inc(task_type=task_type or "")
+                raise RateLimited(wait_s)
+            return min(wait_s, remaining)
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        with self._lock:
+            if not waiter.granted:
+                waiter.cancelled = True
+                self._dispatch()
+
+    def _dispatch(self) -> float:
+        """Grant queued callers in order; return the head's remaining wait or 0."""
+        while self._heap:
+            waiter = self._heap[0][2]
+            if waiter.cancelled:
+                heapq.heappop(self._heap)
+                continue
+            wait_s = self._wait_for(waiter.tokens)
+            if wait_s > 0:
+                return wait_s
+            heapq.heappop(self._heap)
+            self._take(waiter.tokens)
+            waiter.granted = True
+            waiter.wake()
+        return 0.0
+
+    def _wait_for(self, tokens: int) -> float:
+        waits = [b.wait_for(tokens if t else 1) for b, t in self._buckets]
+        return max(waits, default=0.0)
+
+    def _take(self, tokens: int) -> None:
+        for bucket, counts_tokens in self._buckets:
+            bucket.take(tokens if counts_tokens else 1)
+
+    def _clamp(self, tokens: int) -> int:
+        # A call larger than the token bucket could never be granted.
+        for bucket, counts_tokens in self._buckets:
+            if counts_tokens:
+                tokens = min(tokens, int(bucket.capacity))
+        return tokens
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
@@ -0,0 +1,250 @@
+import asyncio
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import AsyncIterator, Iterator, List, Optional
+
+from .llm_resilience import LLMHTTPError
+
+# Canned replies: one code block plus JSON test cases, so every simulated run
+# goes through the syntax gate, lint, test and coverage like a real one.
+CANNED_OUTPUTS = (
+    """Here is the implementation.
+
+```python
+def add(a, b):
+    return a + b
+```
+
+```json
+{"cases": [
+  {"name": "ints", "call": "add", "input": [1, 2], "expected": 3},
+  {"name": "floats", "call": "add", "input": [0.1, 0.2], "expected": 0.3,
+   "approx": true}
+]}
+```
+""",
+    """```python
+def fizzbuzz(n):
+    if n % 15 == 0:
+        return "FizzBuzz"
+    if n % 3 == 0:
+        return "Fizz"
+    if n % 5 == 0:
+        return "Buzz"
+    return str(n)
+```
+
+```json
+{"cases": [
+  {"name": "fizz", "call": "fizzbuzz", "input": [3], "expected": "Fizz"},
+  {"name": "buzz", "call": "fizzbuzz", "input": [10], "expected": "Buzz"},
+  {"name": "both", "call": "fizzbuzz", "input": [30], "expected": "FizzBuzz"},
+  {"name": "plain", "call": "fizzbuzz", "input": [7], "expected": "7"}
+]}
+```
+""",
+    """The helper normalises a title into a URL slug.
+
+```python
+import re
+
+
+def slugify(title):
+    words = re.findall(r"[a-z0-9]+", title.lower())
+    return "-".join(words)
+```
+
+```json
+{"cases": [
+  {"name": "spaces", "call": "slugify", "input": ["Hello World"],
+   "expected": "hello-world"},
+  {"name": "symbols", "call": "slugify", "input": ["A & B!"], "expected": "a-b"},
+  {"name": "not_text", "call": "slugify", "input": [null], "raises": "AttributeError"}
+]}
+```
+""",
+)
+
+_Z95 = 1.6449  # standard normal quantile for p95
+
+
+@dataclass
+class SimulatedCall:
+    """One sampled provider response: an error status, or text and its timing."""
+
+    status: int
+    first_token_s: float
+    text: str
+    seconds_per_char: float
+
+    def chunks(self, chunk_chars: int) -> List[str]:
+        return [
+            self.text[i : i + chunk_chars]
+            for i in range(0, len(self.text), chunk_chars)
+        ]
+
+
+class LLMSimulator:
+    """Offline stand-in for a hosted LLM with realistic timing and failures.
+
+    Time to first token follows a log-normal distribution fitted to
+    ``latency_p50_s`` and ``latency_p95_s``; output then arrives at
+    ``tokens_per_s`` (4 characters per token). ``error_rate`` and
+    ``rate_limit_rate`` inject HTTP 503 and 429 answers. The reply is one of
+    ``CANNED_OUTPUTS``, chosen by prompt hash so identical prompts get
+    identical output.
+    """
+
+    def __init__(
+        self,
+        latency_p50_s: float = 0.8,
+        latency_p95_s: float = 2.5,
+        tokens_per_s: float = 80.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        seed: Optional[int] = None,
+        chunk_chars: int = 16,
+    ) -> None:
+        self._mu = math.log(latency_p50_s)
+        self._sigma = max(
+            0.0, math.log(max(latency_p95_s, latency_p50_s) / latency_p50_s) / _Z95
+        )
+        self.tokens_per_s = tokens_per_s
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.chunk_chars = chunk_chars
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self, prompt: str) -> SimulatedCall:
+        with self._lock:
+            first_token_s = self._rng.lognormvariate(self._mu, self._sigma)
+            roll = self._rng.random()
+        if roll < self.rate_limit_rate:
+            return SimulatedCall(429, first_token_s, "", 0.0)
+        if roll < self.rate_limit_rate + self.error_rate:
+            return SimulatedCall(503, first_token_s, "", 0.0)
+        digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+        text = CANNED_OUTPUTS[digest[0] % len(CANNED_OUTPUTS)]
+        return SimulatedCall(200, first_token_s, text, 1.0 / (4 * self.tokens_per_s))
+
+    def generate(self, prompt: str) -> str:
+        call = self.sample(prompt)
+        time.sleep(call.first_token_s)
+        self._checked(call)
+        time.sleep(len(call.text) * call.seconds_per_char)
+        return call.text
+
+    async def agenerate(self, prompt: str) -> str:
+        call = self.sample(prompt)
+        await asyncio.sleep(call.first_token_s)
+        self._checked(call)
+        await asyncio.sleep(len(call.text) * call.seconds_per_char)
+        return call.text
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        call = self.sample(prompt)
+        time.sleep(call.first_token_s)
+        self._checked(call)
+        for chunk in call.chunks(self.chunk_chars):
+            time.sleep(len(chunk) * call.seconds_per_char)
+            yield chunk
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        call = self.sample(prompt)
+        await asyncio.sleep(call.first_token_s)
+        self._checked(call)
+        for chunk in call.chunks(self.chunk_chars):
+            await asyncio.sleep(len(chunk) * call.seconds_per_char)
+            yield chunk
+
+    @staticmethod
+    def _checked(call: SimulatedCall) -> None:
+        if call.status != 200:
+            raise LLMHTTPError(call.status, _error_body(call.status))
+
+
+def make_gemini_server(
+    simulator: LLMSimulator, host: str, port: int
+) -> ThreadingHTTPServer:
+    """An HTTP server speaking the Gemini ``generateContent`` wire format.
+
+    Serves ``:generateContent`` and ``:streamGenerateContent?alt=sse`` for any
+    model; point ``LLM_BASE_URL`` at it with ``LLM_PROVIDER=gemini``.
+    """
+    server = ThreadingHTTPServer((host, port), _GeminiHandler)
+    server.daemon_threads = True
+    server.simulator = simulator  # type: ignore[attr-defined]
+    return server
+
+
+class _GeminiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self) -> None:  # noqa: N802 - http.server naming
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        path = self.path.split("?", 1)[0]
+        if not path.endswith((":generateContent", ":streamGenerateContent")):
+            self._send_json(404, {"error": {"code": 404, "message": "not found"}})
+            return
+        try:
+            request = json.loads(body)
+            prompt = "".join(p.get("text", "") for p in request["contents"][0]["parts"])
+        except (ValueError, KeyError, IndexError, TypeError):
+            self._send_json(400, {"error": {"code": 400, "message": "invalid request"}})
+            return
+
+        simulator: LLMSimulator = self.server.simulator  # type: ignore[attr-defined]
+        call = simulator.sample(prompt)
+        time.sleep(call.first_token_s)
+        if call.status != 200:
+            self._send_json(call.status, json.loads(_error_body(call.status)))
+        elif path.endswith(":streamGenerateContent"):
+            self._stream(call, simulator.chunk_chars)
+        else:
+            time.sleep(len(call.text) * call.seconds_per_char)
+            self._send_json(200, _candidate(call.text))
+
+    def _stream(self, call: SimulatedCall, chunk_chars: int) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for chunk in call.chunks(chunk_chars):
+            time.sleep(len(chunk) * call.seconds_per_char)
+            self._write_chunk(
+                f"data: {json.dumps(_candidate(chunk))}\r\n\r\n".encode("utf-8")
+            )
+        self._write_chunk(b"")
+
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_json(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+def _candidate(text: str) -> dict:
+    return {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}}]}
+
+
+def _error_body(status: int) -> str:
+    reason = "RESOURCE_EXHAUSTED" if status == 429 else "UNAVAILABLE"
+    return json.dumps(
+        {"error": {"code": status, "message": "simulated", "status": reason}}
+    )
@@ -1,28 +1,303 @@
+import asyncio
 import json
-from typing import Any, Dict
-from urllib import request, error
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, List
+from urllib.parse import urlsplit
+
+from shared.metrics import MetricsRegistry
+
+from . import async_http
+from .http_pool import HTTPConnectionPool
+
+# Base URL scheme (inproc://) that runs the tools in this process instead of over HTTP.
+INPROC_SCHEME = "inproc"
+
+ToolFn = Callable[[Dict[str, Any]], Dict[str, Any]]
+
+# Extra time the client waits for a batch response beyond the longest tool
+# limit, so the server can report timed out tools instead of the client
+# dropping the whole batch.
+_BATCH_GRACE_S = 1.0
 
 
 class MCPClient:
-    def __init__(self, base_url: str, timeout_s: float = 5.0) -> None:
-        self.base_url = base_url.rstrip("/")
+    """Client for the MCP tool server.
+
+    Synchronous and async calls each reuse keep-alive connections from a pool
+    (``http_pool`` threads, ``async_http`` asyncio streams). With ``batch``
+    enabled, callers running several tools on one payload send it once to
+    ``POST /tools/batch`` via ``run_tools``/``arun_tools``.
+
+    An ``inproc://`` base URL skips HTTP entirely: the tool functions run on a
+    bounded executor of ``inproc_workers`` threads in this process and return
+    the same results the server would, and their metrics are recorded in
+    ``tool_metrics`` (the tool server's registry) for the caller to expose.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        timeout_s: float = 5.0,
+        tool_timeouts: Dict[str, float] | None = None,
+        pool_size: int = 8,
+        pool_idle_timeout_s: float = 60.0,
+        batch: bool = False,
+        inproc_workers: int = 8,
+    ) -> None:
+        self.base_url = str(base_url).rstrip("/")
         self.timeout_s = timeout_s
+        self.tool_timeouts = dict(tool_timeouts or {})
+        self.batch = batch
+        self._pool: HTTPConnectionPool | None = None
+        self._apool: async_http.AsyncConnectionPool | None = None
+        self._tools: Dict[str, ToolFn] | None = None
+        self.tool_metrics: MetricsRegistry | None = None
+        if urlsplit(self.base_url).scheme == INPROC_SCHEME:
+            self._tools, self.tool_metrics = _load_tools()
+            self._executor = ThreadPoolExecutor(
+                max_workers=inproc_workers, thread_name_prefix="mcp-inproc"
+            )
+        else:
+            self._path = urlsplit(self.base_url).path
+            self._pool = HTTPConnectionPool(
+                self.base_url, max_size=pool_size, idle_timeout_s=pool_idle_timeout_s
+            )
+            self._apool = async_http.AsyncConnectionPool(
+                self.base_url, max_size=pool_size, idle_timeout_s=pool_idle_timeout_s
+            )
+
+    def timeout_for(self, name: str) -> float:
+        return self.tool_timeouts.get(name, self.timeout_s)
+
+    def pool_stats(self) -> Dict[str, int]:
+        return self._pool.stats() if self._pool else {}
+
+    def apool_stats(self) -> Dict[str, int]:
+        return self._apool.stats() if self._apool else {}
+
+    def close(self) -> None:
+        if self._pool:
+            self._pool.close()
+            self._apool.close()
+        else:
+            self._executor.shutdown(wait=False, cancel_futures=True)
 
     def run_tool(self, name: str, payload: Dict[str, Any]) -> Dict[str, Any]:
-        url = f"{self.base_url}/tool/{name}"
-        body = json.dumps({"payload": payload}).encode("utf-8")
-        req = request.Request(url, data=body, headers={"Content-Type": "application/json"})
+        if self._tools is not None:
+            return self._inproc_one(name, payload)
+        return self._post(f"/tool/{name}", {"payload": payload}, self.timeout_for(name))
+
+    def run_tools(
+        self,
+        names: List[str],
+        payload: Dict[str, Any],
+        timeouts: Dict[str, float] | None = None,
+    ) -> Dict[str, Dict[str, Any]]:
+        """Run ``names`` on one payload in a single request; results keyed by tool.
+
+        ``timeouts`` overrides the per-tool limits enforced by the server.
+        """
+        if self._tools is not None:
+            return self._inproc_many(names, payload, timeouts)
+        body, timeout_s = self._batch_body(names, payload, timeouts)
+        return _batch_results(names, self._post("/tools/batch", body, timeout_s))
+
+    async def arun_tool(self, name: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        if self._tools is not None:
+            return await self._ainproc(
+                name, payload, self.timeout_for(name), _call_timeout
+            )
+        return await self._apost(
+            f"/tool/{name}", {"payload": payload}, self.timeout_for(name)
+        )
+
+    async def arun_tools(
+        self,
+        names: List[str],
+        payload: Dict[str, Any],
+        timeouts: Dict[str, float] | None = None,
+    ) -> Dict[str, Dict[str, Any]]:
+        """Async variant of ``run_tools``."""
+        if self._tools is not None:
+            if any(name not in self._tools for name in names):
+                return {name: _http_error(404) for name in names}
+            limits = self._limits(names, timeouts)
+            results = await asyncio.gather(
+                *(
+                    self._ainproc(name, payload, limits[name], _tool_timed_out)
+                    for name in names
+                )
+            )
+            return dict(zip(names, results))
+        body, timeout_s = self._batch_body(names, payload, timeouts)
+        return _batch_results(names, await self._apost("/tools/batch", body, timeout_s))
+
+    def _limits(
+        self, names: List[str], timeouts: Dict[str, float] | None
+    ) -> Dict[str, float]:
+        limits = {name: self.timeout_for(name) for name in names}
+        limits.update(timeouts or {})
+        return limits
+
+    def _batch_body(
+        self,
+        names: List[str],
+        payload: Dict[str, Any],
+        timeouts: Dict[str, float] | None,
+    ) -> tuple[Dict[str, Any], float]:
+        limits = self._limits(names, timeouts)
+        body = {"payload": payload, "tools": list(names), "timeouts_s": limits}
+        return body, max(limits.values(), default=self.timeout_s) + _BATCH_GRACE_S
+
+    def _submit(self, name: str, payload: Dict[str, Any]) -> Future | None:
+        tool = self._tools.get(name) if self._tools else None
+        return self._executor.submit(tool, payload) if tool else None
+
+    def _inproc_one(self, name: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        future = self._submit(name, payload)
+        if future is None:
+            return _http_error(404)
+        return _inproc_result(future, self.timeout_for(name), _call_timeout)
+
+    def _inproc_many(
+        self,
+        names: List[str],
+        payload: Dict[str, Any],
+        timeouts: Dict[str, float] | None,
+    ) -> Dict[str, Dict[str, Any]]:
+        # Mirrors POST /tools/batch: an unknown tool fails the batch, the rest
+        # run concurrently and each is cut off at its own limit.
+        if any(name not in self._tools for name in names):
+            return {name: _http_error(404) for name in names}
+        limits = self._limits(names, timeouts)
+        started = time.monotonic()
+        futures = {name: self._submit(name, payload) for name in names}
+        return {
+            name: _inproc_result(
+                future,
+                max(0.0, started + limits[name] - time.monotonic()),
+                _tool_timed_out,
+            )
+            for name, future in futures.items()
+        }
+
+    async def _ainproc(
+        self,
+        name: str,
+        payload: Dict[str, Any],
+        timeout_s: float,
+        on_timeout: Callable[[float], Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        future = self._submit(name, payload)
+        if future is None:
+            return _http_error(404)
         try:
-            with request.urlopen(req, timeout=self.timeout_s) as resp:
-                data = resp.read().decode("utf-8")
-                return json.loads(data)
-        except error.HTTPError as exc:
-            return {
-                "status": "error",
-                "detail": {"message": "HTTP error from MCP server", "code": exc.code},
-            }
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout_s)
+        except asyncio.TimeoutError:
+            return on_timeout(timeout_s)
+        except Exception as exc:  # noqa: BLE001 - same contract as the server
+            return _tool_failed(exc)
+
+    def _post(
+        self, path: str, body: Dict[str, Any], timeout_s: float
+    ) -> Dict[str, Any]:
+        try:
+            status, raw = self._pool.request(
+                "POST",
+                self._path + path,
+                json.dumps(body).encode("utf-8"),
+                {"Content-Type": "application/json"},
+                timeout_s=timeout_s,
+            )
+            if status >= 400:
+                return _http_error(status)
+            return json.loads(raw.decode("utf-8"))
+        except Exception as exc:  # noqa: BLE001 - keep minimal for MVP
+            return _call_error(exc)
+
+    async def _apost(
+        self, path: str, body: Dict[str, Any], timeout_s: float
+    ) -> Dict[str, Any]:
+        try:
+            status, raw = await self._apool.request(
+                "POST",
+                self._path + path,
+                json.dumps(body).encode("utf-8"),
+                {"Content-Type": "application/json"},
+                timeout=timeout_s,
+            )
+            if status >= 400:
+                return _http_error(status)
+            return json.loads(raw.decode("utf-8"))
+        except asyncio.TimeoutError:
+            return _call_error(TimeoutError("timed out"))
         except Exception as exc:  # noqa: BLE001 - keep minimal for MVP
-            return {
-                "status": "error",
-                "detail": {"message": "Failed to call MCP server", "error": str(exc)},
-            }
+            return _call_error(exc)
+
+
+def _load_tools() -> tuple[Dict[str, ToolFn], MetricsRegistry]:
+    # Imported on first use so HTTP deployments do not load the tool server code.
+    from services.mcp_server.metrics import registry
+    from services.mcp_server.tools import TOOLS
+
+    return dict(TOOLS), registry
+
+
+def _inproc_result(
+    future: Future, timeout_s: float, on_timeout: Callable[[float], Dict[str, Any]]
+) -> Dict[str, Any]:
+    try:
+        return future.result(timeout=timeout_s)
+    except FutureTimeout:
+        future.cancel()
+        return on_timeout(timeout_s)
+    except Exception as exc:  # noqa: BLE001 - same contract as the server
+        return _tool_failed(exc)
+
+
+def _batch_results(
+    names: List[str], response: Dict[str, Any]
+) -> Dict[str, Dict[str, Any]]:
+    # A failed batch call (transport or HTTP error) fails every tool in it.
+    results = response.get("results")
+    if not isinstance(results, dict):
+        return {name: response for name in names}
+    missing = {
+        "status": "error",
+        "detail": {"message": "tool missing from batch response"},
+    }
+    return {name: results.get(name, missing) for name in names}
+
+
+def _http_error(code: int) -> Dict[str, Any]:
+    return {
+        "status": "error",
+        "detail": {"message": "HTTP error from MCP server", "code": code},
+    }
+
+
+def _call_error(exc: Exception) -> Dict[str, Any]:
+    return {
+        "status": "error",
+        "detail": {"message": "Failed to call MCP server", "error": str(exc)},
+    }
+
+
+def _call_timeout(timeout_s: float) -> Dict[str, Any]:
+    return _call_error(TimeoutError("timed out"))
+
+
+def _tool_timed_out(timeout_s: float) -> Dict[str, Any]:
+    return {
+        "status": "error",
+        "detail": {"message": "tool timed out", "timeout_s": timeout_s},
+    }
+
+
+def _tool_failed(exc: Exception) -> Dict[str, Any]:
+    return {
+        "status": "error",
+        "detail": {"message": "tool failed", "error": str(exc)},
+    }
@@ -9,6 +9,11 @@ from pathlib import Path
 from typing import Dict, List, Optional
 
 from ..models.memory import MemoryContext, MemoryHistoryItem, MemorySnapshot, MemoryStats
+from .metrics import CACHE_LOOKUPS
+
+# Project files stamped with this version were written by this service and are
+# rebuilt with ``construct()``; anything else goes through full validation.
+SCHEMA_VERSION = 1
 
 
 def _utcnow() -> datetime:
@@ -36,7 +41,7 @@ def _extract_source(text: str, default_source: str) -> tuple[str, str]:
     return default_source, text.strip()
 
 
-@dataclass
+@dataclass(slots=True)
 class _MemoryEntry:
     id: str
     content: str
@@ -46,7 +51,7 @@ class _MemoryEntry:
     frequency: int = 0
 
     def to_model(self, importance: float) -> MemoryContext:
-        return MemoryContext(
+        return MemoryContext.construct(
             id=self.id,
             content=self.content,
             source=self.source,
@@ -73,6 +78,9 @@ class MemoryManager:
         self._states: Dict[str, _ProjectState] = {}
         self._store_dir.mkdir(parents=True, exist_ok=True)
 
+    def __len__(self) -> int:
+        return len(self._states)
+
     def get(self, project_id: str) -> MemorySnapshot:
         state = self._load(project_id)
         snapshot = self._build_snapshot(state)
@@ -200,7 +208,9 @@ class MemoryManager:
     def _load(self, project_id: str) -> _ProjectState:
         pid = _safe_project_id(project_id)
         if pid in self._states:
+            CACHE_LOOKUPS.inc(cache="memory_state", result="hit")
             return self._states[pid]
+        CACHE_LOOKUPS.inc(cache="memory_state", result="miss")
         path = self._project_path(pid)
         if not path.exists():
             state = _ProjectState(project_id=pid)
@@ -219,10 +229,14 @@ class MemoryManager:
                 frequency=e.get("frequency", 1),
             )
 
+        # Trusted files skip validation; legacy/unstamped files are validated.
+        trusted = raw.get("schema_version") == SCHEMA_VERSION
+        context_model = MemoryContext.construct if trusted else MemoryContext
+        item_model = MemoryHistoryItem.construct if trusted else MemoryHistoryItem
         history: List[MemoryHistoryItem] = []
         for h in raw.get("history", []):
             contexts = [
-                MemoryContext(
+                context_model(
                     id=c["id"],
                     content=c["content"],
                     source=c.get("source", "rag"),
@@ -233,7 +247,9 @@ class MemoryManager:
                 )
                 for c in h.get("contexts", [])
             ]
-            history.append(MemoryHistoryItem(ts=datetime.fromisoformat(h["ts"]), contexts=contexts))
+            history.append(
+                item_model(ts=datetime.fromisoformat(h["ts"]), contexts=contexts)
+            )
 
         updated_at = datetime.fromisoformat(raw.get("updated_at")) if raw.get("updated_at") else _utcnow()
         state = _ProjectState(project_id=pid, entries=entries, history=history, updated_at=updated_at)
@@ -248,6 +264,7 @@ class MemoryManager:
 
     def _save(self, state: _ProjectState) -> None:
         payload = {
+            "schema_version": SCHEMA_VERSION,
             "project_id": state.project_id,
             "updated_at": state.updated_at.isoformat(),
             "entries": {
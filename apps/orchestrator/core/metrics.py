@@ -0,0 +1,77 @@
+from shared.metrics import MetricsRegistry
+
+registry = MetricsRegistry()
+
+HTTP_REQUESTS = registry.counter(
+    "orchestrator_http_requests_total",
+    "HTTP requests by route.",
+    ("method", "route", "status"),
+)
+HTTP_LATENCY = registry.histogram(
+    "orchestrator_http_request_duration_seconds",
+    "HTTP request latency.",
+    ("method", "route"),
+)
+HTTP_IN_FLIGHT = registry.gauge(
+    "orchestrator_http_requests_in_flight", "HTTP requests currently being served."
+)
+LLM_LATENCY = registry.histogram(
+    "orchestrator_llm_request_duration_seconds", "LLM call latency.", ("provider",)
+)
+LLM_ERRORS = registry.counter(
+    "orchestrator_llm_errors_total", "LLM calls that returned an error.", ("provider",)
+)
+LLM_RETRIES = registry.counter(
+    "orchestrator_llm_retries_total",
+    "LLM call attempts retried after an error.",
+    ("provider",),
+)
+LLM_HEDGES = registry.counter(
+    "orchestrator_llm_hedged_requests_total",
+    "Duplicate LLM requests sent because the first was slow.",
+    ("provider",),
+)
+LLM_RATE_LIMIT_WAIT = registry.histogram(
+    "orchestrator_llm_rate_limit_wait_seconds",
+    "Time LLM calls waited for client-side rate limit capacity.",
+    ("task_type",),
+)
+LLM_RATE_LIMITED = registry.counter(
+    "orchestrator_llm_rate_limited_total",
+    "LLM calls rejected because capacity would not free up before their deadline.",
+    ("task_type",),
+)
+COALESCED_CALLS = registry.counter(
+    "orchestrator_coalesced_calls_total",
+    "Calls that shared an identical in-flight call instead of making their own.",
+    ("call",),
+)
+MCP_TOOL_LATENCY = registry.histogram(
+    "orchestrator_mcp_tool_duration_seconds",
+    "MCP tool call latency seen by the client.",
+    ("tool",),
+)
+MCP_TOOL_TIMEOUTS = registry.counter(
+    "orchestrator_mcp_tool_timeouts_total",
+    "MCP tool calls abandoned after a timeout.",
+    ("tool",),
+)
+ADMISSION_REJECTIONS = registry.counter(
+    "orchestrator_admission_rejections_total",
+    "Runs rejected because the admission queue was full.",
+)
+ADMISSION_QUEUE_WAIT = registry.histogram(
+    "orchestrator_admission_queue_wait_seconds",
+    "Time runs waited for an admission slot.",
+)
+CACHE_LOOKUPS = registry.counter(
+    "orchestrator_cache_lookups_total",
+    "Cache lookups by cache and result.",
+    ("cache", "result"),
+)
+
+
+def cache_hit_ratio(cache: str) -> float:
+    hits = CACHE_LOOKUPS.value(cache=cache, result="hit")
+    total = hits + CACHE_LOOKUPS.value(cache=cache, result="miss")
+    return hits / total if total else 0.0
@@ -0,0 +1,155 @@
+from dataclasses import dataclass
+from functools import lru_cache
+from string import Formatter
+from typing import Dict, List, Tuple
+
+from ..models.prompt import PromptTemplate
+
+# Rough chars-per-token ratio for English/code; good enough for budgeting
+# without pulling in a model-specific tokenizer.
+CHARS_PER_TOKEN = 4
+
+# Chunks trimmed below this many tokens carry too little to be worth keeping.
+_MIN_PARTIAL_TOKENS = 32
+
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+@dataclass(frozen=True)
+class ParsedTemplate:
+    """Template split into literal text and field names, parsed once per template."""
+
+    literals: Tuple[str, ...]
+    fields: Tuple[str, ...]
+    static_tokens: int
+    # Templates using conversions, format specs, or positional/indexed fields
+    # are rendered with str.format instead of plain concatenation.
+    simple: bool
+
+    def render(self, template: str, values: Dict[str, str]) -> str:
+        if not self.simple:
+            return template.format(**values)
+        parts = [self.literals[0]]
+        for name, literal in zip(self.fields, self.literals[1:]):
+            parts.append(values[name])
+            parts.append(literal)
+        return "".join(parts)
+
+
+@lru_cache(maxsize=256)
+def parse_template(template: str) -> ParsedTemplate:
+    literals = [""]
+    fields: List[str] = []
+    simple = True
+    for literal, field_name, format_spec, conversion in Formatter().parse(template):
+        literals[-1] += literal
+        if field_name is None:
+            continue
+        if format_spec or conversion or not field_name.isidentifier():
+            simple = False
+        fields.append(field_name)
+        literals.append("")
+    static_tokens = estimate_tokens("".join(literals))
+    return ParsedTemplate(tuple(literals), tuple(fields), static_tokens, simple)
+
+
+@dataclass
+class BudgetedPrompt:
+    text: str
+    tokens: int
+    dropped_tokens: int
+
+
+class PromptBudgeter:
+    """Fits memory and retrieved context into a per-task-type token budget.
+
+    The template's static text and the user input are always kept. Memory gets
+    at most ``memory_share`` of what remains, keeping its leading lines; context
+    chunks get the rest in retrieval rank order, with the first chunk that does
+    not fit truncated and lower-ranked chunks dropped.
+    """
+
+    def __init__(
+        self,
+        default_budget: int,
+        budgets: Dict[str, int] | None = None,
+        memory_share: float = 0.3,
+    ) -> None:
+        self.default_budget = default_budget
+        self.budgets = budgets or {}
+        self.memory_share = memory_share
+
+    def budget_for(self, task_type: str) -> int:
+        return self.budgets.get(task_type, self.default_budget)
+
+    def assemble(
+        self,
+        prompt: PromptTemplate,
+        memory: str,
+        context: List[str],
+        user_input: str,
+    ) -> BudgetedPrompt:
+        parsed = parse_template(prompt.template)
+        input_tokens = estimate_tokens(user_input)
+        available = max(
+            0, self.budget_for(prompt.type) - parsed.static_tokens - input_tokens
+        )
+
+        memory_text, memory_tokens, memory_dropped = _fit_lines(
+            memory, int(available * self.memory_share)
+        )
+        context_text, context_tokens, context_dropped = _fit_chunks(
+            context, available - memory_tokens
+        )
+        text = parsed.render(
+            prompt.template,
+            {"memory": memory_text, "context": context_text, "input": user_input},
+        )
+        return BudgetedPrompt(
+            text=text,
+            tokens=parsed.static_tokens + input_tokens + memory_tokens + context_tokens,
+            dropped_tokens=memory_dropped + context_dropped,
+        )
+
+
+def _fit_lines(text: str, budget: int) -> Tuple[str, int, int]:
+    """Keep leading lines of ``text`` within ``budget``.
+
+    Returns ``(text, kept, dropped)``.
+    """
+    total = estimate_tokens(text)
+    if total <= budget:
+        return text, total, 0
+    kept: List[str] = []
+    used = 0
+    for line in text.splitlines():
+        cost = estimate_tokens(line + "\n")
+        if used + cost > budget:
+            break
+        kept.append(line)
+        used += cost
+    return "\n".join(kept), used, total - used
+
+
+def _fit_chunks(chunks: List[str], budget: int) -> Tuple[str, int, int]:
+    """Keep chunks in rank order within ``budget``; return (text, kept, dropped)."""
+    kept: List[str] = []
+    used = 0
+    dropped = 0
+    for chunk in chunks:
+        cost = estimate_tokens(chunk + "\n")
+        remaining = budget - used
+        if cost <= remaining:
+            kept.append(chunk)
+            used += cost
+        elif remaining >= _MIN_PARTIAL_TOKENS:
+            partial = chunk[: (remaining - 1) * CHARS_PER_TOKEN]
+            kept.append(partial)
+            partial_cost = estimate_tokens(partial + "\n")
+            used += partial_cost
+            dropped += cost - partial_cost
+        else:
+            dropped += cost
+    return "\n".join(kept), used, dropped
@@ -0,0 +1,102 @@
+import ast
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Tuple
+
+QUALITY_TOOLS = ("lint", "test", "coverage")
+
+# In-process gates each MCP tool depends on, checked in order. A tool runs only
+# if every gate it depends on passed; otherwise it is reported as skipped with
+# the first failing gate's reason.
+DEPENDENCIES: Dict[str, Tuple[str, ...]] = {
+    "lint": ("syntax",),
+    "test": ("syntax", "has_tests"),
+    "coverage": ("syntax", "has_tests"),
+}
+
+
+@dataclass
+class QualityPlan:
+    syntax: Dict[str, Any]
+    run: Tuple[str, ...]
+    skipped: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+
+class QualityGraph:
+    """Decides which quality tools to run for a piece of generated code.
+
+    Gates are evaluated in-process before any MCP call: ``syntax`` parses the
+    code with ``ast.parse`` and ``has_tests`` requires JSON test cases or
+    pytest-style tests in the code. ``tools_by_task_type`` limits the tools per
+    task type; unlisted task types run all of ``QUALITY_TOOLS``.
+    """
+
+    def __init__(self, tools_by_task_type: Dict[str, List[str]] | None = None) -> None:
+        self.tools_by_task_type = tools_by_task_type or {}
+
+    def tools_for(self, task_type: str | None) -> Tuple[str, ...]:
+        enabled = self.tools_by_task_type.get(task_type or "", QUALITY_TOOLS)
+        return tuple(name for name in QUALITY_TOOLS if name in enabled)
+
+    def early_tools(self, task_type: str | None, code: str) -> Tuple[str, ...]:
+        """Enabled tools gated only on ``syntax``; they need no tests block."""
+        if _check_syntax(code)[1] is None:
+            return ()
+        enabled = self.tools_for(task_type)
+        return tuple(name for name in enabled if DEPENDENCIES[name] == ("syntax",))
+
+    def plan(self, task_type: str | None, code: str, tests: str) -> QualityPlan:
+        syntax, tree = _check_syntax(code)
+        gates: Dict[str, str | None] = {
+            "syntax": None if tree is not None else "code does not parse",
+            "has_tests": None if tests.strip() or _defines_tests(tree) else "no tests",
+        }
+        enabled = self.tools_for(task_type)
+        run: List[str] = []
+        skipped: Dict[str, Dict[str, Any]] = {}
+        for name in QUALITY_TOOLS:
+            if name not in enabled:
+                skipped[name] = _skipped(f"not enabled for task_type={task_type}")
+                continue
+            reason = next((gates[g] for g in DEPENDENCIES[name] if gates[g]), None)
+            if reason:
+                skipped[name] = _skipped(reason)
+            else:
+                run.append(name)
+        return QualityPlan(syntax=syntax, run=tuple(run), skipped=skipped)
+
+
+def skip_all(reason: str) -> QualityPlan:
+    """A plan that runs nothing, e.g. when there is no LLM output to check."""
+    return QualityPlan(
+        syntax=_skipped(reason),
+        run=(),
+        skipped={name: _skipped(reason) for name in QUALITY_TOOLS},
+    )
+
+
+def _check_syntax(code: str) -> Tuple[Dict[str, Any], ast.Module | None]:
+    if not code.strip():
+        return {"status": "failed", "detail": {"message": "empty code"}}, None
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as exc:
+        detail = {"message": exc.msg, "line": exc.lineno, "offset": exc.offset}
+        return {"status": "failed", "detail": detail}, None
+    return {"status": "ok", "detail": {}}, tree
+
+
+def _defines_tests(tree: ast.Module | None) -> bool:
+    if tree is None:
+        return False
+    for node in tree.body:
+        if isinstance(
+            node, (ast.FunctionDef, ast.AsyncFunctionDef)
+        ) and node.name.startswith("test"):
+            return True
+        if isinstance(node, ast.ClassDef) and node.name.startswith("Test"):
+            return True
+    return False
+
+
+def _skipped(reason: str) -> Dict[str, Any]:
+    return {"status": "skipped", "detail": {"reason": reason}}
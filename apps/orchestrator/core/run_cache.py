@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from ..models.report import QualityReport
+from .llm_scheduler import DEADLINE_OPTION
+from .metrics import CACHE_LOOKUPS
+
+# Option key that controls caching per request, e.g. options={"cache": false}.
+BYPASS_OPTION = "cache"
+# Options that do not change the output and so are left out of the key.
+_UNKEYED_OPTIONS = (BYPASS_OPTION, DEADLINE_OPTION)
+
+
+def cache_key(
+    prompt_type: str,
+    prompt_version: str,
+    formatted_prompt: str,
+    options: Dict[str, Any] | None,
+    model: str,
+    temperature: float,
+) -> str:
+    options = {k: v for k, v in (options or {}).items() if k not in _UNKEYED_OPTIONS}
+    material = json.dumps(
+        [
+            prompt_type,
+            prompt_version,
+            hashlib.sha256(formatted_prompt.encode("utf-8")).hexdigest(),
+            options,
+            model,
+            temperature,
+        ],
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def cache_enabled_for(options: Dict[str, Any] | None) -> bool:
+    return (options or {}).get(BYPASS_OPTION, True) is not False
+
+
+class RunCache:
+    """Content-addressed cache of ``(llm_output, QualityReport)`` on local disk.
+
+    One JSON file per key. Entries expire ``ttl_s`` after they are written; when
+    the directory exceeds ``max_bytes`` the least recently used entries are
+    evicted. The index lives in memory and is rebuilt from file mtimes on start.
+    """
+
+    def __init__(self, path: str, ttl_s: float, max_bytes: int) -> None:
+        self._dir = Path(path)
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self.ttl_s = ttl_s
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # key -> (written_at, size_bytes), least recently used first.
+        self._index: "OrderedDict[str, Tuple[float, int]]" = OrderedDict()
+        self._bytes = 0
+        self._load_index()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def get(self, key: str) -> Optional[Tuple[str, QualityReport]]:
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is not None and time.time() - entry[0] > self.ttl_s:
+                self._evict(key)
+                entry = None
+            if entry is None:
+                CACHE_LOOKUPS.inc(cache="run_result", result="miss")
+                return None
+            self._index.move_to_end(key)
+        try:
+            data = json.loads(self._path(key).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            with self._lock:
+                self._evict(key)
+            CACHE_LOOKUPS.inc(cache="run_result", result="miss")
+            return None
+        CACHE_LOOKUPS.inc(cache="run_result", result="hit")
+        return data["llm_output"], QualityReport.construct(**data["quality_report"])
+
+    def put(self, key: str, llm_output: str, quality_report: QualityReport) -> None:
+        raw = json.dumps(
+            {"llm_output": llm_output, "quality_report": quality_report.dict()},
+            ensure_ascii=False,
+        ).encode("utf-8")
+        path = self._path(key)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(raw)
+        os.replace(tmp, path)
+        with self._lock:
+            if key in self._index:
+                self._bytes -= self._index.pop(key)[1]
+            self._index[key] = (time.time(), len(raw))
+            self._bytes += len(raw)
+            while self._bytes > self.max_bytes and len(self._index) > 1:
+                self._evict(next(iter(self._index)))
+
+    def _evict(self, key: str) -> None:
+        # get() reads outside the lock, so another thread may have evicted the key.
+        entry = self._index.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= entry[1]
+        self._path(key).unlink(missing_ok=True)
+
+    def _load_index(self) -> None:
+        now = time.time()
+        entries = []
+        for path in self._dir.glob("*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            if now - stat.st_mtime > self.ttl_s:
+                path.unlink(missing_ok=True)
+                continue
+            entries.append((stat.st_mtime, path.stem, stat.st_size))
+        for mtime, key, size in sorted(entries):
+            self._index[key] = (mtime, size)
+            self._bytes += size
+
+    def _path(self, key: str) -> Path:
+        return self._dir / f"{key}.json"
@@ -0,0 +1,74 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, List, Tuple, TypeVar
+
+from .metrics import COALESCED_CALLS
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Collapses concurrent calls that share a key into a single call.
+
+    The first caller for a key runs the call; callers arriving while it is in
+    flight wait for and share its result (or exception). Nothing is cached once
+    the call finishes. ``name`` labels the coalesced-calls metric.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._calls: Dict[str, Future] = {}
+        self._tasks: Dict[Tuple[asyncio.AbstractEventLoop, str], List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], T]) -> T:
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            COALESCED_CALLS.inc(call=self.name)
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    async def ado(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        # Keyed per event loop: a task can only be awaited from its own loop.
+        slot = (asyncio.get_running_loop(), key)
+        entry = self._tasks.get(slot)
+        if entry is None:
+            task = asyncio.ensure_future(fn())
+            entry = self._tasks[slot] = [task, 0]
+            task.add_done_callback(lambda _t, entry=entry: self._forget(slot, entry))
+        else:
+            COALESCED_CALLS.inc(call=self.name)
+        task, _waiters = entry
+        entry[1] += 1
+        try:
+            # shield: one waiter being cancelled must not cancel the shared call.
+            return await asyncio.shield(task)
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0 and not task.done():
+                task.cancel()
+
+    def _forget(
+        self, slot: Tuple[asyncio.AbstractEventLoop, str], entry: List[Any]
+    ) -> None:
+        if self._tasks.get(slot) is entry:
+            del self._tasks[slot]
+
+    def in_flight(self) -> int:
+        return len(self._calls) + len(self._tasks)
@@ -0,0 +1,63 @@
+import random
+from contextlib import nullcontext
+from time import perf_counter
+from typing import Callable, ContextManager, Dict, Optional
+
+from ..config import settings
+
+_NOOP_SPAN = nullcontext()
+
+
+class _Span:
+    __slots__ = ("_trace", "_name", "_started")
+
+    def __init__(self, trace: "Trace", name: str) -> None:
+        self._trace = trace
+        self._name = name
+        self._started = 0.0
+
+    def __enter__(self) -> "_Span":
+        self._started = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        elapsed_ms = round((perf_counter() - self._started) * 1000, 3)
+        self._trace._timings[self._name] = elapsed_ms
+        if self._trace._listener is not None:
+            self._trace._listener(self._name, elapsed_ms)
+
+
+class Trace:
+    """Per-run stage timings in milliseconds, keyed by span name.
+
+    Unsampled traces hand out a shared no-op context manager, so instrumented
+    code pays one attribute check per span when tracing is off. ``listener`` is
+    called with ``(name, elapsed_ms)`` as each sampled span finishes.
+    """
+
+    __slots__ = ("sampled", "_timings", "_listener")
+
+    def __init__(
+        self,
+        sampled: bool = True,
+        listener: Optional[Callable[[str, float], None]] = None,
+    ) -> None:
+        self.sampled = sampled
+        self._timings: Dict[str, float] = {}
+        self._listener = listener
+
+    def span(self, name: str) -> ContextManager:
+        if not self.sampled:
+            return _NOOP_SPAN
+        return _Span(self, name)
+
+    @property
+    def timings(self) -> Optional[Dict[str, float]]:
+        if not self.sampled:
+            return None
+        return dict(self._timings)
+
+
+def start_trace(sample_rate: Optional[float] = None) -> Trace:
+    rate = settings.trace_sample_rate if sample_rate is None else sample_rate
+    return Trace(sampled=rate >= 1.0 or (rate > 0.0 and random.random() < rate))
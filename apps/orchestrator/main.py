@@ -1,14 +1,32 @@
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
+from shared.metrics import HTTPMetricsMiddleware
 from .api.run import router as run_router
 from .api.runs import router as runs_router
 from .api.prompts import router as prompts_router
 from .api.memory import router as memory_router
+from .api.jobs import router as jobs_router
+from .core.app_state import job_queue, mcp_client
+from .core.metrics import HTTP_IN_FLIGHT, HTTP_LATENCY, HTTP_REQUESTS, registry
 
-app = FastAPI(title="Design-Aware AI Coding Platform")
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    job_queue.start()
+    try:
+        yield
+    finally:
+        # Let running jobs finish; anything cut short is requeued on next start.
+        await run_in_threadpool(job_queue.stop)
+
+
+app = FastAPI(title="Design-Aware AI Coding Platform", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -17,11 +35,18 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(
+    HTTPMetricsMiddleware,
+    requests=HTTP_REQUESTS,
+    latency=HTTP_LATENCY,
+    in_flight=HTTP_IN_FLIGHT,
+)
 
 app.include_router(run_router)
 app.include_router(runs_router)
 app.include_router(prompts_router)
 app.include_router(memory_router)
+app.include_router(jobs_router)
 
 ui_dir = Path(__file__).resolve().parents[1] / "ui"
 if ui_dir.exists():
@@ -31,3 +56,12 @@ if ui_dir.exists():
 @app.get("/")
 def health():
     return {"status": "ok"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    text = registry.render()
+    # In-process tools (MCP_SERVER_URL=inproc://) record into the tool registry.
+    if mcp_client.tool_metrics is not None:
+        text += mcp_client.tool_metrics.render()
+    return PlainTextResponse(text, media_type="text/plain; version=0.0.4")
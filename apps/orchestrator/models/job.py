@@ -0,0 +1,22 @@
+from datetime import datetime
+from typing import Dict, Literal, Optional
+
+from pydantic import BaseModel, Field
+
+
+JobStatus = Literal["queued", "running", "succeeded", "failed"]
+
+
+class Job(BaseModel):
+    id: str
+    task_type: str
+    project_id: str
+    priority: int
+    status: JobStatus
+    # Finished pipeline stages and their duration in milliseconds, in completion order.
+    progress: Dict[str, float] = Field(default_factory=dict)
+    error: Optional[str] = None
+    attempts: int = 0
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
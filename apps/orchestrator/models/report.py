@@ -1,8 +1,10 @@
 from pydantic import BaseModel
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 
 class QualityReport(BaseModel):
     lint: Dict[str, Any]
     test: Dict[str, Any]
     coverage: Dict[str, Any]
+    # In-process ast.parse gate; absent on reports recorded before it existed.
+    syntax: Optional[Dict[str, Any]] = None
@@ -17,3 +17,12 @@ class RunResponse(BaseModel):
     quality_report: QualityReport
     run_id: Optional[str] = None
     duration_ms: Optional[int] = None
+    queue_wait_ms: Optional[int] = None
+    prompt_tokens_dropped: Optional[int] = None
+    cache_hit: bool = False
+    stage_timings: Optional[Dict[str, float]] = None
+
+
+class BatchRunRequest(BaseModel):
+    requests: List[RunRequest] = Field(..., min_items=1, max_items=1000)
+    concurrency: Optional[int] = Field(default=None, ge=1, le=64)
@@ -1,22 +1,41 @@
 ﻿from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Literal, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from .report import QualityReport
 
 
-class RunRecord(BaseModel):
+RunFields = Literal["summary", "full"]
+
+# Large payload fields that are kept out of memory and only loaded on demand.
+HEAVY_FIELDS = ("llm_output", "memory_snapshot", "retrieved_context", "quality_report")
+
+
+class RunSummary(BaseModel):
     id: str
     task_type: str
     project_id: str
     user_input: str
+    created_at: datetime
+    duration_ms: int
+    queue_wait_ms: Optional[int] = None
+    prompt_tokens_dropped: Optional[int] = None
+    cache_hit: bool = False
+    stage_timings: Optional[Dict[str, float]] = None
+
+
+class RunRecord(RunSummary):
     llm_output: str
     memory_snapshot: str
     retrieved_context: List[str]
     quality_report: QualityReport
-    created_at: datetime
-    duration_ms: int
+
+
+class DurationQuantiles(BaseModel):
+    count: int
+    p50_ms: Optional[float] = None
+    p95_ms: Optional[float] = None
 
 
 class RunStats(BaseModel):
@@ -24,3 +43,4 @@ class RunStats(BaseModel):
     project_count: int
     task_type_counts: Dict[str, int]
     latest_run_at: Optional[datetime] = None
+    duration_ms_by_task_type: Dict[str, DurationQuantiles] = Field(default_factory=dict)
@@ -0,0 +1,66 @@
+import json
+import lzma
+import re
+import zlib
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+_Codec = Tuple[str, Callable[[bytes], bytes], Callable[[bytes], bytes]]
+
+_CODECS: Dict[str, _Codec] = {
+    "zlib": (".zz", lambda data: zlib.compress(data, 6), zlib.decompress),
+    "lzma": (".xz", lzma.compress, lzma.decompress),
+}
+
+
+def _safe_key(key: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_.-]+", "_", key) or "_"
+
+
+class BlobStore:
+    """Compressed JSON blobs on disk, one file per key.
+
+    Blobs are written with the configured codec; reads accept any known codec so
+    switching compression does not orphan existing data.
+    """
+
+    def __init__(self, path: str, codec: str = "zlib") -> None:
+        if codec not in _CODECS:
+            raise ValueError(f"Unknown blob codec: {codec}")
+        self._dir = Path(path)
+        self._codec = codec
+
+    def put(self, key: str, data: Dict[str, Any]) -> None:
+        suffix, compress, _ = _CODECS[self._codec]
+        raw = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode(
+            "utf-8"
+        )
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._blob_path(key, suffix).write_bytes(compress(raw))
+        for name, (other_suffix, _c, _d) in _CODECS.items():
+            if name != self._codec:
+                self._blob_path(key, other_suffix).unlink(missing_ok=True)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        for suffix, _compress, decompress in self._codecs_preferred_first():
+            path = self._blob_path(key, suffix)
+            try:
+                blob = path.read_bytes()
+            except FileNotFoundError:
+                continue
+            try:
+                return json.loads(decompress(blob).decode("utf-8"))
+            except (zlib.error, lzma.LZMAError, ValueError):
+                return None
+        return None
+
+    def delete(self, key: str) -> None:
+        for suffix, _compress, _decompress in _CODECS.values():
+            self._blob_path(key, suffix).unlink(missing_ok=True)
+
+    def _codecs_preferred_first(self) -> list[_Codec]:
+        preferred = _CODECS[self._codec]
+        return [preferred] + [c for c in _CODECS.values() if c is not preferred]
+
+    def _blob_path(self, key: str, suffix: str) -> Path:
+        return self._dir / f"{_safe_key(key)}{suffix}"
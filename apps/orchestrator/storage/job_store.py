@@ -0,0 +1,172 @@
+import json
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from ..models.job import Job
+from ..models.run import RunRequest
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    task_type TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    request TEXT NOT NULL,
+    progress TEXT NOT NULL DEFAULT '{}',
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, priority DESC, seq);
+"""
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class JobStore:
+    """Persistent job queue backed by SQLite.
+
+    Jobs are claimed highest priority first, then in submission order. A single
+    connection is shared under a lock; SQLite serializes writers anyway.
+    """
+
+    def __init__(self, path: str) -> None:
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+
+    def enqueue(self, job_id: str, request: RunRequest, priority: int = 0) -> Job:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs "
+                "(id, task_type, priority, status, request, created_at) "
+                "VALUES (?, ?, ?, 'queued', ?, ?)",
+                (job_id, request.task_type, priority, request.json(), _now()),
+            )
+        return self.get(job_id)
+
+    def claim(self) -> Optional[Tuple[str, RunRequest]]:
+        """Atomically mark the next queued job as running and return it."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id, request FROM jobs WHERE status = 'queued' "
+                    "ORDER BY priority DESC, seq LIMIT 1"
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'running', started_at = ?, "
+                        "attempts = attempts + 1, progress = '{}' WHERE id = ?",
+                        (_now(), row["id"]),
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        return row["id"], RunRequest.parse_raw(row["request"])
+
+    def record_progress(self, job_id: str, stage: str, elapsed_ms: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs "
+                "SET progress = json_set(progress, '$.' || json_quote(?), ?) "
+                "WHERE id = ?",
+                (stage, elapsed_ms, job_id),
+            )
+
+    def complete(self, job_id: str) -> None:
+        self._finish(job_id, "succeeded", None)
+
+    def fail(self, job_id: str, error: str) -> None:
+        self._finish(job_id, "failed", error)
+
+    def requeue_running(self, max_attempts: Optional[int] = None) -> int:
+        """Return jobs left running by a previous process to the queue.
+
+        Jobs already claimed ``max_attempts`` times are marked failed instead,
+        so a job that keeps crashing or hanging the worker is not retried
+        forever. Returns the number of jobs requeued.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if max_attempts is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? "
+                        "WHERE status = 'running' AND attempts >= ?",
+                        (
+                            f"abandoned after {max_attempts} interrupted attempts",
+                            _now(),
+                            max_attempts,
+                        ),
+                    )
+                cursor = self._conn.execute(
+                    "UPDATE jobs SET status = 'queued', started_at = NULL, "
+                    "progress = '{}' WHERE status = 'running'"
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            return cursor.rowcount
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return _to_job(row) if row is not None else None
+
+    def count(self, status: str) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ?", (status,)
+            ).fetchone()
+        return row[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _finish(self, job_id: str, status: str, error: Optional[str]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                (status, error, _now(), job_id),
+            )
+
+
+def _to_job(row: sqlite3.Row) -> Job:
+    request: Dict[str, Any] = json.loads(row["request"])
+    return Job(
+        id=row["id"],
+        task_type=row["task_type"],
+        project_id=request.get("project_id", "default"),
+        priority=row["priority"],
+        status=row["status"],
+        progress=json.loads(row["progress"]),
+        error=row["error"],
+        attempts=row["attempts"],
+        created_at=row["created_at"],
+        started_at=row["started_at"],
+        finished_at=row["finished_at"],
+    )
@@ -0,0 +1,69 @@
+import math
+from typing import Dict, Optional
+
+
+class QuantileSketch:
+    """Log-bucketed streaming quantile sketch (DDSketch-style).
+
+    Values land in buckets whose bounds grow geometrically, so any quantile is
+    answered within ``relative_accuracy`` of the true value. Unlike most
+    streaming sketches it supports ``remove``, which lets callers keep it in
+    step with a bounded, trimmable collection.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01) -> None:
+        if not 0.0 < relative_accuracy < 1.0:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self._gamma = (1.0 + relative_accuracy) / (1.0 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._buckets: Dict[int, int] = {}
+        self._zero_count = 0
+        self._count = 0
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def add(self, value: float) -> None:
+        if value <= 0:
+            self._zero_count += 1
+        else:
+            key = self._key(value)
+            self._buckets[key] = self._buckets.get(key, 0) + 1
+        self._count += 1
+
+    def remove(self, value: float) -> None:
+        if value <= 0:
+            if self._zero_count == 0:
+                return
+            self._zero_count -= 1
+        else:
+            key = self._key(value)
+            current = self._buckets.get(key, 0)
+            if current == 0:
+                return
+            if current == 1:
+                del self._buckets[key]
+            else:
+                self._buckets[key] = current - 1
+        self._count -= 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self._count == 0:
+            return None
+        q = min(max(q, 0.0), 1.0)
+        rank = q * (self._count - 1)
+        seen = self._zero_count
+        if rank < seen:
+            return 0.0
+        for key in sorted(self._buckets):
+            seen += self._buckets[key]
+            if rank < seen:
+                return self._value(key)
+        return self._value(max(self._buckets))
+
+    def _key(self, value: float) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def _value(self, key: int) -> float:
+        return 2.0 * self._gamma**key / (self._gamma + 1.0)
@@ -1,66 +1,214 @@
 ﻿import json
-from datetime import datetime
+import threading
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Type, TypeVar, Union
 
-from ..models.run_record import RunRecord, RunStats
+from pydantic import BaseModel
+
+from ..models.report import QualityReport
+from ..models.run_record import (
+    HEAVY_FIELDS,
+    DurationQuantiles,
+    RunFields,
+    RunRecord,
+    RunStats,
+    RunSummary,
+)
+from .blob_store import BlobStore
+from .quantile_sketch import QuantileSketch
+
+# Bumped whenever the persisted layout changes. Files and blobs stamped with the
+# current version were written by this service and skip pydantic validation.
+SCHEMA_VERSION = 1
+
+_M = TypeVar("_M", bound=BaseModel)
 
 
 class RunStore:
-    def __init__(self, path: str = "./data/run_store.json", limit: int = 200) -> None:
+    def __init__(
+        self,
+        path: str = "./data/run_store.json",
+        limit: int = 200,
+        compression: str = "zlib",
+    ) -> None:
         self._path = Path(path)
         if self._path.suffix != ".json":
             self._path = self._path / "run_store.json"
         self._limit = limit
-        self._records: Dict[str, RunRecord] = {}
+        # Heavy payload fields live compressed on disk; only summaries stay resident.
+        self._blobs = BlobStore(
+            str(self._path.with_name(f"{self._path.stem}_blobs")), compression
+        )
+        self._lock = threading.RLock()
+        # Records are kept ordered by created_at (oldest first), so the newest run,
+        # the trim victim and list() ordering never require a sort.
+        self._records: Dict[str, RunSummary] = {}
+        self._task_counts: Dict[str, int] = {}
+        self._project_refs: Dict[str, int] = {}
+        self._durations: Dict[str, QuantileSketch] = {}
         self._load()
 
+    def __len__(self) -> int:
+        return len(self._records)
+
     def add(self, record: RunRecord) -> None:
-        self._records[record.id] = record
-        self._trim()
-        self._save()
+        with self._lock:
+            self._blobs.put(record.id, self._serialize_heavy(record))
+            self._insert(_summarize(record))
+            self._trim()
+            self._save()
 
-    def list(self, project_id: Optional[str] = None, limit: int = 50) -> List[RunRecord]:
-        records = self._list_sorted()
-        if project_id:
-            records = [r for r in records if r.project_id == project_id]
-        return records[:limit]
+    def add_many(self, records: List[RunRecord]) -> None:
+        """Add several runs with a single trim and a single write of the index."""
+        if not records:
+            return
+        with self._lock:
+            for record in records:
+                self._blobs.put(record.id, self._serialize_heavy(record))
+                self._insert(_summarize(record))
+            self._trim()
+            self._save()
 
-    def get(self, run_id: str) -> Optional[RunRecord]:
-        return self._records.get(run_id)
+    def list(
+        self,
+        project_id: Optional[str] = None,
+        limit: int = 50,
+        fields: RunFields = "full",
+    ) -> List[Union[RunRecord, RunSummary]]:
+        with self._lock:
+            summaries: List[RunSummary] = []
+            for summary in reversed(self._records.values()):
+                if len(summaries) >= limit:
+                    break
+                if project_id and summary.project_id != project_id:
+                    continue
+                summaries.append(summary)
+        if fields == "summary":
+            return summaries
+        records = (self._hydrate(summary) for summary in summaries)
+        return [record for record in records if record is not None]
+
+    def get(
+        self, run_id: str, fields: RunFields = "full"
+    ) -> Optional[Union[RunRecord, RunSummary]]:
+        summary = self._records.get(run_id)
+        if summary is None or fields == "summary":
+            return summary
+        return self._hydrate(summary)
+
+    def iter_records(
+        self,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        project_id: Optional[str] = None,
+        fields: RunFields = "full",
+    ) -> Iterator[Union[RunRecord, RunSummary]]:
+        """Yield runs oldest first, loading payload blobs one record at a time."""
+        since = _as_utc(since)
+        until = _as_utc(until)
+        with self._lock:
+            # Only references are copied, so later adds/deletes cannot break iteration.
+            summaries = tuple(self._records.values())
+        for summary in summaries:
+            if since and summary.created_at < since:
+                continue
+            if until and summary.created_at >= until:
+                break
+            if project_id and summary.project_id != project_id:
+                continue
+            if fields == "summary":
+                yield summary
+                continue
+            record = self._hydrate(summary)
+            if record is not None:
+                yield record
 
     def delete(self, run_id: str) -> bool:
-        if run_id in self._records:
-            del self._records[run_id]
+        with self._lock:
+            summary = self._records.pop(run_id, None)
+            if summary is None:
+                return False
+            self._uncount(summary)
+            self._blobs.delete(run_id)
             self._save()
             return True
-        return False
 
     def stats(self) -> RunStats:
-        records = self._list_sorted()
-        task_counts: Dict[str, int] = {}
-        project_ids = set()
-        latest: Optional[datetime] = None
-        for record in records:
-            task_counts[record.task_type] = task_counts.get(record.task_type, 0) + 1
-            project_ids.add(record.project_id)
-            if latest is None or record.created_at > latest:
-                latest = record.created_at
-        return RunStats(
-            total_runs=len(records),
-            project_count=len(project_ids),
-            task_type_counts=task_counts,
-            latest_run_at=latest,
+        with self._lock:
+            latest: Optional[datetime] = None
+            if self._records:
+                latest = self._records[next(reversed(self._records))].created_at
+            durations = {
+                task_type: DurationQuantiles(
+                    count=sketch.count,
+                    p50_ms=sketch.quantile(0.5),
+                    p95_ms=sketch.quantile(0.95),
+                )
+                for task_type, sketch in self._durations.items()
+            }
+            return RunStats(
+                total_runs=len(self._records),
+                project_count=len(self._project_refs),
+                task_type_counts=dict(self._task_counts),
+                latest_run_at=latest,
+                duration_ms_by_task_type=durations,
+            )
+
+    def _hydrate(self, summary: RunSummary) -> Optional[RunRecord]:
+        heavy = self._blobs.get(summary.id)
+        if heavy is None:
+            return None
+        version = heavy.pop("schema_version", None)
+        data = {**summary.dict(), **heavy}
+        if version == SCHEMA_VERSION:
+            try:
+                data["quality_report"] = _construct(
+                    QualityReport, data["quality_report"]
+                )
+                return _construct(RunRecord, data)
+            except (KeyError, TypeError):
+                pass
+        return RunRecord(**data)
+
+    def _insert(self, record: RunSummary) -> None:
+        previous = self._records.pop(record.id, None)
+        if previous is not None:
+            self._uncount(previous)
+        newest = self._records[next(reversed(self._records))] if self._records else None
+        self._records[record.id] = record
+        if newest is not None and record.created_at < newest.created_at:
+            # Out-of-order insert (clock skew or imported data): restore ordering.
+            ordered = sorted(self._records.values(), key=lambda r: r.created_at)
+            self._records = {r.id: r for r in ordered}
+        self._count(record)
+
+    def _count(self, record: RunSummary) -> None:
+        self._task_counts[record.task_type] = (
+            self._task_counts.get(record.task_type, 0) + 1
+        )
+        self._project_refs[record.project_id] = (
+            self._project_refs.get(record.project_id, 0) + 1
         )
+        sketch = self._durations.get(record.task_type)
+        if sketch is None:
+            sketch = self._durations[record.task_type] = QuantileSketch()
+        sketch.add(record.duration_ms)
 
-    def _list_sorted(self) -> List[RunRecord]:
-        return sorted(self._records.values(), key=lambda r: r.created_at, reverse=True)
+    def _uncount(self, record: RunSummary) -> None:
+        _decrement(self._task_counts, record.task_type)
+        _decrement(self._project_refs, record.project_id)
+        sketch = self._durations.get(record.task_type)
+        if sketch is not None:
+            sketch.remove(record.duration_ms)
+            if sketch.count == 0:
+                del self._durations[record.task_type]
 
     def _trim(self) -> None:
-        if len(self._records) <= self._limit:
-            return
-        records = self._list_sorted()[: self._limit]
-        self._records = {r.id: r for r in records}
+        while len(self._records) > self._limit:
+            oldest_id = next(iter(self._records))
+            self._uncount(self._records.pop(oldest_id))
+            self._blobs.delete(oldest_id)
 
     def _load(self) -> None:
         if not self._path.exists():
@@ -69,11 +217,23 @@ class RunStore:
             payload = json.loads(self._path.read_text(encoding="utf-8"))
         except json.JSONDecodeError:
             return
+        trusted = False
+        if isinstance(payload, dict):
+            trusted = payload.get("schema_version") == SCHEMA_VERSION
+            payload = payload.get("runs")
         if not isinstance(payload, list):
             return
+        loaded: List[RunSummary] = []
+        migrated = not trusted
         for item in payload:
             if not isinstance(item, dict):
                 continue
+            if trusted:
+                try:
+                    loaded.append(_load_trusted_summary(item))
+                    continue
+                except (KeyError, TypeError, ValueError):
+                    pass
             created_at = item.get("created_at")
             if isinstance(created_at, str):
                 try:
@@ -81,18 +241,72 @@ class RunStore:
                 except ValueError:
                     continue
             try:
-                record = RunRecord(**item)
+                if any(name in item for name in HEAVY_FIELDS):
+                    # Legacy inline record: move its payload into the blob store.
+                    record = RunRecord(**item)
+                    self._blobs.put(record.id, self._serialize_heavy(record))
+                    summary = _summarize(record)
+                else:
+                    summary = RunSummary(**item)
             except Exception:
                 continue
-            self._records[record.id] = record
+            loaded.append(summary)
+        loaded.sort(key=lambda r: r.created_at)
+        for summary in loaded:
+            self._insert(summary)
+        if migrated and loaded:
+            self._save()
 
     def _save(self) -> None:
         self._path.parent.mkdir(parents=True, exist_ok=True)
-        payload = [self._serialize(r) for r in self._list_sorted()]
+        payload = {
+            "schema_version": SCHEMA_VERSION,
+            "runs": [self._serialize(r) for r in reversed(self._records.values())],
+        }
         self._path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
 
     @staticmethod
-    def _serialize(record: RunRecord) -> Dict[str, object]:
+    def _serialize(record: RunSummary) -> Dict[str, object]:
         data = record.dict()
         data["created_at"] = record.created_at.isoformat()
         return data
+
+    @staticmethod
+    def _serialize_heavy(record: RunRecord) -> Dict[str, object]:
+        data = record.dict(include=set(HEAVY_FIELDS))
+        data["schema_version"] = SCHEMA_VERSION
+        return data
+
+
+def _summarize(record: RunRecord) -> RunSummary:
+    return RunSummary.construct(
+        **{name: getattr(record, name) for name in RunSummary.__fields__}
+    )
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _load_trusted_summary(item: Dict[str, Any]) -> RunSummary:
+    data = dict(item)
+    data["created_at"] = datetime.fromisoformat(data["created_at"])
+    return _construct(RunSummary, data)
+
+
+def _construct(model: Type[_M], data: Dict[str, Any]) -> _M:
+    fields = model.__fields__
+    missing = [name for name, f in fields.items() if f.required and name not in data]
+    if missing:
+        raise KeyError(f"missing fields: {missing}")
+    return model.construct(**{k: v for k, v in data.items() if k in fields})
+
+
+def _decrement(counts: Dict[str, int], key: str) -> None:
+    remaining = counts.get(key, 0) - 1
+    if remaining > 0:
+        counts[key] = remaining
+    else:
+        counts.pop(key, None)
@@ -11,6 +11,9 @@ class VectorDB:
             self._path = self._path / "vector_db.json"
         self._load()
 
+    def __len__(self) -> int:
+        return len(self._rows)
+
     def upsert(self, text: str, embedding: List[float]) -> None:
         for idx, (stored_text, _stored_emb) in enumerate(self._rows):
             if stored_text == text:
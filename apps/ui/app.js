@@ -105,6 +105,11 @@ function getStatusText(status) {
 }
 
 function formatDetail(tool, detail) {
+  if (detail.reason) return `건너뜀: ${detail.reason}`;
+  if (tool === "syntax") {
+    if (!detail.message) return "구문 오류가 없습니다.";
+    return detail.line ? `${detail.message} (${detail.line}행)` : detail.message;
+  }
   if (tool === "lint") {
     const count = detail.count || 0;
     if (count === 0) return "린트 문제가 없습니다.";
@@ -128,12 +133,15 @@ function formatDetail(tool, detail) {
 function renderQuality(report) {
   qualityReport.innerHTML = "";
   const tools = [
+    { key: "syntax", label: "구문" },
     { key: "lint", label: "린트" },
     { key: "test", label: "테스트" },
     { key: "coverage", label: "커버리지" },
   ];
 
   tools.forEach(({ key, label }) => {
+    // Reports recorded before the syntax gate existed have no syntax entry.
+    if (key === "syntax" && !report?.syntax) return;
     const data = report?.[key] || { status: "unknown", detail: {} };
     const card = document.createElement("div");
     card.className = "report-card";
@@ -350,7 +358,7 @@ async function loadStatus() {
 async function loadOps() {
   try {
     const [runs, prompts, memStats] = await Promise.all([
-      fetchJson("/runs?limit=20"),
+      fetchJson("/runs?limit=20&fields=summary"),
       fetchJson("/prompts"),
       fetchJson("/memory/stats"),
     ]);
@@ -404,7 +412,7 @@ clearRunsBtn.addEventListener("click", async () => {
   if (!confirm("모든 실행 기록을 삭제할까요?")) {
     return;
   }
-  const runs = await fetchJson("/runs?limit=50");
+  const runs = await fetchJson("/runs?limit=50&fields=summary");
   for (const run of runs) {
     await fetchJson(`/runs/${run.id}`, { method: "DELETE" });
   }
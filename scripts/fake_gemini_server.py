@@ -0,0 +1,52 @@
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from apps.orchestrator.core.llm_simulator import LLMSimulator, make_gemini_server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Local server speaking the Gemini generateContent wire format."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument(
+        "--p50", type=float, default=0.8, help="time to first token p50 (s)"
+    )
+    parser.add_argument(
+        "--p95", type=float, default=2.5, help="time to first token p95 (s)"
+    )
+    parser.add_argument("--tokens-per-s", type=float, default=80.0)
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="share of 503 answers"
+    )
+    parser.add_argument(
+        "--rate-limit-rate", type=float, default=0.0, help="share of 429 answers"
+    )
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    simulator = LLMSimulator(
+        latency_p50_s=args.p50,
+        latency_p95_s=args.p95,
+        tokens_per_s=args.tokens_per_s,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        seed=args.seed,
+    )
+    server = make_gemini_server(simulator, args.host, args.port)
+    print(f"Fake Gemini listening on http://{args.host}:{args.port}")
+    print(f"Use LLM_PROVIDER=gemini LLM_API_KEY=fake LLM_BASE_URL=http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+from shared.metrics import MetricsRegistry
+
+registry = MetricsRegistry()
+
+HTTP_REQUESTS = registry.counter(
+    "mcp_http_requests_total", "HTTP requests by route.", ("method", "route", "status")
+)
+HTTP_LATENCY = registry.histogram(
+    "mcp_http_request_duration_seconds", "HTTP request latency.", ("method", "route")
+)
+HTTP_IN_FLIGHT = registry.gauge(
+    "mcp_http_requests_in_flight", "HTTP requests currently being served."
+)
+TOOL_RUNS = registry.counter(
+    "mcp_tool_runs_total", "Tool runs by tool and status.", ("tool", "status")
+)
+TOOL_SUBPROCESS_LATENCY = registry.histogram(
+    "mcp_tool_subprocess_duration_seconds", "Wall time of tool subprocesses.", ("tool",)
+)
+TOOL_SUBPROCESS_TIMEOUTS = registry.counter(
+    "mcp_tool_subprocess_timeouts_total",
+    "Tool subprocesses killed after a timeout.",
+    ("tool",),
+)
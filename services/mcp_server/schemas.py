@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Any, Dict
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List
 
 
 class ToolRequest(BaseModel):
@@ -9,3 +9,14 @@ class ToolRequest(BaseModel):
 class ToolResponse(BaseModel):
     status: str
     detail: Dict[str, Any]
+
+
+class BatchToolRequest(BaseModel):
+    payload: Dict[str, Any]
+    tools: List[str] = Field(..., min_items=1)
+    # Per-tool time limits in seconds; tools without one run to completion.
+    timeouts_s: Dict[str, float] = Field(default_factory=dict)
+
+
+class BatchToolResponse(BaseModel):
+    results: Dict[str, ToolResponse]
@@ -1,9 +1,15 @@
+import asyncio
+from typing import Any, Dict
+
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from .schemas import ToolRequest, ToolResponse
-from .tools.lint import run_lint
-from .tools.test import run_test
-from .tools.coverage import run_coverage
+from fastapi.responses import PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+from shared.metrics import HTTPMetricsMiddleware
+from .metrics import HTTP_IN_FLIGHT, HTTP_LATENCY, HTTP_REQUESTS, TOOL_RUNS, registry
+from .schemas import BatchToolRequest, BatchToolResponse, ToolRequest, ToolResponse
+from .tools import TOOLS
+from .tools.workspace import workspaces
 
 app = FastAPI(title="MCP Tool Server")
 app.add_middleware(
@@ -13,17 +19,82 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(
+    HTTPMetricsMiddleware,
+    requests=HTTP_REQUESTS,
+    latency=HTTP_LATENCY,
+    in_flight=HTTP_IN_FLIGHT,
+)
 
 
 @app.post("/tool/{name}", response_model=ToolResponse)
 def run_tool(name: str, req: ToolRequest):
-    if name == "lint":
-        result = run_lint(req.payload)
-    elif name == "test":
-        result = run_test(req.payload)
-    elif name == "coverage":
-        result = run_coverage(req.payload)
-    else:
+    tool = TOOLS.get(name)
+    if tool is None:
         raise HTTPException(status_code=404, detail="Unknown tool")
 
+    result = tool(req.payload)
+    TOOL_RUNS.inc(tool=name, status=result["status"])
     return ToolResponse(status=result["status"], detail=result["detail"])
+
+
+@app.post("/tools/batch", response_model=BatchToolResponse)
+async def run_tools(req: BatchToolRequest):
+    """Run several tools on one payload concurrently and return all results at once."""
+    unknown = [name for name in req.tools if name not in TOOLS]
+    if unknown:
+        raise HTTPException(
+            status_code=404, detail=f"Unknown tool: {', '.join(unknown)}"
+        )
+
+    names = list(dict.fromkeys(req.tools))
+    # Holding the payload's workspace for the whole batch lets its tools share
+    # work done on it (test and coverage use one pytest run). The hold is only
+    # bookkeeping, so it is taken and released on the event loop, where a
+    # cancelled request cannot skip the release.
+    held = workspaces.hold(
+        str(req.payload.get("code", "")), str(req.payload.get("tests", ""))
+    )
+    try:
+        results = await asyncio.gather(
+            *(
+                _run_limited(name, req.payload, req.timeouts_s.get(name))
+                for name in names
+            )
+        )
+    finally:
+        workspaces.release(held)
+    for name, result in zip(names, results):
+        TOOL_RUNS.inc(tool=name, status=result["status"])
+    return BatchToolResponse(
+        results={
+            name: ToolResponse(status=result["status"], detail=result["detail"])
+            for name, result in zip(names, results)
+        }
+    )
+
+
+async def _run_limited(
+    name: str, payload: Dict[str, Any], timeout_s: float | None
+) -> Dict[str, Any]:
+    # A tool past its limit is reported as timed out; its worker thread finishes
+    # in the background once the tool's own subprocess timeout fires.
+    try:
+        return await asyncio.wait_for(
+            run_in_threadpool(TOOLS[name], payload), timeout_s
+        )
+    except asyncio.TimeoutError:
+        return {
+            "status": "error",
+            "detail": {"message": "tool timed out", "timeout_s": timeout_s},
+        }
+    except Exception as exc:  # noqa: BLE001 - one failing tool must not fail the batch
+        return {
+            "status": "error",
+            "detail": {"message": "tool failed", "error": str(exc)},
+        }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
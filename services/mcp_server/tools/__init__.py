@@ -0,0 +1,13 @@
+from typing import Any, Callable, Dict
+
+from .coverage import run_coverage
+from .lint import run_lint
+from .test import run_test
+
+# Tool name -> implementation; each takes the request payload and returns
+# {"status": ..., "detail": {...}}.
+TOOLS: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+    "lint": run_lint,
+    "test": run_test,
+    "coverage": run_coverage,
+}
@@ -1,54 +1,13 @@
-import re
-import sys
-import tempfile
 import importlib.util
-from typing import Any, Dict, List, Optional
-import subprocess
+from typing import Any, Dict
 
-from .testgen import generate_pytest_from_cases
+from .pytest_runner import run_pytest_with_coverage
 
 
 def _module_available(name: str) -> bool:
     return importlib.util.find_spec(name) is not None
 
 
-def _run_cmd(args: List[str], cwd: str) -> subprocess.CompletedProcess:
-    return subprocess.run(
-        args,
-        cwd=cwd,
-        capture_output=True,
-        text=True,
-        timeout=30,
-    )
-
-
-def _parse_coverage_report(report_text: str, target_file: str) -> Dict[str, Any]:
-    report_text = _strip_ansi(report_text)
-    coverage_percent: Optional[float] = None
-    missing_lines: List[str] = []
-
-    line_re = re.compile(r"^(.+?)\s+(\d+)\s+(\d+)\s+(\d+)%\s*(.*)$")
-    for line in report_text.splitlines():
-        m = line_re.match(line.strip())
-        if not m:
-            continue
-        name, _stmts, _miss, pct, missing = m.groups()
-        if name.strip() == "TOTAL":
-            coverage_percent = float(pct)
-        if name.endswith(target_file):
-            if missing:
-                missing_lines = [s.strip() for s in missing.split(",") if s.strip()]
-
-    return {
-        "coverage_percent": coverage_percent,
-        "missing_lines": missing_lines,
-    }
-
-
-def _strip_ansi(text: str) -> str:
-    return re.sub(r"\x1b\[[0-9;]*m", "", text or "")
-
-
 def run_coverage(payload: Dict[str, Any]) -> Dict[str, Any]:
     if not _module_available("coverage"):
         return {
@@ -62,61 +21,10 @@ def run_coverage(payload: Dict[str, Any]) -> Dict[str, Any]:
         }
 
     code = str(payload.get("code", ""))
-    tests = str(payload.get("tests", ""))
     if not code.strip():
         return {
             "status": "error",
             "detail": {"message": "empty code payload"},
         }
-    with tempfile.TemporaryDirectory() as tmpdir:
-        code_name = "app.py"
-        test_name = "test_generated.py"
-        code_path = f"{tmpdir}/{code_name}"
-        test_path = f"{tmpdir}/{test_name}"
-        with open(code_path, "w", encoding="utf-8") as f:
-            f.write(code)
-        if tests.strip():
-            test_code, test_err = generate_pytest_from_cases(tests)
-            if test_err:
-                return {"status": "error", "detail": {"message": test_err}}
-            if not test_code.strip():
-                return {"status": "skipped", "detail": {"message": "no test cases generated"}}
-            with open(test_path, "w", encoding="utf-8") as f:
-                f.write(test_code)
-            pytest_target = test_path
-        else:
-            # Fall back to running pytest on the provided code file.
-            pytest_target = code_path
-
-        run_args = [
-            sys.executable,
-            "-m",
-            "coverage",
-            "run",
-            "-m",
-            "pytest",
-            "-q",
-            "--disable-warnings",
-            pytest_target,
-        ]
-        run_proc = _run_cmd(run_args, tmpdir)
-
-        report_args = [sys.executable, "-m", "coverage", "report", "-m"]
-        report_proc = _run_cmd(report_args, tmpdir)
-        parsed = _parse_coverage_report(report_proc.stdout, code_name)
-
-        combined = (run_proc.stdout + "\n" + run_proc.stderr).lower()
-        if "no tests ran" in combined or "no tests collected" in combined or "no data to report" in report_proc.stdout.lower():
-            status = "skipped"
-        else:
-            status = "ok" if run_proc.returncode == 0 else "failed"
-        return {
-            "status": status,
-            "detail": {
-                "coverage_percent": parsed["coverage_percent"],
-                "missing_lines": parsed["missing_lines"],
-                "stdout": run_proc.stdout,
-                "stderr": run_proc.stderr,
-                "report": report_proc.stdout,
-            },
-        }
+    # Shares one pytest run with run_test on the same payload.
+    return run_pytest_with_coverage(payload)["coverage"]
@@ -1,11 +1,12 @@
 import json
 import sys
-import tempfile
 import importlib.util
 from typing import Any, Dict, List
 import subprocess
+from time import perf_counter
 
-from .testgen import generate_pytest_from_cases
+from ..metrics import TOOL_SUBPROCESS_LATENCY, TOOL_SUBPROCESS_TIMEOUTS
+from .workspace import workspaces
 
 
 def _module_available(name: str) -> bool:
@@ -13,13 +14,20 @@ def _module_available(name: str) -> bool:
 
 
 def _run_cmd(args: List[str], cwd: str) -> subprocess.CompletedProcess:
-    return subprocess.run(
-        args,
-        cwd=cwd,
-        capture_output=True,
-        text=True,
-        timeout=10,
-    )
+    started = perf_counter()
+    try:
+        return subprocess.run(
+            args,
+            cwd=cwd,
+            capture_output=True,
+            text=True,
+            timeout=10,
+        )
+    except subprocess.TimeoutExpired:
+        TOOL_SUBPROCESS_TIMEOUTS.inc(tool="lint")
+        raise
+    finally:
+        TOOL_SUBPROCESS_LATENCY.observe(perf_counter() - started, tool="lint")
 
 
 def run_lint(payload: Dict[str, Any]) -> Dict[str, Any]:
@@ -37,44 +45,38 @@ def run_lint(payload: Dict[str, Any]) -> Dict[str, Any]:
             "detail": {"message": "empty code payload"},
         }
 
-    with tempfile.TemporaryDirectory() as tmpdir:
-        code_path = f"{tmpdir}/app.py"
-        with open(code_path, "w", encoding="utf-8") as f:
-            f.write(code)
-        test_path = None
-        test_err = None
-        if tests.strip():
-            test_code, test_err = generate_pytest_from_cases(tests)
-            if test_code.strip():
-                test_path = f"{tmpdir}/test_generated.py"
-                with open(test_path, "w", encoding="utf-8") as f:
-                    f.write(test_code)
+    with workspaces.acquire(code, tests) as ws:
+        code_path = ws.code_path
+        test_path = ws.test_path
+        test_err = ws.test_error
 
         args = [
             sys.executable,
             "-m",
             "ruff",
             "check",
+            "--no-cache",
             "--output-format",
             "json",
             code_path,
         ]
         if test_path:
             args.append(test_path)
-        proc = _run_cmd(args, tmpdir)
+        proc = _run_cmd(args, ws.path)
         if proc.returncode != 0 and "unexpected argument '--output-format'" in proc.stderr:
             args = [
                 sys.executable,
                 "-m",
                 "ruff",
                 "check",
+                "--no-cache",
                 "--format",
                 "json",
                 code_path,
             ]
             if test_path:
                 args.append(test_path)
-            proc = _run_cmd(args, tmpdir)
+            proc = _run_cmd(args, ws.path)
 
         violations: List[Dict[str, Any]] = []
         stdout = proc.stdout.strip()
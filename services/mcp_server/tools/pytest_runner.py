@@ -0,0 +1,219 @@
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import xml.etree.ElementTree as ET
+from itertools import groupby
+from time import perf_counter
+from typing import Any, Dict, List, Tuple
+
+from ..metrics import TOOL_SUBPROCESS_LATENCY, TOOL_SUBPROCESS_TIMEOUTS
+from .workspace import CODE_NAME, Workspace, workspaces
+
+# Runs pytest in-process under coverage (when requested) and leaves structured
+# reports behind: JUnit XML for test outcomes and coverage JSON.
+_DRIVER = """
+import sys
+
+import pytest
+
+
+class _Outcomes:
+    # JUnit XML has no element for a non-strict xpass; tag it as a property.
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_makereport(self, item, call):
+        report = (yield).get_result()
+        if report.when == "call" and report.passed and hasattr(report, "wasxfail"):
+            item.user_properties.append(("outcome", "xpassed"))
+
+
+target, junit_path, json_path = sys.argv[1:4]
+cov = None
+if json_path:
+    import coverage
+
+    cov = coverage.Coverage(data_file=None, source=["."])
+    cov.start()
+args = ["-q", "--disable-warnings", "-p", "no:cacheprovider"]
+exit_code = pytest.main(
+    [*args, "--junitxml=" + junit_path, target], plugins=[_Outcomes()]
+)
+if cov is not None:
+    cov.stop()
+    try:
+        cov.json_report(outfile=json_path)
+    except coverage.CoverageException:
+        pass
+sys.exit(int(exit_code))
+"""
+
+_JUNIT_NAME = "junit.xml"
+_COVERAGE_NAME = "coverage.json"
+_TIMEOUT_S = 30
+
+# pytest exit code when nothing was collected.
+_NO_TESTS_COLLECTED = 5
+
+
+def _module_available(name: str) -> bool:
+    return importlib.util.find_spec(name) is not None
+
+
+def _run_cmd(args: List[str], cwd: str) -> subprocess.CompletedProcess:
+    started = perf_counter()
+    try:
+        return subprocess.run(
+            args,
+            cwd=cwd,
+            capture_output=True,
+            text=True,
+            timeout=_TIMEOUT_S,
+            # The workspace is shared: keep __pycache__ out of it.
+            env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+        )
+    except subprocess.TimeoutExpired:
+        TOOL_SUBPROCESS_TIMEOUTS.inc(tool="pytest")
+        raise
+    finally:
+        TOOL_SUBPROCESS_LATENCY.observe(perf_counter() - started, tool="pytest")
+
+
+def run_pytest_with_coverage(payload: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Run the payload's tests once and return ``{"test": ..., "coverage": ...}``.
+
+    Calls holding the payload's workspace at the same time (``/tool/test`` and
+    ``/tool/coverage`` of one batch) share a single pytest run.
+    """
+    code = str(payload.get("code", ""))
+    tests = str(payload.get("tests", ""))
+    with workspaces.acquire(code, tests) as ws:
+        return ws.once("pytest", lambda: _execute(ws))
+
+
+def _execute(ws: Workspace) -> Dict[str, Dict[str, Any]]:
+    if ws.test_error:
+        return _both({"status": "error", "detail": {"message": ws.test_error}})
+    if ws.tests_requested and ws.test_path is None:
+        return _both(
+            {"status": "skipped", "detail": {"message": "no test cases generated"}}
+        )
+    # Without separate tests, run pytest on the code file itself; this
+    # enables execution when tests are embedded in the code payload.
+    target = ws.test_path or ws.code_path
+
+    with_coverage = _module_available("coverage")
+    junit_path = ws.output_path(_JUNIT_NAME)
+    json_path = ws.output_path(_COVERAGE_NAME) if with_coverage else ""
+    try:
+        proc = _run_cmd(
+            [sys.executable, "-c", _DRIVER, target, junit_path, json_path], ws.path
+        )
+        test_result = _test_result(proc, junit_path)
+        if not with_coverage:
+            coverage_result = {
+                "status": "error",
+                "detail": {"message": "coverage is not installed"},
+            }
+        else:
+            coverage_result = _coverage_result(proc, json_path)
+    finally:
+        for path in (junit_path, json_path):
+            if path and os.path.exists(path):
+                os.remove(path)
+    return {"test": test_result, "coverage": coverage_result}
+
+
+def _both(result: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    return {"test": result, "coverage": result}
+
+
+def _test_result(proc: subprocess.CompletedProcess, junit_path: str) -> Dict[str, Any]:
+    summary = _parse_junit(junit_path)
+    if proc.returncode == _NO_TESTS_COLLECTED:
+        status = "skipped"
+    else:
+        status = "passed" if proc.returncode == 0 else "failed"
+    return {
+        "status": status,
+        "detail": {"summary": summary, "stdout": proc.stdout, "stderr": proc.stderr},
+    }
+
+
+def _coverage_result(
+    proc: subprocess.CompletedProcess, json_path: str
+) -> Dict[str, Any]:
+    coverage_percent, missing_lines = _parse_coverage_json(json_path)
+    if proc.returncode == _NO_TESTS_COLLECTED or coverage_percent is None:
+        status = "skipped"
+    else:
+        status = "ok" if proc.returncode == 0 else "failed"
+    return {
+        "status": status,
+        "detail": {
+            "coverage_percent": coverage_percent,
+            "missing_lines": missing_lines,
+            "stdout": proc.stdout,
+            "stderr": proc.stderr,
+        },
+    }
+
+
+def _parse_junit(path: str) -> Dict[str, Any]:
+    summary: Dict[str, Any] = {
+        "passed": 0,
+        "failed": 0,
+        "skipped": 0,
+        "xfailed": 0,
+        "xpassed": 0,
+        "duration_s": None,
+    }
+    try:
+        root = ET.parse(path).getroot()
+    except (OSError, ET.ParseError):
+        return summary
+    suites = [root] if root.tag == "testsuite" else root.findall("testsuite")
+    duration = 0.0
+    for suite in suites:
+        duration += float(suite.get("time") or 0.0)
+        for case in suite.iter("testcase"):
+            summary[_outcome(case)] += 1
+    summary["duration_s"] = round(duration, 3)
+    return summary
+
+
+def _outcome(case: ET.Element) -> str:
+    if case.find("failure") is not None or case.find("error") is not None:
+        return "failed"
+    skipped = case.find("skipped")
+    if skipped is not None:
+        return "xfailed" if skipped.get("type") == "pytest.xfail" else "skipped"
+    if case.find("properties/property[@name='outcome'][@value='xpassed']") is not None:
+        return "xpassed"
+    return "passed"
+
+
+def _parse_coverage_json(path: str) -> Tuple[float | None, List[str]]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            report = json.load(f)
+    except (OSError, ValueError):
+        return None, []
+    missing: List[int] = []
+    for name, data in report.get("files", {}).items():
+        if os.path.basename(name) == CODE_NAME:
+            missing = data.get("missing_lines", [])
+    percent = report.get("totals", {}).get("percent_covered_display")
+    return (float(percent) if percent is not None else None), _line_ranges(missing)
+
+
+def _line_ranges(lines: List[int]) -> List[str]:
+    """Collapse line numbers into report-style ranges: [3, 4, 5, 9] -> ["3-5", "9"]."""
+    ranges: List[str] = []
+    # Consecutive lines share the same line - index offset.
+    for _, group in groupby(
+        enumerate(sorted(lines)), key=lambda item: item[1] - item[0]
+    ):
+        run = [line for _, line in group]
+        ranges.append(str(run[0]) if len(run) == 1 else f"{run[0]}-{run[-1]}")
+    return ranges
@@ -0,0 +1,220 @@
+import atexit
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, Optional, TypeVar
+
+from .testgen import generate_pytest_from_cases
+
+CODE_NAME = "app.py"
+TEST_NAME = "test_generated.py"
+
+# Memory-backed filesystem used for workspaces when the host has one.
+_TMPFS_DIR = "/dev/shm"
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class Workspace:
+    """Code and generated tests for one payload, written once and shared read-only.
+
+    Tools must not write into ``path`` except through ``output_path``, which
+    hands out a name no other caller will use.
+    """
+
+    path: str
+    code_path: str
+    # True when the payload carried tests (JSON cases or pytest code).
+    tests_requested: bool
+    # Generated pytest file; None without tests or when none were generated.
+    test_path: Optional[str]
+    test_error: Optional[str]
+    _shared: Dict[str, Future] = field(default_factory=dict, compare=False, repr=False)
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock, compare=False, repr=False
+    )
+
+    def output_path(self, name: str) -> str:
+        stem, ext = os.path.splitext(name)
+        return os.path.join(self.path, f"{stem}-{uuid.uuid4().hex}{ext}")
+
+    def once(self, name: str, fn: Callable[[], T]) -> T:
+        """Return ``fn()``, computed once per ``name`` while the workspace is held.
+
+        Callers holding the workspace at the same time wait for and share one
+        result; it is dropped when the last holder releases the workspace. A
+        failed call is not kept, so the next caller runs ``fn`` again.
+        """
+        with self._lock:
+            future = self._shared.get(name)
+            owner = future is None
+            if owner:
+                future = self._shared[name] = Future()
+        if owner:
+            try:
+                future.set_result(fn())
+            except BaseException as exc:  # noqa: BLE001 - handed to every waiter
+                with self._lock:
+                    self._shared.pop(name, None)
+                future.set_exception(exc)
+        return future.result()
+
+    def _forget(self) -> None:
+        with self._lock:
+            self._shared.clear()
+
+
+class _Entry:
+    __slots__ = ("path", "ready", "claimed", "refs", "last_used")
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        # Resolves to the Workspace once the first user has written it.
+        self.ready: Future = Future()
+        self.claimed = False
+        self.refs = 0
+        self.last_used = time.monotonic()
+
+
+class WorkspaceManager:
+    """Content-addressed workspaces shared by the tools running on one payload.
+
+    A payload's code and tests are hashed; the first ``acquire`` writes
+    ``app.py`` and the generated tests under ``root``, and later calls with the
+    same content reuse that directory. Each workspace is reference counted;
+    results shared through ``Workspace.once`` live while it is held, and the
+    directory is removed once unused for ``ttl_s`` seconds. ``root`` defaults to a fresh
+    directory on tmpfs (``/dev/shm``) when available, else the system temp dir.
+    """
+
+    def __init__(self, root: Optional[str] = None, ttl_s: float = 60.0) -> None:
+        self.ttl_s = ttl_s
+        self._root = root
+        self._owns_root = root is None
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    @property
+    def root(self) -> str:
+        with self._lock:
+            return self._ensure_root()
+
+    @contextmanager
+    def acquire(self, code: str, tests: str) -> Iterator[Workspace]:
+        self.sweep()
+        key = self.hold(code, tests)
+        try:
+            yield self._workspace(key, code, tests)
+        finally:
+            self.release(key)
+            self.sweep()
+
+    def hold(self, code: str, tests: str) -> str:
+        """Keep the payload's workspace alive until ``release`` of the returned key.
+
+        Only bookkeeping happens here; the files are written by the first
+        ``acquire``. That makes it safe to call from an event loop, where a hold
+        taken in a worker thread could be lost to a cancellation.
+        """
+        key = hashlib.sha256(json.dumps([code, tests]).encode("utf-8")).hexdigest()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                path = os.path.join(self._ensure_root(), key[:32])
+                entry = self._entries[key] = _Entry(path)
+            entry.refs += 1
+        return key
+
+    def release(self, key: str) -> None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:  # closed while held
+                return
+            entry.refs -= 1
+            if entry.refs == 0 and entry.ready.done() and not entry.ready.exception():
+                entry.ready.result()._forget()
+            entry.last_used = time.monotonic()
+
+    def sweep(self) -> int:
+        """Remove workspaces idle for over ``ttl_s``; return how many were removed."""
+        with self._lock:
+            return self._sweep(time.monotonic())
+
+    def close(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            if self._root and self._owns_root:
+                shutil.rmtree(self._root, ignore_errors=True)
+                self._root = None
+
+    def _ensure_root(self) -> str:
+        if self._root is None:
+            base = _TMPFS_DIR if os.access(_TMPFS_DIR, os.W_OK) else None
+            self._root = tempfile.mkdtemp(prefix="mcp-workspaces-", dir=base)
+        return self._root
+
+    def _workspace(self, key: str, code: str, tests: str) -> Workspace:
+        # The manager lock only claims the entry; files are written outside it
+        # so unrelated payloads are materialized in parallel.
+        with self._lock:
+            entry = self._entries[key]
+            ready = entry.ready
+            owner = not entry.claimed
+            entry.claimed = True
+        if owner:
+            try:
+                ready.set_result(_materialize(entry.path, code, tests))
+            except BaseException as exc:  # noqa: BLE001 - handed to every waiter
+                with self._lock:
+                    # Start clean so the next caller can try again.
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                    entry.ready = Future()
+                    entry.claimed = False
+                ready.set_exception(exc)
+        return ready.result()
+
+    def _sweep(self, now: float) -> int:
+        expired = [
+            key
+            for key, entry in self._entries.items()
+            if entry.refs == 0 and now - entry.last_used > self.ttl_s
+        ]
+        for key in expired:
+            shutil.rmtree(self._entries.pop(key).path, ignore_errors=True)
+        return len(expired)
+
+
+def _materialize(path: str, code: str, tests: str) -> Workspace:
+    os.makedirs(path, exist_ok=True)
+    code_path = os.path.join(path, CODE_NAME)
+    _write(code_path, code)
+    test_path = None
+    test_error = None
+    if tests.strip():
+        test_code, test_error = generate_pytest_from_cases(tests)
+        if not test_error and test_code.strip():
+            test_path = os.path.join(path, TEST_NAME)
+            _write(test_path, test_code)
+    return Workspace(path, code_path, bool(tests.strip()), test_path, test_error)
+
+
+def _write(path: str, text: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+workspaces = WorkspaceManager()
+atexit.register(workspaces.close)
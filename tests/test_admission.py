@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from apps.orchestrator.core.admission import AdmissionController, Overloaded
+
+
+def test_admission_queues_fifo_then_sheds_load():
+    async def scenario():
+        admission = AdmissionController(max_in_flight=1, max_queue=2, retry_after_s=3)
+        order = []
+
+        async def job(name: str, hold_s: float) -> float:
+            waited = await admission.acquire()
+            try:
+                order.append(name)
+                await asyncio.sleep(hold_s)
+            finally:
+                admission.release()
+            return waited
+
+        first = asyncio.create_task(job("first", 0.05))
+        await asyncio.sleep(0)
+        queued = [asyncio.create_task(job(name, 0.01)) for name in ("second", "third")]
+        await asyncio.sleep(0)
+        assert (admission.in_flight, admission.queued) == (1, 2)
+
+        with pytest.raises(Overloaded) as excinfo:
+            await admission.acquire()
+        assert excinfo.value.retry_after_s == 3
+
+        waits = await asyncio.gather(first, *queued)
+        assert order == ["first", "second", "third"]
+        assert waits[0] == 0.0 and waits[1] > 0.0
+        assert (admission.in_flight, admission.queued) == (0, 0)
+
+    asyncio.run(scenario())
+
+
+def test_admission_cancelled_waiter_gives_up_its_place():
+    async def scenario():
+        admission = AdmissionController(max_in_flight=1, max_queue=1)
+        await admission.acquire()
+        waiter = asyncio.create_task(admission.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert admission.queued == 0
+
+        admission.release()
+        assert admission.in_flight == 0
+        assert await admission.acquire() == 0.0
+
+    asyncio.run(scenario())
+
+
+def test_admission_release_before_cancelled_waiter_resumes():
+    async def scenario():
+        admission = AdmissionController(max_in_flight=1, max_queue=2)
+        await admission.acquire()
+        cancelled = asyncio.create_task(admission.acquire())
+        next_in_line = asyncio.create_task(admission.acquire())
+        await asyncio.sleep(0)
+
+        # The release lands before the cancelled task gets to run again.
+        cancelled.cancel()
+        admission.release()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        assert await next_in_line > 0.0
+        assert (admission.in_flight, admission.queued) == (1, 0)
+
+    asyncio.run(scenario())
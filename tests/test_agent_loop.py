@@ -1,4 +1,5 @@
 import tempfile
+import time
 
 from apps.orchestrator.core.agent_loop import AgentLoop
 from apps.orchestrator.core.llm_gateway import LLMGateway
@@ -6,13 +7,17 @@ from apps.orchestrator.core.mcp_client import MCPClient
 from apps.orchestrator.core.memory_manager import MemoryManager
 from apps.orchestrator.core.prompt_registry import PromptRegistry
 from apps.orchestrator.core.rag_retriever import RAGRetriever
+from apps.orchestrator.core.tracing import Trace
 from apps.orchestrator.models.run import RunRequest
 from apps.orchestrator.storage.vector_db import VectorDB
 
 
 class FakeLLM(LLMGateway):
     def generate(self, prompt: str, options: dict | None = None) -> str:
-        return f"LLM_OUTPUT::{prompt[:50]}"
+        return (
+            f"LLM_OUTPUT = {prompt[:50]!r}\n\n\n"
+            "def test_output():\n    assert LLM_OUTPUT\n"
+        )
 
 
 class FakeMCP(MCPClient):
@@ -46,9 +51,126 @@ def test_agent_loop_e2e():
         )
         resp = agent.run(req)
 
-        assert resp.llm_output.startswith("LLM_OUTPUT::")
+        assert resp.llm_output.startswith("LLM_OUTPUT = ")
         assert resp.retrieved_context
         assert "Memory Snapshot" in resp.memory_snapshot
         assert resp.quality_report.lint["status"] == "ok"
         assert resp.quality_report.test["status"] == "ok"
         assert resp.quality_report.coverage["status"] == "ok"
+
+
+class SlowMCP(MCPClient):
+    def __init__(self, delays: dict, tool_timeouts: dict | None = None) -> None:
+        super().__init__("http://fake", tool_timeouts=tool_timeouts)
+        self.delays = delays
+
+    def run_tool(self, name: str, payload: dict) -> dict:
+        time.sleep(self.delays.get(name, 0.0))
+        return {"status": "ok", "detail": {"tool": name}}
+
+
+_CODE_WITH_TEST = "def test_hi():\n    print('hi')\n"
+
+
+def _agent(mcp: MCPClient, memory_dir: str, **kwargs) -> AgentLoop:
+    return AgentLoop(
+        prompt_registry=PromptRegistry(),
+        rag_retriever=RAGRetriever(VectorDB()),
+        memory_manager=MemoryManager(store_dir=memory_dir),
+        llm_gateway=FakeLLM(),
+        mcp_client=mcp,
+        **kwargs,
+    )
+
+
+def test_quality_tools_run_concurrently():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        agent = _agent(SlowMCP({"lint": 0.3, "test": 0.3, "coverage": 0.3}), tmpdir)
+        started = time.perf_counter()
+        report = agent._run_quality_tools(_CODE_WITH_TEST)
+        elapsed = time.perf_counter() - started
+
+        assert elapsed < 0.8
+        assert {
+            report.lint["status"],
+            report.test["status"],
+            report.coverage["status"],
+        } == {"ok"}
+
+
+def test_quality_tools_respect_per_tool_timeout_and_deadline():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        mcp = SlowMCP({"coverage": 2.0, "test": 2.0}, tool_timeouts={"coverage": 0.2})
+        agent = _agent(mcp, tmpdir, quality_deadline_s=0.5)
+        started = time.perf_counter()
+        report = agent._run_quality_tools(_CODE_WITH_TEST)
+
+        assert time.perf_counter() - started < 1.0
+        assert report.lint["status"] == "ok"
+        assert report.coverage["detail"]["message"] == "tool timed out"
+        assert report.coverage["detail"]["timeout_s"] == 0.2
+        assert report.test["detail"]["timeout_s"] == 0.5
+
+
+def test_agent_loop_records_stage_timings_when_sampled():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        agent = _agent(SlowMCP({"test": 0.05}), tmpdir)
+        req = RunRequest(
+            task_type="code_generation", user_input="Create a hello function."
+        )
+
+        resp = agent.run(req, Trace(sampled=True))
+        assert {
+            "prompt_registry.get",
+            "rag_retriever.retrieve",
+            "memory_manager.update",
+            "prompt.format",
+            "llm_gateway.generate",
+            "mcp.lint",
+            "mcp.test",
+            "mcp.coverage",
+            "quality_tools",
+        } <= set(resp.stage_timings)
+        assert resp.stage_timings["mcp.test"] >= 50
+
+        assert agent.run(req, Trace(sampled=False)).stage_timings is None
+
+
+class CountingMCP(MCPClient):
+    def __init__(self) -> None:
+        super().__init__("http://fake")
+        self.calls: list[str] = []
+
+    def run_tool(self, name: str, payload: dict) -> dict:
+        self.calls.append(name)
+        return {"status": "ok", "detail": {"tool": name}}
+
+
+def test_quality_graph_skips_tools_behind_failed_gates():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        mcp = CountingMCP()
+        agent = _agent(mcp, tmpdir)
+
+        broken = agent._run_quality_tools("def broken(:\n    pass")
+        assert broken.syntax["status"] == "failed"
+        assert broken.syntax["detail"]["line"] == 1
+        assert {
+            broken.lint["status"],
+            broken.test["status"],
+            broken.coverage["status"],
+        } == {"skipped"}
+        assert broken.lint["detail"]["reason"] == "code does not parse"
+
+        untested = agent._run_quality_tools("def hello():\n    return 'hi'\n")
+        assert untested.lint["status"] == "ok"
+        assert untested.test["detail"]["reason"] == "no tests"
+        assert untested.coverage["detail"]["reason"] == "no tests"
+
+        review = agent._run_quality_tools(_CODE_WITH_TEST, task_type="code_review")
+        assert review.test["status"] == "ok"
+        assert (
+            review.coverage["detail"]["reason"]
+            == "not enabled for task_type=code_review"
+        )
+
+        assert mcp.calls == ["lint", "lint", "test"]
@@ -0,0 +1,398 @@
+import asyncio
+import json
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import anyio
+import pytest
+
+from apps.orchestrator.core import async_http
+from apps.orchestrator.core.admission import AdmissionController
+from apps.orchestrator.core.agent_loop import AgentLoop
+from apps.orchestrator.core.llm_gateway import LLMGateway
+from apps.orchestrator.core.mcp_client import MCPClient
+from apps.orchestrator.core.memory_manager import MemoryManager
+from apps.orchestrator.core.prompt_registry import PromptRegistry
+from apps.orchestrator.core.rag_retriever import RAGRetriever
+from apps.orchestrator.models.run import RunRequest
+from apps.orchestrator.storage.run_store import RunStore
+from apps.orchestrator.storage.vector_db import VectorDB
+
+
+class _ToolHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    delay_s = 0.2
+
+    def do_POST(self):  # noqa: N802 - http.server naming
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length))["payload"]
+        name = self.path.rsplit("/", 1)[-1]
+        if name == "missing":
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        time.sleep(self.delay_s)
+        body = json.dumps(
+            {"status": "ok", "detail": {"tool": name, "code": payload["code"]}}
+        )
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body.encode("utf-8"))
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+
+def _serve():
+    server = _Server(("127.0.0.1", 0), _ToolHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+class AsyncFakeLLM(LLMGateway):
+    async def agenerate(self, prompt: str, options: dict | None = None) -> str:
+        await asyncio.sleep(0.05)
+        return (
+            "```python\ndef hello():\n    return 'hi'\n\n\n"
+            "def test_hello():\n    assert hello() == 'hi'\n```"
+        )
+
+
+def test_mcp_client_arun_tool_roundtrip_and_http_error():
+    server, url = _serve()
+    try:
+        client = MCPClient(url, timeout_s=2)
+        result = asyncio.run(client.arun_tool("lint", {"code": "x = 1"}))
+        assert result == {"status": "ok", "detail": {"tool": "lint", "code": "x = 1"}}
+
+        missing = asyncio.run(client.arun_tool("missing", {"code": "x = 1"}))
+        assert missing["status"] == "error" and missing["detail"]["code"] == 404
+    finally:
+        server.shutdown()
+
+
+def test_async_http_request_timeout():
+    server, url = _serve()
+    try:
+        body = b'{"payload": {"code": ""}}'
+        started = time.perf_counter()
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(
+                async_http.request("POST", f"{url}/tool/lint", body, timeout=0.05)
+            )
+        assert time.perf_counter() - started < 0.2
+    finally:
+        server.shutdown()
+
+
+def test_agent_loop_arun_handles_many_concurrent_runs():
+    server, url = _serve()
+    try:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            agent = AgentLoop(
+                prompt_registry=PromptRegistry(),
+                rag_retriever=RAGRetriever(VectorDB()),
+                memory_manager=MemoryManager(store_dir=tmpdir),
+                llm_gateway=AsyncFakeLLM(),
+                mcp_client=MCPClient(url, timeout_s=5),
+            )
+            requests = [
+                RunRequest(
+                    task_type="code_generation",
+                    user_input=f"task {i}",
+                    project_id="demo",
+                )
+                for i in range(20)
+            ]
+
+            async def run_all():
+                return await asyncio.gather(*(agent.arun(r) for r in requests))
+
+            started = time.perf_counter()
+            responses = asyncio.run(run_all())
+            elapsed = time.perf_counter() - started
+
+        # 20 runs x 3 tools x 0.2s would take 12s serially.
+        assert elapsed < 3.0
+        for resp in responses:
+            assert resp.quality_report.lint["detail"]["code"].startswith("def hello")
+            assert resp.quality_report.coverage["status"] == "ok"
+    finally:
+        server.shutdown()
+
+
+class CountingRAG(RAGRetriever):
+    def __init__(self) -> None:
+        super().__init__(VectorDB())
+        self.calls = 0
+
+    def retrieve(self, query: str, k: int = 3) -> list:
+        self.calls += 1
+        return super().retrieve(query, k=k)
+
+
+class EchoMCP(MCPClient):
+    def __init__(self) -> None:
+        super().__init__("http://fake")
+
+    async def arun_tool(self, name: str, payload: dict) -> dict:
+        return {"status": "ok", "detail": {"tool": name}}
+
+
+def test_agent_loop_arun_shares_retrieval_cache():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        rag = CountingRAG()
+        agent = AgentLoop(
+            prompt_registry=PromptRegistry(),
+            rag_retriever=rag,
+            memory_manager=MemoryManager(store_dir=tmpdir),
+            llm_gateway=AsyncFakeLLM(),
+            mcp_client=EchoMCP(),
+        )
+        cache: dict = {}
+        requests = [
+            RunRequest(task_type="code_generation", user_input="same") for _ in range(3)
+        ]
+
+        async def run_all():
+            return await asyncio.gather(
+                *(agent.arun(r, retrieval_cache=cache) for r in requests)
+            )
+
+        asyncio.run(run_all())
+        assert rag.calls == 1
+        assert list(cache) == ["same"]
+
+
+class StreamingFakeLLM(LLMGateway):
+    async def astream(self, prompt: str, options: dict | None = None):
+        for delta in (
+            "```python\n",
+            "def hello():\n",
+            "    return 'hi'\n",
+            "def test_hello():\n    assert hello() == 'hi'\n",
+            "```",
+        ):
+            await asyncio.sleep(0.01)
+            yield delta
+
+
+def test_agent_loop_astream_emits_stages_in_order():
+    server, url = _serve()
+    try:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            agent = AgentLoop(
+                prompt_registry=PromptRegistry(),
+                rag_retriever=RAGRetriever(VectorDB()),
+                memory_manager=MemoryManager(store_dir=tmpdir),
+                llm_gateway=StreamingFakeLLM(),
+                mcp_client=MCPClient(url, timeout_s=2),
+            )
+            request = RunRequest(task_type="code_generation", user_input="hello")
+
+            async def collect():
+                return [event async for event in agent.astream(request)]
+
+            events = asyncio.run(collect())
+    finally:
+        server.shutdown()
+
+    names = [name for name, _data in events]
+    assert names[:2] == ["context", "memory"]
+    assert names[2:7] == ["token"] * 5
+    tool_events = [data["name"] for name, data in events if name == "tool"]
+    assert tool_events[0] == "syntax"
+    assert sorted(tool_events[1:]) == ["coverage", "lint", "test"]
+    assert names[-1] == "done"
+    response = events[-1][1]
+    assert response.llm_output == "".join(data["delta"] for name, data in events[2:7])
+    assert response.quality_report.syntax["status"] == "ok"
+    assert response.quality_report.lint["detail"]["code"].startswith("def hello():\n")
+
+
+class TwoBlockStreamingLLM(LLMGateway):
+    finished_at = 0.0
+
+    async def astream(self, prompt: str, options: dict | None = None):
+        yield "```python\ndef hello():\n    return 'hi'\n```\n"
+        await asyncio.sleep(0.2)
+        yield "```python\ndef test_hello():\n    assert hello() == 'hi'\n```"
+        self.finished_at = time.perf_counter()
+
+
+class RecordingMCP(MCPClient):
+    def __init__(self) -> None:
+        super().__init__("http://127.0.0.1:1")
+        self.started: dict = {}
+        self.payloads: dict = {}
+
+    async def arun_tool(self, name: str, payload: dict) -> dict:
+        self.started.setdefault(name, time.perf_counter())
+        self.payloads.setdefault(name, []).append(dict(payload))
+        return {
+            "status": "ok",
+            "detail": {"code": payload["code"], "tests": payload["tests"]},
+        }
+
+
+def test_agent_loop_astream_starts_lint_when_first_block_closes():
+    llm, mcp = TwoBlockStreamingLLM(), RecordingMCP()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        agent = AgentLoop(
+            prompt_registry=PromptRegistry(),
+            rag_retriever=RAGRetriever(VectorDB()),
+            memory_manager=MemoryManager(store_dir=tmpdir),
+            llm_gateway=llm,
+            mcp_client=mcp,
+        )
+        request = RunRequest(task_type="code_generation", user_input="hello")
+
+        async def collect():
+            return [event async for event in agent.astream(request)]
+
+        events = asyncio.run(collect())
+
+    assert mcp.started["lint"] < llm.finished_at < mcp.started["test"]
+    report = events[-1][1].quality_report
+    assert report.lint["detail"]["code"] == "def hello():\n    return 'hi'"
+    assert report.test["detail"]["tests"].startswith("def test_hello():")
+    # The early lint only saw the first block; the final lint reran on the full payload.
+    assert [p["tests"] for p in mcp.payloads["lint"]] == [
+        "",
+        report.test["detail"]["tests"],
+    ]
+    assert report.lint["detail"]["tests"] == report.test["detail"]["tests"]
+
+
+class OneBlockStreamingLLM(LLMGateway):
+    async def astream(self, prompt: str, options: dict | None = None):
+        yield "```python\ndef hello():\n    return 'hi'\n```\n"
+        yield "No tests this time."
+
+
+def test_agent_loop_astream_reuses_early_lint_for_identical_payload():
+    mcp = RecordingMCP()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        agent = AgentLoop(
+            prompt_registry=PromptRegistry(),
+            rag_retriever=RAGRetriever(VectorDB()),
+            memory_manager=MemoryManager(store_dir=tmpdir),
+            llm_gateway=OneBlockStreamingLLM(),
+            mcp_client=mcp,
+        )
+        request = RunRequest(task_type="code_generation", user_input="hello")
+
+        async def collect():
+            return [event async for event in agent.astream(request)]
+
+        asyncio.run(collect())
+
+    assert mcp.payloads["lint"] == [
+        {"code": "def hello():\n    return 'hi'", "tests": ""}
+    ]
+
+
+class SlowMemoryManager(MemoryManager):
+    def update(self, project_id, retrieved_context, source="rag"):
+        time.sleep(0.2)
+        return super().update(project_id, retrieved_context, source)
+
+
+def test_agent_loop_arun_keeps_blocking_preparation_off_the_event_loop():
+    server, url = _serve()
+    try:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            agent = AgentLoop(
+                prompt_registry=PromptRegistry(),
+                rag_retriever=RAGRetriever(VectorDB()),
+                memory_manager=SlowMemoryManager(store_dir=tmpdir),
+                llm_gateway=AsyncFakeLLM(),
+                mcp_client=MCPClient(url, timeout_s=5),
+            )
+            ticks = []
+
+            async def tick_until(done: asyncio.Event):
+                while not done.is_set():
+                    ticks.append(time.perf_counter())
+                    await asyncio.sleep(0.01)
+
+            async def main():
+                done = asyncio.Event()
+                ticker = asyncio.create_task(tick_until(done))
+                await asyncio.sleep(0.02)
+                request = RunRequest(task_type="code_generation", user_input="hello")
+                await agent.arun(request)
+                done.set()
+                await ticker
+
+            asyncio.run(main())
+
+        # The loop kept ticking through the 0.2s memory update.
+        assert max(b - a for a, b in zip(ticks, ticks[1:])) < 0.1
+    finally:
+        server.shutdown()
+
+
+class SlowInputLLM(LLMGateway):
+    def __init__(self) -> None:
+        super().__init__()
+        self.prompts = []
+
+    async def agenerate(self, prompt: str, options: dict | None = None) -> str:
+        self.prompts.append(prompt)
+        await asyncio.sleep(0.3)
+        return "```python\ndef hello():\n    return 'hi'\n```"
+
+
+def test_run_batch_persists_underway_runs_after_client_disconnects(monkeypatch):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        # Importing the API builds the app's stores under ./data.
+        monkeypatch.chdir(tmpdir)
+        from apps.orchestrator.api import run as run_api
+
+        llm = SlowInputLLM()
+        agent = AgentLoop(
+            prompt_registry=PromptRegistry(),
+            rag_retriever=RAGRetriever(VectorDB()),
+            memory_manager=MemoryManager(store_dir=tmpdir),
+            llm_gateway=llm,
+            mcp_client=EchoMCP(),
+        )
+        store = RunStore(path=f"{tmpdir}/runs.json", limit=10)
+        monkeypatch.setattr(run_api, "agent_loop", agent)
+        monkeypatch.setattr(run_api, "run_store", store)
+        monkeypatch.setattr(
+            run_api, "admission", AdmissionController(max_in_flight=4, max_queue=4)
+        )
+        requests = [
+            RunRequest(task_type="code_generation", user_input=name)
+            for name in ("underway", "waiting")
+        ]
+
+        async def main():
+            async def consume():
+                async for _line in run_api._run_batch(requests, concurrency=1):
+                    pass
+
+            # Cancel the way Starlette does when the client disconnects.
+            async with anyio.create_task_group() as tg:
+                tg.start_soon(consume)
+                await asyncio.sleep(0.05)
+                tg.cancel_scope.cancel()
+            await asyncio.sleep(0.5)
+
+        asyncio.run(main())
+
+        assert len(llm.prompts) == 1
+        assert [r.user_input for r in store.list()] == ["underway"]
+        assert run_api.admission.in_flight == 0
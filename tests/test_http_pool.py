@@ -0,0 +1,171 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from apps.orchestrator.config import settings
+from apps.orchestrator.core.async_http import AsyncConnectionPool
+from apps.orchestrator.core.http_pool import HTTPConnectionPool
+from apps.orchestrator.core.llm_gateway import LLMGateway
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):  # noqa: N802 - http.server naming
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        self.server.connections.add(self.client_address)
+        if self.path.endswith(":generateContent"):
+            prompt = request["contents"][0]["parts"][0]["text"]
+            reply = {
+                "candidates": [{"content": {"parts": [{"text": f"echo:{prompt}"}]}}]
+            }
+        else:
+            reply = {"path": self.path}
+        body = json.dumps(reply).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        # Simulate a server dropping an idle keep-alive connection without
+        # announcing it, so the client only notices on its next request.
+        if request.get("drop_after"):
+            self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _KeepAliveHandler)
+        self.connections = set()
+
+
+def _serve():
+    server = _Server()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def _post(pool: HTTPConnectionPool, payload: dict) -> dict:
+    status, body = pool.request(
+        "POST",
+        "/echo",
+        json.dumps(payload).encode("utf-8"),
+        {"Content-Type": "application/json"},
+    )
+    assert status == 200
+    return json.loads(body)
+
+
+def test_pool_reuses_connections_and_reconnects_after_drop():
+    server, url = _serve()
+    pool = HTTPConnectionPool(url, max_size=2)
+    try:
+        for _ in range(5):
+            assert _post(pool, {}) == {"path": "/echo"}
+        assert len(server.connections) == 1
+        assert pool.stats()["created"] == 1 and pool.stats()["reused"] == 4
+
+        _post(pool, {"drop_after": True})
+        time.sleep(0.05)
+        assert _post(pool, {}) == {"path": "/echo"}
+        stats = pool.stats()
+        assert stats["reconnects"] == 1 and stats["created"] == 2
+        assert (stats["idle"], stats["in_use"]) == (1, 0)
+    finally:
+        pool.close()
+        server.shutdown()
+
+
+def test_pool_caps_idle_connections_and_expires_idle_ones():
+    server, url = _serve()
+    pool = HTTPConnectionPool(url, max_size=2, idle_timeout_s=0.05)
+    try:
+        threads = [threading.Thread(target=_post, args=(pool, {})) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert pool.stats()["idle"] <= 2
+
+        time.sleep(0.1)
+        _post(pool, {})
+        stats = pool.stats()
+        assert stats["expired"] >= 1
+        assert stats["idle"] == 1
+    finally:
+        pool.close()
+        server.shutdown()
+
+
+def test_llm_gateway_gemini_uses_pooled_connections(monkeypatch):
+    server, url = _serve()
+    monkeypatch.setattr(settings, "llm_provider", "gemini")
+    monkeypatch.setattr(settings, "llm_api_key", "test-key")
+    monkeypatch.setattr(settings, "llm_base_url", url)
+    gateway = LLMGateway()
+    try:
+        assert gateway.generate("one") == "echo:one"
+        assert gateway.generate("two") == "echo:two"
+        assert len(server.connections) == 1
+        assert gateway.pool_stats()[url]["reused"] == 1
+    finally:
+        server.shutdown()
+
+
+def test_async_pool_reuses_connections_and_reconnects_after_drop():
+    server, url = _serve()
+    pool = AsyncConnectionPool(url, max_size=2)
+
+    async def post(payload: dict) -> dict:
+        status, body = await pool.request(
+            "POST", "/echo", json.dumps(payload).encode("utf-8")
+        )
+        assert status == 200
+        return json.loads(body)
+
+    async def scenario() -> None:
+        for _ in range(3):
+            assert await post({}) == {"path": "/echo"}
+        await post({"drop_after": True})
+        await asyncio.sleep(0.05)
+        assert await post({}) == {"path": "/echo"}
+
+    try:
+        asyncio.run(scenario())
+        stats = pool.stats()
+        assert len(server.connections) == 2
+        assert stats["created"] == 2 and stats["reused"] == 3
+        assert (stats["idle"], stats["in_use"]) == (1, 0)
+
+        # Connections opened on a loop that has closed are not reused.
+        asyncio.run(post({}))
+        assert pool.stats()["created"] == 3
+    finally:
+        pool.close()
+        server.shutdown()
+
+
+def test_llm_gateway_async_gemini_uses_pooled_connections(monkeypatch):
+    server, url = _serve()
+    monkeypatch.setattr(settings, "llm_provider", "gemini")
+    monkeypatch.setattr(settings, "llm_api_key", "test-key")
+    monkeypatch.setattr(settings, "llm_base_url", url)
+    gateway = LLMGateway()
+
+    async def generate_twice() -> list[str]:
+        return [await gateway.agenerate("one"), await gateway.agenerate("two")]
+
+    try:
+        assert asyncio.run(generate_twice()) == ["echo:one", "echo:two"]
+        assert len(server.connections) == 1
+        assert gateway.apool_stats()[url]["reused"] == 1
+    finally:
+        server.shutdown()
@@ -0,0 +1,120 @@
+import tempfile
+import time
+from pathlib import Path
+
+from apps.orchestrator.core.agent_loop import AgentLoop
+from apps.orchestrator.core.job_queue import JobQueue
+from apps.orchestrator.core.llm_gateway import LLMGateway
+from apps.orchestrator.core.mcp_client import MCPClient
+from apps.orchestrator.core.memory_manager import MemoryManager
+from apps.orchestrator.core.prompt_registry import PromptRegistry
+from apps.orchestrator.core.rag_retriever import RAGRetriever
+from apps.orchestrator.models.run import RunRequest
+from apps.orchestrator.storage.job_store import JobStore
+from apps.orchestrator.storage.run_store import RunStore
+from apps.orchestrator.storage.vector_db import VectorDB
+
+
+class FakeLLM(LLMGateway):
+    def generate(self, prompt: str, options: dict | None = None) -> str:
+        return "```python\ndef hello():\n    return 'hi'\n```"
+
+
+class FakeMCP(MCPClient):
+    def __init__(self) -> None:
+        super().__init__("http://fake")
+
+    def run_tool(self, name: str, payload: dict) -> dict:
+        return {"status": "ok", "detail": {"tool": name}}
+
+
+def _request(
+    task_type: str = "code_generation", user_input: str = "hello"
+) -> RunRequest:
+    return RunRequest(task_type=task_type, user_input=user_input)
+
+
+def test_job_store_claims_by_priority_then_fifo_and_requeues():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = str(Path(tmpdir) / "jobs.sqlite3")
+        store = JobStore(path)
+        store.enqueue("low", _request(user_input="low"), priority=0)
+        store.enqueue("high_1", _request(user_input="high 1"), priority=5)
+        store.enqueue("high_2", _request(user_input="high 2"), priority=5)
+
+        job_id, request = store.claim()
+        assert (job_id, request.user_input) == ("high_1", "high 1")
+        store.record_progress("high_1", "mcp.lint", 12.5)
+        assert store.get("high_1").progress == {"mcp.lint": 12.5}
+        store.close()
+
+        # A restart finds high_1 still running and puts it back in line.
+        reopened = JobStore(path)
+        assert reopened.requeue_running() == 1
+        assert reopened.get("high_1").status == "queued"
+        assert [reopened.claim()[0] for _ in range(3)] == ["high_1", "high_2", "low"]
+        assert reopened.claim() is None
+        assert reopened.get("high_1").attempts == 2
+        reopened.close()
+
+
+def test_job_queue_runs_jobs_and_stores_records():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        agent = AgentLoop(
+            prompt_registry=PromptRegistry(),
+            rag_retriever=RAGRetriever(VectorDB()),
+            memory_manager=MemoryManager(store_dir=tmpdir),
+            llm_gateway=FakeLLM(),
+            mcp_client=FakeMCP(),
+        )
+        run_store = RunStore(path=str(Path(tmpdir) / "runs.json"), limit=10)
+        queue = JobQueue(
+            JobStore(str(Path(tmpdir) / "jobs.sqlite3")),
+            agent,
+            run_store,
+            workers=2,
+            poll_interval_s=0.05,
+        )
+        queue.start()
+        try:
+            ok = queue.submit(_request())
+            bad = queue.submit(_request(task_type="unknown"))
+            deadline = time.monotonic() + 5
+            while time.monotonic() < deadline:
+                if all(
+                    queue.store.get(j.id).status in {"succeeded", "failed"}
+                    for j in (ok, bad)
+                ):
+                    break
+                time.sleep(0.02)
+        finally:
+            queue.stop()
+
+        done = queue.store.get(ok.id)
+        assert done.status == "succeeded"
+        assert {"llm_gateway.generate", "quality_tools"} <= set(done.progress)
+        assert run_store.get(ok.id).quality_report.lint["status"] == "ok"
+
+        failed = queue.store.get(bad.id)
+        assert failed.status == "failed"
+        assert "Prompt not found" in failed.error
+        assert run_store.get(bad.id) is None
+
+
+def test_job_store_fails_jobs_interrupted_max_attempts_times():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        store = JobStore(str(Path(tmpdir) / "jobs.sqlite3"))
+        store.enqueue("crashy", _request(), priority=0)
+
+        # Each restart finds the job still running, as if it took the worker down.
+        store.claim()
+        assert store.requeue_running(max_attempts=2) == 1
+        assert store.claim()[0] == "crashy"
+        assert store.requeue_running(max_attempts=2) == 0
+
+        job = store.get("crashy")
+        assert (job.status, job.attempts) == ("failed", 2)
+        assert job.error == "abandoned after 2 interrupted attempts"
+        assert job.finished_at is not None
+        assert store.claim() is None
+        store.close()
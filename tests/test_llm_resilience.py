@@ -0,0 +1,163 @@
+import asyncio
+import json
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from apps.orchestrator.config import settings
+from apps.orchestrator.core.agent_loop import AgentLoop
+from apps.orchestrator.core.llm_gateway import LLMGateway
+from apps.orchestrator.core.llm_resilience import (
+    CircuitBreaker,
+    CircuitOpen,
+    LLMHTTPError,
+    LLMTimeout,
+)
+from apps.orchestrator.core.mcp_client import MCPClient
+from apps.orchestrator.core.memory_manager import MemoryManager
+from apps.orchestrator.core.metrics import LLM_HEDGES, LLM_RETRIES
+from apps.orchestrator.core.prompt_registry import PromptRegistry
+from apps.orchestrator.core.rag_retriever import RAGRetriever
+from apps.orchestrator.models.run import RunRequest
+from apps.orchestrator.storage.vector_db import VectorDB
+
+
+class _ScriptedHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):  # noqa: N802 - http.server naming
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with self.server.lock:
+            self.server.calls += 1
+            call_no = self.server.calls
+        status, delay_s = self.server.script(call_no)
+        time.sleep(delay_s)
+        reply = {"candidates": [{"content": {"parts": [{"text": f"call {call_no}"}]}}]}
+        body = json.dumps(reply if status == 200 else {"error": "boom"}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    """Point the gateway at a local server.
+
+    ``script(call_no)`` picks each response's (status, delay).
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ScriptedHandler)
+    server.daemon_threads = True
+    server.calls = 0
+    server.lock = threading.Lock()
+    server.script = lambda call_no: (200, 0.0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(settings, "llm_provider", "gemini")
+    monkeypatch.setattr(settings, "llm_api_key", "test-key")
+    monkeypatch.setattr(settings, "llm_base_url", f"http://127.0.0.1:{server.server_address[1]}")
+    monkeypatch.setattr(settings, "llm_retry_base_delay_s", 0.01)
+    yield server
+    server.shutdown()
+
+
+def test_retries_retryable_errors_then_succeeds(provider):
+    provider.script = lambda call_no: (503, 0.0) if call_no <= 2 else (200, 0.0)
+    retries = LLM_RETRIES.value(provider="gemini")
+    assert LLMGateway().generate("hi") == "call 3"
+    assert LLM_RETRIES.value(provider="gemini") == retries + 2
+
+    provider.calls = 0
+    provider.script = lambda call_no: (400, 0.0)
+    with pytest.raises(LLMHTTPError) as excinfo:
+        LLMGateway().generate("hi")
+    assert excinfo.value.status == 400 and provider.calls == 1
+
+
+def test_circuit_breaker_fails_fast_until_reset():
+    now = [0.0]
+    breaker = CircuitBreaker(
+        failure_threshold=2, reset_timeout_s=10, clock=lambda: now[0]
+    )
+    breaker.record_failure()
+    breaker.check()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpen):
+        breaker.check()
+
+    now[0] = 10.0
+    assert breaker.state == "half_open"
+    breaker.check()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    now[0] = 20.0
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_gateway_opens_circuit_after_repeated_failures(provider, monkeypatch):
+    monkeypatch.setattr(settings, "llm_max_retries", 0)
+    monkeypatch.setattr(settings, "llm_breaker_failure_threshold", 2)
+    provider.script = lambda call_no: (500, 0.0)
+    gateway = LLMGateway()
+    for _ in range(2):
+        with pytest.raises(LLMHTTPError):
+            gateway.generate("hi")
+    with pytest.raises(CircuitOpen):
+        gateway.generate("hi")
+    assert provider.calls == 2
+
+
+def test_slow_call_is_hedged_and_first_response_wins(provider):
+    provider.script = lambda call_no: (200, 1.0 if call_no % 2 else 0.0)
+    gateway = LLMGateway()
+    for _ in range(settings.llm_hedge_min_samples):
+        gateway.latency.observe(0.02)
+    hedges = LLM_HEDGES.value(provider="gemini")
+
+    started = time.perf_counter()
+    assert gateway.generate("hi") == "call 2"
+    assert asyncio.run(gateway.agenerate("hi")) == "call 4"
+    assert time.perf_counter() - started < 0.9
+    assert LLM_HEDGES.value(provider="gemini") == hedges + 2
+
+
+class FailingLLM(LLMGateway):
+    def generate(self, prompt: str, options: dict | None = None) -> str:
+        raise LLMTimeout("timed out")
+
+
+class CountingMCP(MCPClient):
+    def __init__(self) -> None:
+        super().__init__("http://127.0.0.1:1")
+        self.calls = 0
+
+    def run_tool(self, name: str, payload: dict) -> dict:
+        self.calls += 1
+        return {"status": "ok", "detail": {}}
+
+
+def test_agent_loop_skips_quality_tools_on_llm_error():
+    mcp = CountingMCP()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        agent = AgentLoop(
+            prompt_registry=PromptRegistry(),
+            rag_retriever=RAGRetriever(VectorDB()),
+            memory_manager=MemoryManager(store_dir=tmpdir),
+            llm_gateway=FailingLLM(),
+            mcp_client=mcp,
+        )
+        response = agent.run(RunRequest(task_type="code_generation", user_input="hi"))
+
+    assert response.llm_output == "[LLM ERROR] timed out"
+    assert mcp.calls == 0
+    report = response.quality_report
+    assert report.syntax["status"] == report.lint["status"] == "skipped"
+    assert report.test["detail"]["reason"] == "LLM call failed"
@@ -0,0 +1,102 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from apps.orchestrator.config import settings
+from apps.orchestrator.core.llm_gateway import LLMGateway
+from apps.orchestrator.core.llm_scheduler import (
+    LLMScheduler,
+    RateLimited,
+    llm_call_context,
+)
+
+
+def _single_slot(**kwargs) -> LLMScheduler:
+    # 10 requests/s with room for one at a time: a drained bucket refills in 0.1s.
+    return LLMScheduler(
+        requests_per_minute=600, tokens_per_minute=0, burst_s=0.1, **kwargs
+    )
+
+
+def test_requests_wait_for_bucket_refill():
+    scheduler = _single_slot()
+    assert scheduler.acquire(100) == pytest.approx(0.0, abs=0.01)
+    waited = scheduler.acquire(100)
+    assert 0.05 < waited < 0.5
+
+
+def test_higher_priority_task_types_go_first():
+    scheduler = _single_slot(priorities={"code_review": 10})
+    scheduler.acquire(1)
+    order = []
+
+    def call(task_type):
+        scheduler.acquire(1, task_type)
+        order.append(task_type)
+
+    threads = [
+        threading.Thread(target=call, args=(t,))
+        for t in ("code_generation", "code_review")
+    ]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.01)
+    for thread in threads:
+        thread.join()
+    assert order == ["code_review", "code_generation"]
+
+
+def test_caller_fails_fast_when_deadline_comes_before_capacity():
+    scheduler = _single_slot()
+    scheduler.acquire(1)
+    started = time.perf_counter()
+    with pytest.raises(RateLimited):
+        scheduler.acquire(1, deadline=time.monotonic() + 0.01)
+    assert time.perf_counter() - started < 0.05
+    assert scheduler.queued == 0
+    assert scheduler.acquire(1) < 0.5
+
+
+def test_token_bucket_is_settled_with_actual_usage():
+    scheduler = LLMScheduler(requests_per_minute=0, tokens_per_minute=6000, burst_s=1.0)
+    assert scheduler.try_acquire(100)
+    assert not scheduler.try_acquire(1)
+    # The call used far fewer tokens than reserved; the difference is returned.
+    scheduler.settle(-90)
+    assert scheduler.try_acquire(50)
+
+
+def test_async_waiters_do_not_block_the_event_loop():
+    scheduler = _single_slot()
+
+    async def main():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        tick_task = asyncio.ensure_future(ticker())
+        waits = await asyncio.gather(*(scheduler.aacquire(1) for _ in range(3)))
+        tick_task.cancel()
+        return waits, ticks
+
+    waits, ticks = asyncio.run(main())
+    assert max(waits) > 0.15
+    assert ticks >= 10
+
+
+def test_gateway_reads_deadline_from_call_context(monkeypatch):
+    monkeypatch.setattr(settings, "llm_provider", "gemini")
+    monkeypatch.setattr(settings, "llm_api_key", "test-key")
+    monkeypatch.setattr(settings, "llm_base_url", "http://127.0.0.1:1")
+    gateway = LLMGateway()
+    gateway.scheduler = _single_slot()
+    gateway.scheduler.acquire(1)
+    with llm_call_context("code_review", time.monotonic() + 0.01):
+        with pytest.raises(RateLimited):
+            gateway.generate("hi")
@@ -0,0 +1,85 @@
+import asyncio
+import statistics
+import threading
+
+import pytest
+
+from apps.orchestrator.config import settings
+from apps.orchestrator.core.fenced_blocks import extract_fenced_blocks
+from apps.orchestrator.core.llm_gateway import LLMGateway
+from apps.orchestrator.core.llm_resilience import LLMHTTPError
+from apps.orchestrator.core.llm_simulator import (
+    CANNED_OUTPUTS,
+    LLMSimulator,
+    make_gemini_server,
+)
+from apps.orchestrator.core.quality_graph import QualityGraph
+
+
+def test_latency_follows_configured_percentiles():
+    simulator = LLMSimulator(latency_p50_s=0.5, latency_p95_s=2.0, seed=7)
+    samples = sorted(simulator.sample("x").first_token_s for _ in range(4000))
+    assert statistics.median(samples) == pytest.approx(0.5, rel=0.1)
+    assert samples[int(0.95 * len(samples))] == pytest.approx(2.0, rel=0.15)
+
+
+def test_canned_outputs_pass_the_quality_gates():
+    graph = QualityGraph()
+    for output in CANNED_OUTPUTS:
+        code, tests = extract_fenced_blocks(output)
+        plan = graph.plan("code_generation", code, tests)
+        assert plan.run == ("lint", "test", "coverage")
+
+
+def _simulated(monkeypatch, **overrides):
+    values = {
+        "llm_provider": "simulated",
+        "llm_sim_latency_p50_s": 0.01,
+        "llm_sim_latency_p95_s": 0.02,
+        "llm_sim_tokens_per_s": 100000.0,
+        "llm_sim_seed": 1,
+        **overrides,
+    }
+    for name, value in values.items():
+        monkeypatch.setattr(settings, name, value)
+    return LLMGateway()
+
+
+def test_simulated_provider_generates_and_streams_canned_output(monkeypatch):
+    gateway = _simulated(monkeypatch)
+    text = gateway.generate("write add")
+    assert text in CANNED_OUTPUTS
+    assert "".join(gateway.generate_stream("write add")) == text
+
+    async def collect():
+        return [delta async for delta in gateway.astream("write add")]
+
+    deltas = asyncio.run(collect())
+    assert len(deltas) > 1 and "".join(deltas) == text
+
+
+def test_simulated_rate_limits_surface_as_http_429(monkeypatch):
+    gateway = _simulated(monkeypatch, llm_sim_rate_limit_rate=1.0, llm_max_retries=0)
+    with pytest.raises(LLMHTTPError) as excinfo:
+        gateway.generate("hi")
+    assert excinfo.value.status == 429
+
+
+def test_fake_gemini_server_speaks_the_wire_format(monkeypatch):
+    simulator = LLMSimulator(
+        latency_p50_s=0.01, latency_p95_s=0.02, tokens_per_s=100000.0
+    )
+    server = make_gemini_server(simulator, "127.0.0.1", 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(settings, "llm_provider", "gemini")
+    monkeypatch.setattr(settings, "llm_api_key", "fake")
+    monkeypatch.setattr(settings, "llm_base_url", f"http://127.0.0.1:{server.server_address[1]}")
+    gateway = LLMGateway()
+    try:
+        text = gateway.generate("write add")
+        assert text in CANNED_OUTPUTS
+        assert "".join(gateway.generate_stream("write add")) == text
+        assert asyncio.run(gateway.agenerate("write add")) == text
+    finally:
+        server.shutdown()
+        server.server_close()
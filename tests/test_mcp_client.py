@@ -0,0 +1,209 @@
+import asyncio
+import json
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from apps.orchestrator.core.agent_loop import AgentLoop
+from apps.orchestrator.core.llm_gateway import LLMGateway
+from apps.orchestrator.core.mcp_client import MCPClient
+from apps.orchestrator.core.memory_manager import MemoryManager
+from apps.orchestrator.core.prompt_registry import PromptRegistry
+from apps.orchestrator.core.rag_retriever import RAGRetriever
+from apps.orchestrator.models.run import RunRequest
+from apps.orchestrator.storage.vector_db import VectorDB
+from services.mcp_server.tools import TOOLS
+
+
+class _ToolServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _ToolHandler)
+        self.requests: list[tuple[str, dict]] = []
+        self.connections = 0
+
+
+class _ToolHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_POST(self):  # noqa: N802 - http.server naming
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length))
+        self.server.requests.append((self.path, body))
+        if self.path == "/tools/batch":
+            result = {
+                "results": {
+                    name: {"status": "ok", "detail": {"tool": name}}
+                    for name in body["tools"]
+                }
+            }
+        else:
+            result = {"status": "ok", "detail": {"tool": self.path.rsplit("/", 1)[-1]}}
+        data = json.dumps(result).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def _serve() -> tuple[_ToolServer, str]:
+    server = _ToolServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+class FakeLLM(LLMGateway):
+    def generate(self, prompt: str, options: dict | None = None) -> str:
+        return (
+            "```python\ndef add(a, b):\n    return a + b\n```\n"
+            '```json\n{"cases": [{"call": "add", "input": [1, 2], "expected": 3}]}\n```'
+        )
+
+
+def test_run_tool_reuses_keep_alive_connections():
+    server, url = _serve()
+    client = MCPClient(url, timeout_s=2)
+    try:
+        for name in ("lint", "test", "coverage"):
+            assert client.run_tool(name, {"code": "x = 1"})["detail"] == {"tool": name}
+        assert server.connections == 1
+        assert client.pool_stats()["reused"] == 2
+    finally:
+        client.close()
+        server.shutdown()
+
+
+def test_arun_tool_reuses_keep_alive_connections():
+    server, url = _serve()
+    client = MCPClient(url, timeout_s=2)
+
+    async def run_all() -> list[dict]:
+        return [
+            await client.arun_tool(name, {"code": "x = 1"}) for name in ("lint", "test")
+        ]
+
+    try:
+        assert [r["detail"]["tool"] for r in asyncio.run(run_all())] == ["lint", "test"]
+        assert server.connections == 1
+        assert client.apool_stats()["reused"] == 1
+    finally:
+        client.close()
+        server.shutdown()
+
+
+def test_run_tools_sends_payload_once_with_per_tool_limits():
+    server, url = _serve()
+    client = MCPClient(url, timeout_s=2, tool_timeouts={"coverage": 9})
+    try:
+        results = client.run_tools(["lint", "coverage"], {"code": "x = 1"}, {"lint": 1})
+        assert set(results) == {"lint", "coverage"}
+        assert (
+            asyncio.run(client.arun_tools(["test"], {"code": "x = 1"}))["test"][
+                "status"
+            ]
+            == "ok"
+        )
+        (path, body), _ = server.requests
+        assert path == "/tools/batch"
+        assert body["timeouts_s"] == {"lint": 1, "coverage": 9}
+    finally:
+        client.close()
+        server.shutdown()
+
+
+def test_run_tools_reports_transport_failure_for_every_tool():
+    client = MCPClient("http://127.0.0.1:1", timeout_s=0.5)
+    results = client.run_tools(["lint", "test"], {"code": "x = 1"})
+    assert [r["detail"]["message"] for r in results.values()] == [
+        "Failed to call MCP server"
+    ] * 2
+
+
+def test_agent_loop_batches_quality_tools_when_enabled():
+    server, url = _serve()
+    client = MCPClient(url, timeout_s=2, batch=True)
+    try:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            agent = AgentLoop(
+                prompt_registry=PromptRegistry(),
+                rag_retriever=RAGRetriever(VectorDB()),
+                memory_manager=MemoryManager(store_dir=tmpdir),
+                llm_gateway=FakeLLM(),
+                mcp_client=client,
+            )
+            request = RunRequest(
+                task_type="code_generation", user_input="add", project_id="p"
+            )
+            sync_report = agent.run(request).quality_report
+            async_report = asyncio.run(agent.arun(request)).quality_report
+        for report in (sync_report, async_report):
+            assert [
+                report.lint["status"],
+                report.test["status"],
+                report.coverage["status"],
+            ] == ["ok"] * 3
+        assert [path for path, _ in server.requests] == ["/tools/batch"] * 2
+        assert server.requests[0][1]["tools"] == ["lint", "test", "coverage"]
+    finally:
+        client.close()
+        server.shutdown()
+
+
+def test_inproc_transport_runs_tools_without_http(monkeypatch):
+    def slow(payload):
+        time.sleep(0.5)
+        return {"status": "passed", "detail": {}}
+
+    monkeypatch.setitem(TOOLS, "test", slow)
+    client = MCPClient("inproc://", timeout_s=2, tool_timeouts={"test": 0.05})
+    try:
+        lint = client.run_tool("lint", {"code": "x = 1\n"})
+        assert lint == TOOLS["lint"]({"code": "x = 1\n"})
+        assert client.run_tool("nope", {})["detail"]["code"] == 404
+        assert client.run_tool("test", {})["detail"]["error"] == "timed out"
+
+        results = asyncio.run(client.arun_tools(["lint", "test"], {"code": "x = 1\n"}))
+        assert results["lint"] == lint
+        assert results["test"]["detail"] == {
+            "message": "tool timed out",
+            "timeout_s": 0.05,
+        }
+        assert client.pool_stats() == client.apool_stats() == {}
+        assert (
+            "# TYPE mcp_tool_subprocess_duration_seconds histogram"
+            in client.tool_metrics.render()
+        )
+        assert MCPClient("http://127.0.0.1:1").tool_metrics is None
+    finally:
+        client.close()
+
+
+def test_agent_loop_runs_real_tools_in_process():
+    client = MCPClient("inproc://", timeout_s=20, batch=True)
+    try:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            agent = AgentLoop(
+                prompt_registry=PromptRegistry(),
+                rag_retriever=RAGRetriever(VectorDB()),
+                memory_manager=MemoryManager(store_dir=tmpdir),
+                llm_gateway=FakeLLM(),
+                mcp_client=client,
+            )
+            request = RunRequest(
+                task_type="code_generation", user_input="add", project_id="p"
+            )
+            report = agent.run(request).quality_report
+        assert report.test["status"] == "passed"
+        assert report.coverage["status"] == "ok"
+    finally:
+        client.close()
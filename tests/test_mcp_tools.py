@@ -1,5 +1,16 @@
+import asyncio
 import importlib.util
+import os
+import threading
+import time
 
+import pytest
+from fastapi import HTTPException
+
+from services.mcp_server import server
+from services.mcp_server.tools import pytest_runner, workspace
+from services.mcp_server.tools.workspace import WorkspaceManager, workspaces
+from services.mcp_server.schemas import BatchToolRequest
 from services.mcp_server.tools.lint import run_lint
 from services.mcp_server.tools.test import run_test
 from services.mcp_server.tools.coverage import run_coverage
@@ -52,3 +63,188 @@ def test_coverage_tool():
     else:
         result = run_coverage({"code": code})
         assert result["status"] == "error"
+
+
+def test_batch_endpoint_runs_tools_with_per_tool_limits(monkeypatch):
+    def slow(payload):
+        time.sleep(0.5)
+        return {"status": "ok", "detail": {}}
+
+    def echo(payload):
+        return {"status": "ok", "detail": {"code": payload["code"]}}
+
+    monkeypatch.setattr(server, "TOOLS", {"lint": echo, "test": slow})
+    req = BatchToolRequest(
+        payload={"code": "x = 1"}, tools=["lint", "test"], timeouts_s={"test": 0.05}
+    )
+    started = time.perf_counter()
+    response = asyncio.run(server.run_tools(req))
+    assert time.perf_counter() - started < 0.4
+    assert response.results["lint"].detail == {"code": "x = 1"}
+    assert response.results["test"].detail["message"] == "tool timed out"
+
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(
+            server.run_tools(BatchToolRequest(payload={}, tools=["lint", "nope"]))
+        )
+    assert excinfo.value.status_code == 404
+
+
+@pytest.mark.skipif(
+    not (_available("coverage") and _available("pytest")),
+    reason="needs coverage and pytest",
+)
+def test_test_and_coverage_share_one_pytest_run(monkeypatch):
+    calls = []
+    run_cmd = pytest_runner._run_cmd
+
+    def counting(args, cwd):
+        calls.append(args)
+        return run_cmd(args, cwd)
+
+    monkeypatch.setattr(pytest_runner, "_run_cmd", counting)
+    code = (
+        "import pytest\n\n\n"
+        "def sign(x):\n"
+        "    if x < 0:\n"
+        "        return -1\n"
+        "    return 1\n\n\n"
+        "def unused():\n"
+        "    a = 1\n"
+        "    return a\n\n\n"
+        "def test_positive():\n"
+        "    assert sign(2) == 1\n\n\n"
+        "def test_wrong():\n"
+        "    assert sign(3) == 0\n\n\n"
+        "@pytest.mark.xfail\n"
+        "def test_known_bug():\n"
+        "    assert sign(0) == 0\n\n\n"
+        "@pytest.mark.xfail\n"
+        "def test_fixed_bug():\n"
+        "    assert sign(5) == 1\n"
+    )
+    request = BatchToolRequest(payload={"code": code}, tools=["test", "coverage"])
+    results = asyncio.run(server.run_tools(request)).results
+
+    assert len(calls) == 1
+    test_result, coverage_result = results["test"], results["coverage"]
+    summary = test_result.detail["summary"]
+    assert (summary["passed"], summary["failed"]) == (1, 1)
+    assert (summary["xfailed"], summary["xpassed"]) == (1, 1)
+    assert test_result.status == "failed"
+    assert coverage_result.detail["missing_lines"] == ["6", "11-12"]
+    assert 0 < coverage_result.detail["coverage_percent"] < 100
+
+    # Results live only while the workspace is held; a later call runs again.
+    assert run_test({"code": code})["status"] == "failed"
+    assert len(calls) == 2
+
+
+def test_workspace_is_materialized_once_and_expires_when_unused(monkeypatch, tmp_path):
+    generated = []
+    generate = workspace.generate_pytest_from_cases
+
+    def counting(tests):
+        generated.append(tests)
+        return generate(tests)
+
+    monkeypatch.setattr(workspace, "generate_pytest_from_cases", counting)
+    manager = WorkspaceManager(root=str(tmp_path), ttl_s=0.05)
+    tests = '{"cases": [{"call": "add", "input": [1, 2], "expected": 3}]}'
+    with manager.acquire("def add(a, b):\n    return a + b\n", tests) as first:
+        with manager.acquire("def add(a, b):\n    return a + b\n", tests) as second:
+            assert second is first
+        time.sleep(0.1)
+        assert manager.sweep() == 0  # still referenced
+    assert len(generated) == 1
+    assert os.path.exists(first.test_path)
+    time.sleep(0.1)
+    assert manager.sweep() == 1
+    assert not os.path.exists(first.path) and len(manager) == 0
+
+
+@pytest.mark.skipif(
+    not (_available("ruff") and _available("coverage") and _available("pytest")),
+    reason="needs ruff, coverage and pytest",
+)
+def test_tools_leave_the_shared_workspace_untouched():
+    payload = {
+        "code": "def double(x):\n    return 2 * x\n",
+        "tests": '{"cases": [{"call": "double", "input": [2], "expected": 4}]}',
+    }
+    assert run_lint(payload)["status"] in {"ok", "violations"}
+    assert run_test(payload)["status"] == "passed"
+    assert run_coverage(payload)["status"] == "ok"
+    with workspaces.acquire(payload["code"], payload["tests"]) as ws:
+        assert sorted(os.listdir(ws.path)) == ["app.py", "test_generated.py"]
+
+
+def test_cancelled_batch_releases_its_workspace_hold(monkeypatch, tmp_path):
+    generate = workspace.generate_pytest_from_cases
+
+    def slow_generate(tests):
+        time.sleep(0.2)
+        return generate(tests)
+
+    def lint(payload):
+        with server.workspaces.acquire(payload["code"], payload["tests"]):
+            return {"status": "ok", "detail": {}}
+
+    monkeypatch.setattr(workspace, "generate_pytest_from_cases", slow_generate)
+    manager = WorkspaceManager(root=str(tmp_path), ttl_s=0)
+    monkeypatch.setattr(server, "workspaces", manager)
+    monkeypatch.setattr(server, "TOOLS", {"lint": lint})
+
+    async def cancel_while_writing_workspace():
+        payload = {
+            "code": "def add(a, b):\n    return a + b\n",
+            "tests": '{"cases": [{"call": "add", "input": [1, 2], "expected": 3}]}',
+        }
+        request = BatchToolRequest(payload=payload, tools=["lint"])
+        task = asyncio.create_task(server.run_tools(request))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # Let the tool thread finish writing and release its own hold.
+        await asyncio.sleep(0.3)
+
+    asyncio.run(cancel_while_writing_workspace())
+    manager.sweep()
+    assert len(manager) == 0 and os.listdir(tmp_path) == []
+
+
+def test_workspaces_for_different_payloads_are_written_in_parallel(
+    monkeypatch, tmp_path
+):
+    unblock = threading.Event()
+    generate = workspace.generate_pytest_from_cases
+
+    def blocking(tests):
+        unblock.wait(5)
+        return generate(tests)
+
+    monkeypatch.setattr(workspace, "generate_pytest_from_cases", blocking)
+    manager = WorkspaceManager(root=str(tmp_path))
+    tests = '{"cases": [{"call": "add", "input": [1, 2], "expected": 3}]}'
+
+    def slow_payload():
+        with manager.acquire("def add(a, b):\n    return a + b\n", tests):
+            pass
+
+    def quick_payload():
+        with manager.acquire("x = 1\n", ""):
+            pass
+
+    slow = threading.Thread(target=slow_payload)
+    slow.start()
+    time.sleep(0.05)
+    quick = threading.Thread(target=quick_payload)
+    quick.start()
+    # Not stuck behind the other payload's test generation.
+    quick.join(1)
+    finished = not quick.is_alive()
+    unblock.set()
+    slow.join()
+    quick.join()
+    assert finished
@@ -0,0 +1,48 @@
+import json
+import tempfile
+from pathlib import Path
+
+from apps.orchestrator.core.memory_manager import SCHEMA_VERSION, MemoryManager
+
+
+def test_memory_manager_roundtrip_uses_schema_stamp():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        memory = MemoryManager(store_dir=tmpdir, history_limit=5, top_k=3)
+        memory.update("demo", ["[ARCHITECTURE.md] System overview paragraph."])
+
+        raw = json.loads((Path(tmpdir) / "demo.json").read_text(encoding="utf-8"))
+        assert raw["schema_version"] == SCHEMA_VERSION
+
+        reloaded = MemoryManager(store_dir=tmpdir, history_limit=5, top_k=3)
+        history = reloaded.get_history("demo")
+        assert history[0].contexts[0].source == "ARCHITECTURE.md"
+        assert "System overview" in reloaded.get("demo").summary
+
+
+def test_memory_manager_validates_legacy_files():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        legacy = {
+            "project_id": "demo",
+            "updated_at": "2026-01-01T00:00:00+00:00",
+            "entries": {},
+            "history": [
+                {
+                    "ts": "2026-01-01T00:00:00+00:00",
+                    "contexts": [
+                        {
+                            "id": "ctx_1",
+                            "content": "legacy",
+                            "first_seen": "2026-01-01T00:00:00+00:00",
+                            "last_seen": "2026-01-01T00:00:00+00:00",
+                            "frequency": "3",
+                        }
+                    ],
+                }
+            ],
+        }
+        (Path(tmpdir) / "demo.json").write_text(json.dumps(legacy), encoding="utf-8")
+
+        memory = MemoryManager(store_dir=tmpdir)
+        context = memory.get_history("demo")[0].contexts[0]
+        # Validation coerces legacy string values to the declared types.
+        assert context.frequency == 3
@@ -0,0 +1,90 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from shared.metrics import HTTPMetricsMiddleware, MetricsRegistry
+
+
+def test_registry_renders_prometheus_text():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests.", ("route",))
+    latency = registry.histogram(
+        "latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0)
+    )
+    registry.callback_gauge("store_size", "Store size.", lambda: 7)
+
+    requests.inc(route="/run")
+    requests.inc(2, route="/run")
+    latency.observe(0.05, route="/run")
+    latency.observe(0.5, route="/run")
+    latency.observe(5.0, route="/run")
+
+    text = registry.render()
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{route="/run"} 3' in text
+    assert 'latency_seconds_bucket{route="/run",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{route="/run",le="1"} 2' in text
+    assert 'latency_seconds_bucket{route="/run",le="+Inf"} 3' in text
+    assert 'latency_seconds_count{route="/run"} 3' in text
+    assert "store_size 7" in text
+
+
+def test_registry_returns_existing_metric_for_same_name():
+    registry = MetricsRegistry()
+    first = registry.counter("hits_total", "Hits.")
+    assert registry.counter("hits_total", "Hits.") is first
+
+
+
+def _serve_stream(registry: MetricsRegistry, fail: bool = False) -> None:
+    async def app(scope, receive, send):
+        scope["route"] = SimpleNamespace(path="/stream")
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        for _ in range(3):
+            await asyncio.sleep(0.05)
+            await send({"type": "http.response.body", "body": b"x", "more_body": True})
+        if fail:
+            raise RuntimeError("stream broke")
+        await send({"type": "http.response.body", "body": b""})
+
+    middleware = HTTPMetricsMiddleware(
+        app,
+        requests=registry.counter("requests_total", "Requests.", ("route", "status")),
+        latency=registry.histogram(
+            "latency_seconds", "Latency.", ("route",), buckets=(0.1,)
+        ),
+        in_flight=registry.gauge("in_flight", "In flight."),
+    )
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    scope = {"type": "http", "method": "GET", "path": "/stream"}
+    asyncio.run(middleware(scope, receive, send))
+
+
+def test_http_middleware_times_streamed_responses_to_the_last_chunk():
+    registry = MetricsRegistry()
+    _serve_stream(registry)
+
+    text = registry.render()
+    assert 'requests_total{route="/stream",status="200"} 1' in text
+    # The body takes ~0.15s; timing only the headers would land under 0.1s.
+    assert 'latency_seconds_bucket{route="/stream",le="0.1"} 0' in text
+    assert 'latency_seconds_count{route="/stream"} 1' in text
+    assert "in_flight 0" in text
+
+
+def test_http_middleware_counts_a_stream_failing_part_way_as_an_error():
+    registry = MetricsRegistry()
+    with pytest.raises(RuntimeError):
+        _serve_stream(registry, fail=True)
+
+    text = registry.render()
+    assert 'requests_total{route="/stream",status="500"} 1' in text
+    assert 'status="200"' not in text
+    assert "in_flight 0" in text
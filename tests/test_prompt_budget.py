@@ -0,0 +1,72 @@
+from apps.orchestrator.core.prompt_budget import (
+    PromptBudgeter,
+    estimate_tokens,
+    parse_template,
+)
+from apps.orchestrator.core.prompt_registry import PromptRegistry
+from apps.orchestrator.models.prompt import PromptTemplate
+
+
+def _template(template: str, task_type: str = "code_generation") -> PromptTemplate:
+    return PromptTemplate(
+        type=task_type,
+        version="v1",
+        role="r",
+        constraints="c",
+        output_schema="o",
+        template=template,
+    )
+
+
+def test_prompt_budgeter_matches_str_format_within_budget():
+    budgeter = PromptBudgeter(default_budget=100_000)
+    memory = "Memory Snapshot (recent/high-signal):\n- [doc] one"
+    context = ["chunk one", "chunk two"]
+    for prompt in PromptRegistry().list():
+        assembled = budgeter.assemble(prompt, memory, context, "Write a parser.")
+        expected = prompt.template.format(
+            memory=memory, context="\n".join(context), input="Write a parser."
+        )
+        assert assembled.text == expected
+        assert assembled.dropped_tokens == 0
+
+
+def test_prompt_budgeter_trims_low_ranked_context_and_memory():
+    prompt = _template("M:{memory}\nC:{context}\nT:{input}")
+    static = parse_template(prompt.template).static_tokens
+    budgeter = PromptBudgeter(
+        default_budget=static + estimate_tokens("task") + 130,
+        budgets={"code_review": 10_000},
+        memory_share=0.2,
+    )
+    memory = "Memory Snapshot:\n" + "\n".join(f"- {'m' * 36} {i}" for i in range(10))
+    context = ["a" * 200, "b" * 200, "c" * 400]
+
+    assembled = budgeter.assemble(prompt, memory, context, "task")
+
+    assert "a" * 200 in assembled.text and "b" * 200 in assembled.text
+    assert "c" * 40 not in assembled.text
+    assert "- " + "m" * 36 + " 0" in assembled.text
+    assert "m" * 36 + " 9" not in assembled.text
+    assert assembled.tokens <= budgeter.budget_for("code_generation")
+    total = estimate_tokens(memory) + sum(estimate_tokens(c + "\n") for c in context)
+    assert assembled.dropped_tokens > total // 2
+
+    roomy = budgeter.assemble(
+        _template(prompt.template, "code_review"), memory, context, "task"
+    )
+    assert roomy.dropped_tokens == 0
+
+
+def test_parse_template_is_cached_and_handles_escaped_braces():
+    template = "{{literal}} {memory}|{context}|{input}"
+    parsed = parse_template(template)
+    assert parse_template(template) is parsed
+    assert parsed.fields == ("memory", "context", "input")
+    assert parsed.render(template, {"memory": "m", "context": "c", "input": "i"}) == (
+        "{literal} m|c|i"
+    )
+
+    spec = "{input!r:>5}"
+    assert not parse_template(spec).simple
+    assert parse_template(spec).render(spec, {"input": "x"}) == spec.format(input="x")
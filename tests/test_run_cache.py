@@ -0,0 +1,124 @@
+import tempfile
+import time
+from pathlib import Path
+
+from apps.orchestrator.core.agent_loop import AgentLoop
+from apps.orchestrator.core.llm_gateway import LLMGateway
+from apps.orchestrator.core.mcp_client import MCPClient
+from apps.orchestrator.core.memory_manager import MemoryManager
+from apps.orchestrator.core.prompt_registry import PromptRegistry
+from apps.orchestrator.core.rag_retriever import RAGRetriever
+from apps.orchestrator.core.run_cache import RunCache, cache_key
+from apps.orchestrator.models.report import QualityReport
+from apps.orchestrator.models.run import RunRequest
+from apps.orchestrator.storage.vector_db import VectorDB
+
+_REPORT = QualityReport(
+    lint={"status": "ok", "detail": {}},
+    test={"status": "passed", "detail": {}},
+    coverage={"status": "ok", "detail": {}},
+)
+
+
+class CountingLLM(LLMGateway):
+    def __init__(self) -> None:
+        super().__init__()
+        self.calls = 0
+
+    def generate(self, prompt: str, options: dict | None = None) -> str:
+        self.calls += 1
+        return "```python\ndef test_hello():\n    assert True\n```"
+
+
+class CountingMCP(MCPClient):
+    def __init__(self) -> None:
+        super().__init__("http://fake")
+        self.calls = 0
+
+    def run_tool(self, name: str, payload: dict) -> dict:
+        self.calls += 1
+        return {"status": "ok", "detail": {"tool": name}}
+
+
+def test_cache_key_ignores_bypass_flag_but_not_other_options():
+    def key(options: dict, temperature: float = 0.7) -> str:
+        return cache_key("code_generation", "v1", "prompt", options, "m", temperature)
+
+    base = key({"style": "short"})
+    assert key({"style": "short", "cache": True}) == base
+    assert key({"style": "long"}) != base
+    assert key({"style": "short"}, temperature=0.2) != base
+
+
+def test_run_cache_expires_evicts_and_reloads():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache = RunCache(tmpdir, ttl_s=60, max_bytes=10_000)
+        cache.put("a", "output a", _REPORT)
+        llm_output, report = cache.get("a")
+        assert llm_output == "output a" and report.lint["status"] == "ok"
+
+        entry_size = cache.size_bytes
+        small = RunCache(tmpdir, ttl_s=60, max_bytes=entry_size * 2)
+        assert len(small) == 1
+        small.put("b", "output b", _REPORT)
+        small.get("a")  # "a" becomes most recently used
+        small.put("c", "output c", _REPORT)
+        assert small.get("b") is None
+        assert small.get("a") is not None and small.get("c") is not None
+        assert sorted(p.stem for p in Path(tmpdir).glob("*.json")) == ["a", "c"]
+
+        expired = RunCache(tmpdir, ttl_s=0.01, max_bytes=10_000)
+        time.sleep(0.02)
+        assert expired.get("a") is None
+        assert not (Path(tmpdir) / "a.json").exists()
+
+
+def test_agent_loop_serves_repeat_runs_from_cache_unless_bypassed():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        llm, mcp = CountingLLM(), CountingMCP()
+        agent = AgentLoop(
+            prompt_registry=PromptRegistry(),
+            rag_retriever=RAGRetriever(VectorDB()),
+            memory_manager=MemoryManager(store_dir=str(Path(tmpdir) / "memory")),
+            llm_gateway=llm,
+            mcp_client=mcp,
+            run_cache=RunCache(
+                str(Path(tmpdir) / "cache"), ttl_s=60, max_bytes=1_000_000
+            ),
+        )
+        request = RunRequest(
+            task_type="code_generation", user_input="hello", options={}
+        )
+
+        first = agent.run(request)
+        second = agent.run(request)
+        assert (first.cache_hit, second.cache_hit) == (False, True)
+        assert second.llm_output == first.llm_output
+        assert second.quality_report == first.quality_report
+        assert (llm.calls, mcp.calls) == (1, 3)
+
+        bypass = RunRequest(
+            task_type="code_generation", user_input="hello", options={"cache": False}
+        )
+        assert agent.run(bypass).cache_hit is False
+        assert (llm.calls, mcp.calls) == (2, 6)
+
+
+def test_run_cache_get_tolerates_eviction_during_read():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache = RunCache(tmpdir, ttl_s=60, max_bytes=10_000)
+        cache.put("a", "output a", _REPORT)
+        path_for = cache._path
+        raced = []
+
+        def evicted_meanwhile(key):
+            # Another thread evicts "a" between the index lookup and the file read.
+            if not raced:
+                raced.append(key)
+                with cache._lock:
+                    cache._evict(key)
+            return path_for(key)
+
+        cache._path = evicted_meanwhile
+        assert cache.get("a") is None
+        assert len(cache) == 0 and cache.size_bytes == 0
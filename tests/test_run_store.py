@@ -1,10 +1,31 @@
-﻿from datetime import datetime, timezone
+﻿from datetime import datetime, timedelta, timezone
+import json
 import tempfile
 from pathlib import Path
 
 from apps.orchestrator.models.report import QualityReport
-from apps.orchestrator.models.run_record import RunRecord
-from apps.orchestrator.storage.run_store import RunStore
+from apps.orchestrator.models.run_record import RunRecord, RunSummary
+from apps.orchestrator.storage.quantile_sketch import QuantileSketch
+from apps.orchestrator.storage.run_store import SCHEMA_VERSION, RunStore
+
+
+def _record(
+    run_id: str, created_at: datetime, duration_ms: int = 100, **overrides
+) -> RunRecord:
+    data = dict(
+        id=run_id,
+        task_type="code_generation",
+        project_id="demo",
+        user_input="input",
+        llm_output="output",
+        memory_snapshot="snapshot",
+        retrieved_context=[],
+        quality_report=QualityReport(lint={}, test={}, coverage={}),
+        created_at=created_at,
+        duration_ms=duration_ms,
+    )
+    data.update(overrides)
+    return RunRecord(**data)
 
 
 def test_run_store_roundtrip():
@@ -36,3 +57,157 @@ def test_run_store_roundtrip():
 
         assert store.delete("run_1") is True
         assert store.get("run_1") is None
+
+
+def test_run_store_stats_track_add_delete_and_trim():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        store = RunStore(path=str(Path(tmpdir) / "runs.json"), limit=10)
+        base = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        for i in range(12):
+            store.add(
+                _record(
+                    f"run_{i}",
+                    base + timedelta(minutes=i),
+                    duration_ms=(i + 1) * 100,
+                    project_id=f"p{i % 3}",
+                    task_type="code_review" if i % 4 == 0 else "code_generation",
+                )
+            )
+
+        # run_0 and run_1 were trimmed as the oldest records.
+        assert store.get("run_0") is None and store.get("run_1") is None
+        stats = store.stats()
+        assert stats.total_runs == 10
+        assert stats.task_type_counts == {"code_generation": 8, "code_review": 2}
+        assert stats.project_count == 3
+        assert stats.latest_run_at == base + timedelta(minutes=11)
+        assert store.list(limit=1)[0].id == "run_11"
+
+        store.delete("run_11")
+        stats = store.stats()
+        assert stats.latest_run_at == base + timedelta(minutes=10)
+        review = stats.duration_ms_by_task_type["code_review"]
+        assert review.count == 2
+        assert review.p50_ms is not None and abs(review.p50_ms - 500) <= 10
+
+        # Counters rebuilt from disk match the incrementally maintained ones.
+        reloaded = RunStore(path=str(Path(tmpdir) / "runs.json"), limit=10).stats()
+        assert reloaded.task_type_counts == stats.task_type_counts
+        assert reloaded.project_count == stats.project_count
+        assert reloaded.latest_run_at == stats.latest_run_at
+
+
+def test_quantile_sketch_relative_accuracy_and_remove():
+    sketch = QuantileSketch(relative_accuracy=0.01)
+    for value in range(1, 1001):
+        sketch.add(value)
+    assert abs(sketch.quantile(0.5) - 500) <= 500 * 0.01 + 1
+    assert abs(sketch.quantile(0.95) - 950) <= 950 * 0.01 + 1
+
+    for value in range(501, 1001):
+        sketch.remove(value)
+    assert sketch.count == 500
+    assert sketch.quantile(0.95) <= 500 * 1.01
+
+
+def test_run_store_keeps_heavy_fields_compressed_on_disk():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir) / "runs.json"
+        store = RunStore(path=str(path), limit=10, compression="lzma")
+        created = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        store.add(_record("run_1", created, llm_output="x" * 10_000))
+
+        summary = store.get("run_1", fields="summary")
+        assert type(summary) is RunSummary
+        assert type(store.list(fields="summary")[0]) is RunSummary
+        full = store.get("run_1")
+        assert isinstance(full, RunRecord) and full.llm_output == "x" * 10_000
+
+        persisted = json.loads(path.read_text(encoding="utf-8"))
+        assert "llm_output" not in persisted["runs"][0]
+        blob = Path(tmpdir) / "runs_blobs" / "run_1.xz"
+        assert blob.exists() and blob.stat().st_size < 1_000
+
+        store.delete("run_1")
+        assert not blob.exists()
+
+
+def test_run_store_migrates_legacy_inline_records():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir) / "runs.json"
+        legacy = _record("run_1", datetime(2026, 1, 1, tzinfo=timezone.utc)).dict()
+        legacy["created_at"] = legacy["created_at"].isoformat()
+        path.write_text(json.dumps([legacy]), encoding="utf-8")
+
+        store = RunStore(path=str(path), limit=10)
+        assert store.get("run_1").llm_output == "output"
+        persisted = json.loads(path.read_text(encoding="utf-8"))
+        assert persisted["schema_version"] == SCHEMA_VERSION
+        assert "llm_output" not in persisted["runs"][0]
+
+
+def test_run_store_trusts_only_current_schema_version():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir) / "runs.json"
+        store = RunStore(path=str(path), limit=10)
+        store.add(
+            _record("run_1", datetime(2026, 1, 1, tzinfo=timezone.utc), duration_ms=42)
+        )
+
+        trusted = RunStore(path=str(path), limit=10)
+        assert trusted.get("run_1").duration_ms == 42
+        assert "schema_version" not in trusted.get("run_1").__dict__
+        assert trusted.get("run_1").created_at == datetime(
+            2026, 1, 1, tzinfo=timezone.utc
+        )
+
+        # Unknown versions are validated: malformed items are dropped, not trusted.
+        payload = json.loads(path.read_text(encoding="utf-8"))
+        payload["schema_version"] = SCHEMA_VERSION + 1
+        payload["runs"][0]["duration_ms"] = "not-a-number"
+        path.write_text(json.dumps(payload), encoding="utf-8")
+        assert RunStore(path=str(path), limit=10).get("run_1") is None
+
+
+def test_run_store_iter_records_filters_in_chronological_order():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        store = RunStore(path=str(Path(tmpdir) / "runs.json"), limit=10)
+        base = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        for i in range(5):
+            store.add(
+                _record(f"run_{i}", base + timedelta(hours=i), project_id=f"p{i % 2}")
+            )
+
+        exported = store.iter_records(
+            since=datetime(2026, 1, 1, 1),
+            until=base + timedelta(hours=4),
+            project_id="p1",
+        )
+        first = next(exported)
+        # Mutating the store mid-export must not break the running iterator;
+        # the deleted run's payload is gone, so it is skipped.
+        store.delete("run_3")
+        records = [first, *exported]
+        assert [r.id for r in records] == ["run_1"]
+        assert records[0].llm_output == "output"
+
+        summaries = list(store.iter_records(fields="summary"))
+        assert [r.id for r in summaries] == ["run_0", "run_1", "run_2", "run_4"]
+
+
+def test_run_store_add_many_writes_once_and_trims():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        store = RunStore(path=str(Path(tmpdir) / "runs.json"), limit=10)
+        base = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        writes = []
+        original_save = store._save
+        store._save = lambda: (writes.append(1), original_save())
+
+        store.add_many(
+            [_record(f"run_{i}", base + timedelta(seconds=i)) for i in range(12)]
+        )
+
+        assert len(writes) == 1
+        assert len(store) == 10
+        assert store.list(limit=1)[0].id == "run_11"
+        assert store.get("run_0") is None
@@ -0,0 +1,106 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from apps.orchestrator.config import settings
+from apps.orchestrator.core.llm_gateway import LLMGateway
+from apps.orchestrator.core.metrics import COALESCED_CALLS
+from apps.orchestrator.core.single_flight import SingleFlight
+
+
+def test_concurrent_sync_calls_share_one_result_and_error():
+    flight = SingleFlight("test_sync")
+    calls = []
+
+    def slow(value):
+        calls.append(value)
+        time.sleep(0.2)
+        if value == "boom":
+            raise RuntimeError("boom")
+        return value
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(lambda _: flight.do("k", lambda: slow("v")), range(4)))
+    assert results == ["v"] * 4 and calls == ["v"]
+    assert COALESCED_CALLS.value(call="test_sync") == 3
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        futures = [pool.submit(flight.do, "k", lambda: slow("boom")) for _ in range(2)]
+        for future in futures:
+            with pytest.raises(RuntimeError):
+                future.result()
+    assert calls == ["v", "boom"]
+    assert flight.in_flight() == 0
+
+
+def test_async_waiter_cancellation_does_not_cancel_shared_call():
+    flight = SingleFlight("test_async")
+    calls = []
+
+    async def slow():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "v"
+
+    async def main():
+        first = asyncio.ensure_future(flight.ado("k", slow))
+        rest = [asyncio.ensure_future(flight.ado("k", slow)) for _ in range(3)]
+        await asyncio.sleep(0)
+        first.cancel()
+        return await asyncio.gather(*rest)
+
+    assert asyncio.run(main()) == ["v"] * 3
+    assert calls == [1]
+    assert COALESCED_CALLS.value(call="test_async") == 3
+
+
+class _CountingHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):  # noqa: N802 - http.server naming
+        request = json.loads(
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        )
+        prompt = request["contents"][0]["parts"][0]["text"]
+        self.server.prompts.append(prompt)
+        time.sleep(0.2)
+        reply = {"candidates": [{"content": {"parts": [{"text": f"echo:{prompt}"}]}}]}
+        body = json.dumps(reply).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_gateway_coalesces_identical_prompts(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _CountingHandler)
+    server.daemon_threads = True
+    server.prompts = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(settings, "llm_provider", "gemini")
+    monkeypatch.setattr(settings, "llm_api_key", "test-key")
+    monkeypatch.setattr(settings, "llm_base_url", f"http://127.0.0.1:{server.server_address[1]}")
+    gateway = LLMGateway()
+    try:
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            prompts = ["same", "same", "same", "other"]
+            assert list(pool.map(gateway.generate, prompts)) == [
+                f"echo:{p}" for p in prompts
+            ]
+
+        async def agenerate_all():
+            return await asyncio.gather(*(gateway.agenerate("async") for _ in range(3)))
+
+        assert asyncio.run(agenerate_all()) == ["echo:async"] * 3
+        assert sorted(server.prompts) == ["async", "other", "same"]
+    finally:
+        server.shutdown()
@@ -0,0 +1,88 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from apps.orchestrator.config import settings
+from apps.orchestrator.core.fenced_blocks import (
+    FencedBlockParser,
+    extract_fenced_blocks,
+)
+from apps.orchestrator.core.llm_gateway import LLMGateway
+
+
+class _SSEHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):  # noqa: N802 - http.server naming
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i, text in enumerate(self.server.deltas):
+            if i == len(self.server.deltas) - 1:
+                # Hold the last event back until the client has seen the first.
+                self.server.release.wait(timeout=5)
+            event = {"candidates": [{"content": {"parts": [{"text": text}]}}]}
+            self._chunk(f"data: {json.dumps(event)}\r\n\r\n".encode("utf-8"))
+        self._chunk(b"")
+
+    def _chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, *args):
+        pass
+
+
+def _serve(deltas):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _SSEHandler)
+    server.daemon_threads = True
+    server.deltas = deltas
+    server.release = threading.Event()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def test_fenced_block_parser_completes_blocks_across_pieces():
+    text = "intro\n```python\nx = 1\n```\ntext ``` not closed"
+    parser = FencedBlockParser()
+    completed = [parser.feed(text[i : i + 3]) for i in range(0, len(text), 3)]
+    assert [blocks for blocks in completed if blocks] == [["x = 1"]]
+    assert parser.blocks == extract_fenced_blocks(text) == ["x = 1"]
+    assert extract_fenced_blocks("```py\na\n``` and ```\nb```") == ["a", "b"]
+
+
+def test_generate_stream_yields_gemini_deltas_before_body_ends(monkeypatch):
+    server, url = _serve(["```python\n", "x = 1\n```", " done"])
+    monkeypatch.setattr(settings, "llm_provider", "gemini")
+    monkeypatch.setattr(settings, "llm_api_key", "test-key")
+    monkeypatch.setattr(settings, "llm_base_url", url)
+    gateway = LLMGateway()
+    try:
+        stream = gateway.generate_stream("hi")
+        assert next(stream) == "```python\n"
+        server.release.set()
+        assert list(stream) == ["x = 1\n```", " done"]
+
+        server.release.set()
+        assert "".join(gateway.generate_stream("again")).endswith(" done")
+        assert gateway.pool_stats()[url]["reused"] == 1
+    finally:
+        server.shutdown()
+
+
+def test_stub_provider_streams_chunks_with_delay(monkeypatch):
+    monkeypatch.setattr(settings, "llm_provider", "stub")
+    monkeypatch.setattr(settings, "llm_stub_chunk_chars", 5)
+    monkeypatch.setattr(settings, "llm_stub_chunk_delay_s", 0.02)
+    gateway = LLMGateway()
+
+    started = time.perf_counter()
+    chunks = list(gateway.generate_stream("hello world"))
+    elapsed = time.perf_counter() - started
+
+    assert "".join(chunks) == gateway.generate("hello world")
+    assert all(len(chunk) <= 5 for chunk in chunks)
+    assert elapsed >= 0.02 * len(chunks)